@@ -0,0 +1,190 @@
+"""
+Benchmark of the JSON endpoints through the WSGI and the ASGI paths
+
+Seeds a SQLite database in a temporary instance folder and requests
+/solicitudes/get/ from many concurrent clients. The WSGI path serves them
+with a fixed number of worker threads, the ASGI path with the event loop
+and the threads of the async pool. --latency adds a delay to every query
+to stand for the network round trip to MariaDB, usage:
+
+    python bench/bench_async.py [--requests N] [--clients N] [--workers N] [--latency MS]
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+# pylint: disable=wrong-import-position
+from consad import create_app, connection_pool
+from consad.asgi import create_asgi_app
+
+SCHEMA = """
+CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT, centrogestor TEXT);
+CREATE TABLE departamento(id_departamento INTEGER PRIMARY KEY, nombre TEXT, c_clave TEXT);
+CREATE TABLE usuarios(id_usuario INTEGER PRIMARY KEY, token TEXT UNIQUE, nombre TEXT,
+                      id_zona INT, id_departamento INT);
+CREATE TABLE grupo(id_grupo INTEGER PRIMARY KEY, nombre TEXT);
+CREATE TABLE materiales(id_material TEXT PRIMARY KEY, id_grupo INT, precio_unitario REAL,
+                        unidad_medida TEXT, descripcion TEXT);
+CREATE TABLE periodo(id_periodo INTEGER PRIMARY KEY, descripcion TEXT, fecha_inicio DATETIME,
+                     fecha_fin DATETIME, activo BOOLEAN DEFAULT 1);
+CREATE TABLE solicitudes(id_material TEXT, id_zona INT, id_departamento INT, id_periodo INT,
+                         cantidad REAL, fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
+                         comentarios TEXT,
+                         PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo));
+INSERT INTO zona VALUES(1, 'Norte', 'CG1');
+INSERT INTO departamento VALUES(1, 'Compras', 'C1');
+INSERT INTO usuarios VALUES(1, 'bench', 'Bench', 1, 1);
+INSERT INTO grupo VALUES(1, 'Papeleria');
+INSERT INTO periodo VALUES(1, '2099', '2000-01-01 00:00:00', '2099-12-31 23:59:59', 1);
+"""
+
+
+def seed(instance):
+    """ creates the configuration and a database with 500 solicitudes """
+    conn = sqlite3.connect(instance.joinpath('database.db'))
+    conn.executescript(SCHEMA)
+    conn.executemany('INSERT INTO materiales VALUES(?, 1, ?, ?, ?)',
+                     [(f'M{i:04d}', 10.0 + i, 'pza', f'Material {i}') for i in range(500)])
+    conn.executemany('INSERT INTO solicitudes(id_material, id_zona, id_departamento, '
+                     'id_periodo, cantidad) VALUES(?, 1, 1, 1, ?)',
+                     [(f'M{i:04d}', i + 1) for i in range(500)])
+    conn.commit()
+    instance.joinpath('config.json').write_text(json.dumps(
+        {'config': 'sqlite', 'secret_key': 'bench',
+         'sqlite': {'driver': 'SQLITE', 'database': 'database.db'}}), encoding='utf-8')
+
+
+class SlowCursor():
+    """ cursor that waits before every statement, like a remote server """
+
+    def __init__(self, cursor, latency):
+        self.__cursor = cursor
+        self.__latency = latency
+
+    def execute(self, *args):
+        """ runs the statement after the simulated round trip """
+        time.sleep(self.__latency)
+        return self.__cursor.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.__cursor, name)
+
+
+class SlowConnection():
+    """ connection handing out SlowCursor objects """
+
+    def __init__(self, conn, latency):
+        self.__conn = conn
+        self.__latency = latency
+
+    def cursor(self, *args):
+        """ returns a cursor with latency """
+        return SlowCursor(self.__conn.cursor(*args), self.__latency)
+
+    def __getattr__(self, name):
+        return getattr(self.__conn, name)
+
+
+def build_app(instance, latency, pool_size):
+    """ creates the application, replacing its pool when latency is simulated """
+    app = create_app(str(instance))
+    database = instance.joinpath('database.db')
+    app.extensions[connection_pool.POOL_KEY] = connection_pool.ConnectionPool(
+        lambda: SlowConnection(sqlite3.connect(database, check_same_thread=False), latency),
+        size=pool_size)
+    return app
+
+
+BODY = json.dumps({'id_zona': 1, 'id_departamento': 1, 'id_periodo': 1, 'per_page': 50})
+
+
+def bench_wsgi(app, requests, workers):
+    """ requests/sec of the Flask application served by worker threads """
+    def worker(count):
+        client = app.test_client()
+        client.post('/login/', data={'token': 'bench'})
+        for _ in range(count):
+            response = client.post('/solicitudes/get/', data=BODY,
+                                   content_type='application/json', buffered=True)
+            assert response.status_code == 200
+    workers = min(workers, requests)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(worker, [requests // workers] * workers))
+    return requests // workers * workers / (time.perf_counter() - start)
+
+
+async def asgi_request(asgi, method, path, body, headers):
+    """ sends one request to the ASGI application, returns status and headers """
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': headers, 'http_version': '1.1', 'scheme': 'http',
+             'server': ('localhost', 80), 'client': ('127.0.0.1', 0)}
+    result = {}
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+            result['headers'] = message['headers']
+    await asgi(scope, receive, send)
+    return result
+
+
+async def bench_asgi(asgi, requests, clients):
+    """ requests/sec of the ASGI application with concurrent clients """
+    login = await asgi_request(asgi, 'POST', '/login/', b'token=bench',
+                               [(b'content-type', b'application/x-www-form-urlencoded')])
+    cookie = next(value.split(b';')[0] for name, value in login['headers']
+                  if name.lower() == b'set-cookie')
+    headers = [(b'content-type', b'application/json'), (b'cookie', cookie)]
+
+    async def client(count):
+        for _ in range(count):
+            response = await asgi_request(asgi, 'POST', '/solicitudes/get/', BODY.encode(),
+                                          headers)
+            assert response['status'] == 200
+    clients = min(clients, requests)
+    start = time.perf_counter()
+    await asyncio.gather(*[client(requests // clients) for _ in range(clients)])
+    return requests // clients * clients / (time.perf_counter() - start)
+
+
+def main():
+    """ runs both paths with the same data and prints requests/sec """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 2)[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=5.0, help='milliseconds per query')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        instance = Path(folder)
+        seed(instance)
+        latency = args.latency / 1000
+        wsgi = bench_wsgi(build_app(instance, latency, args.pool_size), args.requests,
+                          args.workers)
+        asgi = asyncio.run(bench_asgi(
+            create_asgi_app(build_app(instance, latency, args.pool_size)),
+            args.requests, args.clients))
+    print(f'{"path":<6}{"req/s":>10}')
+    print(f'{"wsgi":<6}{wsgi:>10.1f}  ({args.workers} worker threads)')
+    print(f'{"asgi":<6}{asgi:>10.1f}  ({args.clients} concurrent clients, '
+          f'{args.pool_size} connections)')
+
+
+if __name__ == '__main__':
+    main()
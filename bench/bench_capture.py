@@ -0,0 +1,300 @@
+"""
+Load test of the capture workflow through the Flask test client
+
+Seeds a SQLite database with the tables of data_object.models, then every
+client repeats the workflow of a user: login, captura, solicitudes get,
+post and delete and periodo get. Reports p50/p95/p99 latency, throughput
+and peak memory by endpoint and writes them as JSON. With --baseline the
+p95 of every endpoint is compared to a previous result and the exit code
+is 1 when any of them is slower than the tolerance. --write-behind runs
+the saves through the write-behind journal, usage:
+
+    python bench/bench_capture.py [--scale small|medium|large] [--materiales N]
+        [--solicitudes N] [--iterations N] [--clients N] [--data DIR]
+        [--output FILE] [--baseline FILE] [--tolerance 0.2] [--write-behind]
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy import insert
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+# pylint: disable=wrong-import-position
+from consad import create_app
+from consad.database_driver import DatabaseType
+from consad.write_behind import close as close_journal
+from data_object import ORMConnection, models
+
+SCALES = {
+    'small': (1000, 50000),
+    'medium': (5000, 250000),
+    'large': (10000, 1000000),
+}
+
+ZONAS = 10
+DEPARTAMENTOS = 10
+GRUPOS = 20
+OPEN_PERIOD = 1
+CLOSED_PERIOD = 2
+
+# rows per INSERT statement while seeding
+CHUNK = 20000
+
+ENDPOINTS = ('login', 'captura', 'solicitudes_get', 'solicitudes_post', 'solicitudes_delete',
+             'periodo_get')
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def token(id_zona, id_departamento):
+    """ token of the user of a zona and departamento """
+    return f'token-{id_zona}-{id_departamento}'
+
+
+def seed(database, materiales, solicitudes):
+    """
+    creates the tables of data_object.models and fills them, the solicitudes
+    are spread over every zona, departamento and both periods
+    """
+    orm = ORMConnection({'DRIVER': DatabaseType.SQLITE, 'DATABASE': database})
+    models.Base.metadata.create_all(bind=orm.engine)
+    rand = random.Random(0)
+    with orm.engine.begin() as conn:
+        conn.execute(insert(models.Periodo.__table__), [
+            {'id_periodo': OPEN_PERIOD, 'descripcion': 'abierto',
+             'fecha_inicio': datetime(2000, 1, 1), 'fecha_fin': datetime(2099, 12, 31)},
+            {'id_periodo': CLOSED_PERIOD, 'descripcion': 'cerrado',
+             'fecha_inicio': datetime(2000, 1, 1), 'fecha_fin': datetime(2000, 12, 31)}])
+        conn.execute(insert(models.Zona.__table__), [
+            {'id_zona': zona, 'nombre': f'Zona {zona}', 'centrogestor': f'CG{zona:03d}'}
+            for zona in range(1, ZONAS + 1)])
+        conn.execute(insert(models.Departamento.__table__), [
+            {'id_departamento': depto, 'nombre': f'Departamento {depto}',
+             'c_clave': f'D{depto:03d}'}
+            for depto in range(1, DEPARTAMENTOS + 1)])
+        conn.execute(insert(models.Usuario.__table__), [
+            {'token': token(zona, depto), 'nombre': f'Usuario {zona}-{depto}',
+             'id_zona': zona, 'id_departamento': depto}
+            for zona in range(1, ZONAS + 1) for depto in range(1, DEPARTAMENTOS + 1)])
+        conn.execute(insert(models.Grupo.__table__), [
+            {'id_grupo': grupo, 'nombre': f'Grupo {grupo}'} for grupo in range(1, GRUPOS + 1)])
+        conn.execute(insert(models.Material.__table__), [
+            {'id_material': f'M{pos:06d}', 'id_grupo': pos % GRUPOS + 1,
+             'precio_unitario': round(rand.uniform(1, 5000), 2), 'unidad_medida': 'pza',
+             'descripcion_sap': f'MATERIAL {pos}', 'descripcion': f'Material {pos}'}
+            for pos in range(materiales)])
+
+        def rows():
+            count = 0
+            for periodo in (OPEN_PERIOD, CLOSED_PERIOD):
+                for zona in range(1, ZONAS + 1):
+                    for depto in range(1, DEPARTAMENTOS + 1):
+                        for pos in range(materiales):
+                            if count == solicitudes:
+                                return
+                            count += 1
+                            yield {'id_material': f'M{pos:06d}', 'id_zona': zona,
+                                   'id_departamento': depto, 'id_periodo': periodo,
+                                   'cantidad': rand.randint(1, 100)}
+        for chunk in _chunks(rows()):
+            conn.execute(insert(models.Solicitud.__table__), chunk)
+
+
+def prepare(folder, materiales, solicitudes, write_behind=False):
+    """ writes the configuration and seeds the database unless it was seeded before """
+    folder.mkdir(parents=True, exist_ok=True)
+    database = folder.joinpath(f'capture_{materiales}_{solicitudes}.db')
+    if not database.exists():
+        start = time.perf_counter()
+        seed(database, materiales, solicitudes)
+        print(f'seeded {database.name} in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+    folder.joinpath('config.json').write_text(json.dumps(
+        {'config': 'sqlite', 'secret_key': 'bench',
+         'sqlite': {'driver': 'SQLITE', 'database': database.name,
+                    'write_behind': write_behind}}), encoding='utf-8')
+
+
+class Recorder():
+    """ latencies by endpoint, shared by the clients """
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.__lock = threading.Lock()
+
+    def timed(self, name, call, *args, **kwargs):
+        """ runs a request, reads its whole body and records the latency """
+        start = time.perf_counter()
+        response = call(*args, buffered=True, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name} answered {response.status_code}')
+        with self.__lock:
+            self.latencies[name].append(elapsed)
+        return response
+
+
+def workflow(app, client_id, iterations, materiales, recorder):
+    """ repeats the capture workflow of the user of a zona and departamento """
+    zona = client_id % ZONAS + 1
+    depto = client_id // ZONAS % DEPARTAMENTOS + 1
+    client = app.test_client()
+    get_body = {'id_zona': zona, 'id_departamento': depto, 'id_periodo': OPEN_PERIOD}
+    for iteration in range(iterations):
+        recorder.timed('login', client.post, '/login/', data={'token': token(zona, depto)})
+        recorder.timed('captura', client.get, '/solicitudes/capturar/')
+        recorder.timed('solicitudes_get', client.post, '/solicitudes/get/',
+                       json=dict(get_body, page=iteration % 5 + 1))
+        material = f'M{(client_id * iterations + iteration) % materiales:06d}'
+        recorder.timed('solicitudes_post', client.post, '/solicitudes/post/',
+                       data={'material': material, 'cantidad': '5', 'periodo': OPEN_PERIOD})
+        recorder.timed('solicitudes_delete', client.post, '/solicitudes/delete/',
+                       json={'id_material': material})
+        recorder.timed('periodo_get', client.post, '/periodo/get/', json={})
+
+
+def percentile(values, fraction):
+    """ nearest rank percentile of sorted values """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(int(round(fraction * len(values))) - 1, 0))]
+
+
+def memory_peaks(app, materiales):
+    """ peak bytes allocated while answering each endpoint, measured one at a time """
+    recorder = Recorder()
+    peaks = dict.fromkeys(ENDPOINTS, 0)
+    original = recorder.timed
+
+    def traced(name, call, *args, **kwargs):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        response = original(name, call, *args, **kwargs)
+        peaks[name] = max(peaks[name], tracemalloc.get_traced_memory()[1] - before)
+        return response
+    recorder.timed = traced
+    tracemalloc.start()
+    try:
+        workflow(app, 0, 3, materiales, recorder)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run(args):
+    """ runs the load test and returns the result as a dictionary """
+    materiales, solicitudes = SCALES[args.scale]
+    materiales = args.materiales or materiales
+    solicitudes = args.solicitudes or solicitudes
+    with tempfile.TemporaryDirectory() as temporary:
+        folder = Path(args.data) if args.data else Path(temporary)
+        prepare(folder, materiales, solicitudes, args.write_behind)
+        app = create_app(str(folder.resolve()))
+        recorder = Recorder()
+        # one untimed pass fills the caches as a running server would have them
+        workflow(app, 0, 1, materiales, Recorder())
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            futures = [executor.submit(workflow, app, client, args.iterations, materiales,
+                                       recorder) for client in range(args.clients)]
+            for future in futures:
+                future.result()
+        wall = time.perf_counter() - start
+        peaks = memory_peaks(app, materiales)
+        close_journal(app)
+    endpoints = {}
+    for name, values in recorder.latencies.items():
+        values.sort()
+        endpoints[name] = {
+            'requests': len(values),
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'mean_ms': sum(values) / len(values) * 1000,
+            'throughput_rps': len(values) / wall,
+            'peak_memory_kb': peaks[name] / 1024,
+        }
+    requests = sum(item['requests'] for item in endpoints.values())
+    return {
+        'meta': {'date': datetime.now().isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'materiales': materiales,
+                 'solicitudes': solicitudes, 'clients': args.clients,
+                 'iterations': args.iterations, 'write_behind': args.write_behind},
+        'throughput_rps': requests / wall,
+        'wall_seconds': wall,
+        # kilobytes on Linux
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'endpoints': endpoints,
+    }
+
+
+def regressions(result, baseline, tolerance):
+    """ returns the endpoints whose p95 grew more than tolerance over the baseline """
+    slower = []
+    for name, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            slower.append((name, previous['p95_ms'], current['p95_ms']))
+    return slower
+
+
+def main():
+    """ parses the arguments, runs the load test and prints the report """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 2)[1])
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--materiales', type=int, default=None)
+    parser.add_argument('--solicitudes', type=int, default=None)
+    parser.add_argument('--iterations', type=int, default=20, help='workflows per client')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--data', default=None,
+                        help='folder to keep the seeded database between runs')
+    parser.add_argument('--output', default=None, help='JSON file for the result')
+    parser.add_argument('--baseline', default=None, help='JSON result to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--write-behind', action='store_true',
+                        help='acknowledge saves once they are in the journal')
+    args = parser.parse_args()
+    result = run(args)
+    print(f'{"endpoint":<20}{"req":>6}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+          f'{"req/s":>9}{"peak KB":>10}')
+    for name, item in result['endpoints'].items():
+        print(f'{name:<20}{item["requests"]:>6}{item["p50_ms"]:>9.2f}{item["p95_ms"]:>9.2f}'
+              f'{item["p99_ms"]:>9.2f}{item["throughput_rps"]:>9.1f}'
+              f'{item["peak_memory_kb"]:>10.1f}')
+    print(f'total {result["throughput_rps"]:.1f} req/s, peak RSS {result["peak_rss_kb"]} KB')
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2), encoding='utf-8')
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        slower = regressions(result, baseline, args.tolerance)
+        for name, previous, current in slower:
+            print(f'regression: {name} p95 {previous:.2f} ms -> {current:.2f} ms')
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of the row formatting of the JSON endpoints
+
+Compares the per cell loops that solicitudes_data and periodo_get used to
+run against the column typed formatters, usage:
+
+    python bench/bench_formatters.py [rows ...]
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+from consad import SOLICITUDES_FORMAT, PERIODO_FORMAT  # pylint: disable=wrong-import-position
+
+
+def loop_solicitudes(rows):
+    """ per cell loop formerly used by solicitudes_data """
+    temp_params = []
+    for row in rows:
+        temp_row = []
+        cont = 0
+        for val in row:
+            if not isinstance(val, str):
+                if cont % 6 == 5:
+                    temp_row.append(f'{val:0,.2f}')
+                else:
+                    temp_row.append(str(val))
+            else:
+                temp_row.append(val)
+            cont += 1
+        temp_params.append(temp_row)
+    return temp_params
+
+
+def loop_periodo(rows):
+    """ per cell loop formerly used by periodo_get """
+    temp_params = []
+    for row in rows:
+        temp_row = []
+        for val in row:
+            if isinstance(val, datetime):
+                temp_row.append(val.isoformat())
+            else:
+                temp_row.append(val)
+        fecha_ini = temp_row[-3]
+        if isinstance(temp_row[-3], str):
+            fecha_ini = datetime.fromisoformat(temp_row[-3])
+        fecha_fin = temp_row[-2]
+        if isinstance(temp_row[-2], str):
+            fecha_fin = datetime.fromisoformat(temp_row[-2])
+        fecha_now = datetime.now()
+        lapse_ini = fecha_fin-fecha_now
+        lapse_final = fecha_ini-fecha_now
+        temp_row.append(lapse_final.total_seconds() < 0 and lapse_ini.total_seconds() > 0)
+        temp_params.append(temp_row)
+    return temp_params
+
+
+def measure(function, rows, repeat=5):
+    """ best time of repeat runs, in milliseconds """
+    return min(timeit.repeat(lambda: function(rows), number=1, repeat=repeat)) * 1000
+
+
+def main(sizes):
+    """ runs the benchmark for every size """
+    base = datetime(2026, 1, 1)
+    print(f'{"endpoint":<12}{"rows":>8}{"loop ms":>12}{"columns ms":>12}{"speedup":>9}')
+    for size in sizes:
+        solicitudes = [(f'M{i:06d}', 2026, f'Material {i}', float(i % 90 + 1), 'pza',
+                        1000.0 + i * 1.5) for i in range(size)]
+        periodos = [(i, str(2000 + i % 30), base + timedelta(days=i % 400),
+                     base + timedelta(days=i % 400 + 365), 1) for i in range(size)]
+        assert loop_solicitudes(solicitudes) == SOLICITUDES_FORMAT(solicitudes)
+        assert loop_periodo(periodos) == PERIODO_FORMAT(periodos)
+        for name, old, new, rows in (('solicitudes', loop_solicitudes, SOLICITUDES_FORMAT,
+                                      solicitudes),
+                                     ('periodo', loop_periodo, PERIODO_FORMAT, periodos)):
+            old_ms = measure(old, rows)
+            new_ms = measure(new, rows)
+            print(f'{name:<12}{size:>8}{old_ms:>12.2f}{new_ms:>12.2f}{old_ms / new_ms:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
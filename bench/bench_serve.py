@@ -0,0 +1,145 @@
+"""
+Load test of the capture endpoints served by consad serve
+
+Seeds the database of bench_capture, then for every worker count starts
+`consad serve` on a free port and runs client processes that log in and
+repeat solicitudes get, periodo get and the captura page over HTTP for a
+fixed time. Reports the throughput of every worker count and its scaling
+against one worker; the scaling can only be linear up to the cores of the
+machine, which are printed with the report, usage:
+
+    python bench/bench_serve.py [--workers 1,2,4] [--threads N] [--clients N]
+        [--seconds N] [--materiales N] [--solicitudes N] [--data DIR]
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+SRC = BENCH.parent.joinpath('src')
+sys.path.insert(0, str(BENCH))
+# pylint: disable=wrong-import-position
+from bench_capture import DEPARTAMENTOS, OPEN_PERIOD, ZONAS, prepare, token
+
+
+def free_port():
+    """ a port nobody listens on """
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(folder, port, workers, threads):
+    """ starts consad serve and waits until it answers """
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, '-m', 'consad.server', 'serve', '--port', str(port),
+         '--workers', str(workers), '--threads', str(threads), '--instance', str(folder)],
+        env=dict(os.environ, PYTHONPATH=str(SRC)), stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/about/', timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('consad serve did not start')
+
+
+def client(port, client_id, seconds, results):
+    """ logs in as the user of a zona and departamento and repeats the requests """
+    base = f'http://127.0.0.1:{port}'
+    zona = client_id % ZONAS + 1
+    depto = client_id // ZONAS % DEPARTAMENTOS + 1
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    opener.open(f'{base}/login/', f'token={token(zona, depto)}'.encode()).read()
+
+    def post_json(path, body):
+        return urllib.request.Request(f'{base}{path}', json.dumps(body).encode(),
+                                      {'Content-Type': 'application/json'})
+    requests = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for request in (post_json('/solicitudes/get/',
+                                  {'id_zona': zona, 'id_departamento': depto,
+                                   'id_periodo': OPEN_PERIOD, 'page': requests % 5 + 1}),
+                        post_json('/periodo/get/', {}),
+                        f'{base}/solicitudes/capturar/'):
+            with opener.open(request) as response:
+                response.read()
+            requests += 1
+    results.put(requests)
+
+
+def measure(folder, workers, threads, clients, seconds):
+    """ returns the requests per second answered by a number of workers """
+    port = free_port()
+    server = start_server(folder, port, workers, threads)
+    try:
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=client, args=(port, pos, seconds, results))
+                     for pos in range(clients)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        requests = sum(results.get() for _ in processes)
+        wall = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+    return requests / wall
+
+
+def main():
+    """ parses the arguments, runs every worker count and prints the report """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 2)[1])
+    parser.add_argument('--workers', default=None,
+                        help='comma separated worker counts, 1 up to the CPU count')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=None,
+                        help='client processes, twice the largest worker count by default')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--materiales', type=int, default=1000)
+    parser.add_argument('--solicitudes', type=int, default=50000)
+    parser.add_argument('--data', default=None,
+                        help='folder to keep the seeded database between runs')
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(',')]
+    else:
+        counts = sorted({1, *(2 ** power for power in range(cpus.bit_length())), cpus})
+    clients = args.clients or 2 * max(counts)
+
+    with tempfile.TemporaryDirectory() as temporary:
+        folder = Path(args.data or temporary).resolve()
+        prepare(folder, args.materiales, args.solicitudes)
+        print(f'{cpus} CPUs, {clients} clients, {args.threads} threads per worker')
+        print(f'{"workers":>8}{"req/s":>10}{"speedup":>9}{"efficiency":>12}')
+        single = None
+        for workers in counts:
+            rate = measure(folder, workers, args.threads, clients, args.seconds)
+            single = single or rate / workers
+            speedup = rate / single
+            print(f'{workers:>8}{rate:>10.1f}{speedup:>9.2f}{speedup / workers:>12.0%}')
+
+
+if __name__ == '__main__':
+    main()
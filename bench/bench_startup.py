@@ -0,0 +1,120 @@
+"""
+Benchmark of the start of the application and of the work done per page
+
+Every cold start runs in a new interpreter: it times the import of consad,
+create_app and the first request, and lists the heavy modules that were
+loaded on the way. The per request part renders /about/ and the 404 page
+many times and times the urls of the static resources built on every
+render, as before, against the urls built once per application, usage:
+
+    python bench/bench_startup.py [--runs N] [--requests N]
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import argparse
+import json
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent.joinpath('src')
+sys.path.insert(0, str(SRC))
+# pylint: disable=wrong-import-position
+from flask import url_for
+from consad import assets, create_app, utils
+
+# modules the web application should not need to serve requests
+HEAVY_MODULES = ('sqlalchemy', 'data_object', 'mariadb')
+
+COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+from consad import create_app
+imported = time.perf_counter()
+app = create_app(sys.argv[1])
+created = time.perf_counter()
+app.test_client().get('/about/')
+served = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'first_request': served - created,
+                  'loaded': [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def seed(instance):
+    """ creates the configuration and an empty SQLite database """
+    sqlite3.connect(instance.joinpath('database.db')).close()
+    instance.joinpath('config.json').write_text(json.dumps(
+        {'config': 'sqlite', 'secret_key': 'bench',
+         'sqlite': {'driver': 'SQLITE', 'database': 'database.db'}}), encoding='utf-8')
+
+
+def cold_starts(instance, runs):
+    """ starts the application in a new interpreter runs times """
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START, str(instance), *HEAVY_MODULES],
+            env={'PYTHONPATH': str(SRC)}, capture_output=True, check=True, text=True)
+        results.append(json.loads(output.stdout))
+    return results
+
+
+def rebuilt_urls():
+    """ the urls of the static resources as they were built on every render """
+    return {key: url_for('static', filename=filename)
+            for key, filename in assets.STATIC_RESOURCES.items()}
+
+
+def per_request(app, requests):
+    """ returns the mean seconds of the urls and of whole pages """
+    times = {}
+    with app.test_request_context('/about/'):
+        utils.get_res_url()
+        for name, function in (('urls rebuilt', rebuilt_urls),
+                               ('urls cached', utils.get_res_url)):
+            start = time.perf_counter()
+            for _ in range(requests):
+                function()
+            times[name] = (time.perf_counter() - start) / requests
+    client = app.test_client()
+    for path in ('/about/', '/no-existe/'):
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        times[f'GET {path}'] = (time.perf_counter() - start) / requests
+    return times
+
+
+def main():
+    """ prints the cold start and per request timings """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 2)[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        instance = Path(folder)
+        seed(instance)
+        starts = cold_starts(instance, args.runs)
+        print(f'{"cold start":<16}{"median ms":>10}{"max ms":>10}')
+        for step in ('import', 'create_app', 'first_request'):
+            values = [start[step] * 1000 for start in starts]
+            print(f'{step:<16}{statistics.median(values):>10.2f}{max(values):>10.2f}')
+        loaded = sorted({name for start in starts for name in start['loaded']})
+        print(f'heavy modules loaded: {", ".join(loaded) or "none"}')
+
+        times = per_request(create_app(str(instance)), args.requests)
+        print(f'\n{"per request":<16}{"mean us":>10}')
+        for name, seconds in times.items():
+            print(f'{name:<16}{seconds * 1e6:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
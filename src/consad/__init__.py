@@ -7,42 +7,100 @@ main method that contains app factory
 # Fecha: 11/07/2022
 import os
 from pathlib import Path
-import json
-from datetime import datetime
-from flask import Flask, render_template, url_for, session, request, redirect
+from flask import (Flask, render_template, url_for, session, request, redirect, make_response,
+                   jsonify)
+from markupsafe import Markup
 from . import utils
-from . import database_driver
+from . import assets
 from . import config_reader
+from . import connection_pool
+from . import catalog_cache
+from . import http_cache
+from . import pagination
+from . import streaming
+from . import formatters
+from . import reports
+from . import exports
+from . import principals
+from . import sessions
+from . import periodos
+from . import solicitudes
+from . import queries
+from . import metrics
+from . import write_behind
+
+MATERIALES_QUERY = queries.register(
+    'materiales.catalogo', "SELECT m.id_material, gm.nombre, m.precio_unitario, "
+    "m.unidad_medida, m.descripcion FROM materiales AS m "
+    " INNER JOIN grupo AS gm ON(gm.id_grupo=m.id_grupo)")
+
+# paged catalogs, one per catalog page
+MATERIALES_CATALOG = pagination.PagedQuery(
+    {'id': 'm.id_material', 'grupo': 'gm.nombre', 'precio': 'm.precio_unitario',
+     'unidad': 'm.unidad_medida', 'descripcion': 'm.descripcion'},
+    "materiales AS m INNER JOIN grupo AS gm ON(gm.id_grupo=m.id_grupo)",
+    search=('m.id_material', 'gm.nombre', 'm.descripcion'), name='materiales')
+
+GRUPOS_CATALOG = pagination.PagedQuery({'id': 'id_grupo', 'nombre': 'nombre'}, "grupo",
+                                       search=('nombre',), name='grupos')
+
+USUARIOS_CATALOG = pagination.PagedQuery(
+    {'id': 'u.id_usuario', 'nombre': 'u.nombre', 'departamento': 'd.nombre', 'zona': 'z.nombre'},
+    "usuarios AS u "
+    " INNER JOIN departamento AS d ON(d.id_departamento=u.id_departamento)"
+    " INNER JOIN zona AS z ON(z.id_zona=u.id_zona)",
+    search=('u.nombre', 'd.nombre', 'z.nombre'), name='usuarios')
+
+ZONAS_CATALOG = pagination.PagedQuery(
+    {'id': 'z.id_zona', 'nombre': 'z.nombre', 'centrogestor': 'z.centrogestor'},
+    "zona AS z", search=('z.nombre', 'z.centrogestor'), name='zonas')
+
+DEPARTAMENTOS_CATALOG = pagination.PagedQuery(
+    {'id': 'd.id_departamento', 'nombre': 'd.nombre', 'clave': 'd.c_clave'},
+    "departamento AS d", search=('d.nombre', 'd.c_clave'), name='departamentos')
+
+SOLICITUDES_FORMAT = formatters.RowFormatter(
+    formatters.passthrough('Id'), formatters.text('Año'), formatters.passthrough('Material'),
+    formatters.text('Cantidad'), formatters.passthrough('Unidad'),
+    formatters.currency('Precio Unitario'))
+
+PERIODO_FORMAT = formatters.RowFormatter(
+    formatters.passthrough('Id'), formatters.passthrough('Nombre'),
+    formatters.iso_datetime('Inicio'), formatters.iso_datetime('Fin'),
+    formatters.passthrough('Activo'), formatters.passthrough('Editable'))
 
 
 def internal_server_error(error):
     """
     method to handle 500 HTTP errors
     """
-    urls = utils.get_res_url()
-    return render_template('500.html', urls=urls), 500
+    return render_template('500.html'), 500
 
 
 def not_found(error):
     """
     method to handle 404 HTTP errors
     """
-    urls = utils.get_res_url()
-    return render_template('404.html', urls=urls), 404
+    return render_template('404.html'), 404
 
 
-def create_app():
+def create_app(instance_path=None):
     """
-    create and configure the Flask app
+    create and configure the Flask app, instance_path replaces the default
+    instance folder, used by the benchmarks
     """
 
     obj_ds = {}
-    app = Flask(__name__, instance_relative_config=True)
+    app = Flask(__name__, instance_path=instance_path, instance_relative_config=True)
     app.register_error_handler(500, internal_server_error)
     app.register_error_handler(404, not_found)
+    app.context_processor(utils.static_urls)
 
     app.cli.add_command(utils.config_cli)
     app.cli.add_command(utils.database_cli)
+    app.cli.add_command(reports.reports_cli)
+    app.cli.add_command(solicitudes.solicitudes_cli)
+    app.cli.add_command(assets.assets_cli)
 
     with app.app_context():
         # configure_app(Path(app.instance_path).joinpath('config.json').resolve(True))
@@ -51,6 +109,16 @@ def create_app():
         obj_ds = config_reader.configure_app(
             Path(app.instance_path).joinpath('config.json'))
         app.config.from_mapping(config_reader.parse_flask_config(obj_ds))
+    if obj_ds is not None:
+        connection_pool.init_app(app, obj_ds)
+    catalog_cache.init_app(app)
+    principals.init_app(app)
+    sessions.init_app(app, obj_ds)
+    metrics.init_app(app)
+    assets.init_app(app)
+    write_behind.init_app(app)
+    templates_stamp = http_cache.source_stamp(
+        Path(app.root_path).joinpath(app.template_folder))
 
     # ensure the instance folder exists
     try:
@@ -71,27 +139,9 @@ def create_app():
     @app.route('/login/', methods=['POST'])
     def login():
         if request.method == 'POST':
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
-            cur = driver.connection.cursor()
-            query = ("SELECT u.id_usuario, u.nombre, z.id_zona, z.nombre AS zona, "
-                     "d.id_departamento, d.nombre AS departamento "
-                     "FROM usuarios AS u INNER JOIN zona AS z ON(z.id_zona = u.id_zona) "
-                     "INNER JOIN departamento AS d ON(d.id_departamento = u.id_departamento) "
-                     "WHERE u.token=?")
-            params = []
-            params.append(request.form['token'])
-            cur.execute(query, params)
-            if cur.arraysize == 1:
-                row = cur.fetchone()
-                if row is None:
-                    return redirect(url_for('home'))
-                session['userid'] = row[0]
-                session['username'] = row[1]
-                session['zonaid'] = row[2]
-                session['zonaname'] = row[3]
-                session['deptoid'] = row[4]
-                session['deptoname'] = row[5]
+            principal = principals.authenticate(request.form['token'])
+            if principal is not None:
+                principals.start_session(principal)
                 return redirect(url_for('captura_solicitud'))
         return redirect(url_for('home'))
 
@@ -99,119 +149,110 @@ def create_app():
     @app.route('/home/')
     @app.route('/home/<token>')
     def home(token=None):
-        urls = utils.get_res_url()
-        return render_template('welcome.html', tok=token, urls=urls)
+        return render_template('welcome.html', tok=token)
 
     @app.route('/about/')
     def about():
-        urls = utils.get_res_url()
-        return render_template('about.html', urls=urls)
+        return render_template('about.html')
+
+    def fetch_catalog(key, name, params=()):
+        """
+        returns the rows of a catalog, the database is only queried when the
+        catalog is not cached or its version changed
+        """
+        def load():
+            return queries.execute(connection_pool.get_driver(), name, params).fetchall()
+        return catalog_cache.get_cache().get_or_load(key, load)
+
+    def materiales():
+        """ returns the ids of the materials, kept as a set next to their catalog """
+        return catalog_cache.get_cache().get_or_load('materiales_ids', lambda: frozenset(
+            row[0] for row in fetch_catalog('materiales', MATERIALES_QUERY)))
+
+    def periodo_abierto(id_periodo):
+        """
+        checks if a period is active and open now in the period calendar, it
+        does not query the database
+        """
+        return periodos.get_calendar().is_open(id_periodo)
+
+    def render_catalog(key, tipo, cols, query):
+        """
+        renders a page of a catalog, the table is rendered once per catalog
+        version and page, conditional requests with a matching entity tag are
+        answered without touching the database or the template engine. The
+        version only changes with `flask database invalidate-cache`, which
+        must follow any edit made directly in the database
+        """
+        page = query.page_request(request.args)
+        cache = catalog_cache.get_cache()
+        version = cache.version
+        etag = http_cache.make_etag(templates_stamp, key, page.key, version,
+                                    session.get('username'))
+        last_modified = max(cache.last_modified, templates_stamp)
+        if http_cache.is_not_modified(etag):
+            return http_cache.not_modified(etag, last_modified)
+        tabla = cache.get(('fragmento', key, page.key))
+        if tabla is None:
+            cur, total = query.run(connection_pool.get_driver(), page)
+            results = cur.fetchall()
+            if len(results) == 0:
+                results = None
+            tabla = cache.put(('fragmento', key, page.key), Markup(render_template(
+                'catalogo_tabla.html', columnas=cols, claves=query.columns,
+                results=results, pagina=page, total=total)), version)
+        response = make_response(render_template('catalogo.html', tipo=tipo, tabla=tabla,
+                                                 paginado=True))
+        return http_cache.set_validators(response, etag, last_modified)
 
     @app.route('/materiales/')
+    @connection_pool.read_only
     def ver_material():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
             cols = ['id', 'Grupo', 'Precio Unitario', 'Unidad', 'Descripción']
-            query = ("SELECT m.id_material, gm.nombre, m.precio_unitario, "
-                     "m.unidad_medida, m.descripcion FROM materiales AS m "
-                     " INNER JOIN grupo AS gm ON(gm.id_grupo=m.id_grupo);")
-            cur = driver.connection.cursor()
-            cur.execute(query)
-            results = cur.fetchall()
-            if len(results) == 0:
-                results = None
-            return render_template('catalogo.html', tipo='Materiales',
-                                   urls=urls, columnas=cols, results=results)
+            return render_catalog('materiales', 'Materiales', cols, MATERIALES_CATALOG)
         return redirect(url_for('home'))
 
     @app.route('/grupos/')
+    @connection_pool.read_only
     def ver_grupo():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
             cols = ['id', 'Nombre']
-            query = ("SELECT id_grupo, nombre FROM grupo;")
-            cur = driver.connection.cursor()
-            cur.execute(query)
-            results = cur.fetchall()
-            if len(results) == 0:
-                results = None
-            return render_template('catalogo.html', tipo='Grupos de Materiales',
-                                   urls=urls, columnas=cols, results=results)
+            return render_catalog('grupos', 'Grupos de Materiales', cols, GRUPOS_CATALOG)
         return redirect(url_for('home'))
 
     @app.route('/usuarios/')
+    @connection_pool.read_only
     def ver_usuario():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
             cols = ['id', 'Nombre', 'Departamento', 'Zona']
-            query = ("SELECT u.id_usuario, u.nombre, d.nombre, z.nombre FROM usuarios AS u "
-                     " INNER JOIN departamento AS d ON(d.id_departamento=u.id_departamento)"
-                     " INNER JOIN zona AS z ON(z.id_zona=u.id_zona);")
-            cur = driver.connection.cursor()
-            cur.execute(query)
-            results = cur.fetchall()
-            if len(results) == 0:
-                results = None
-            return render_template('catalogo.html', tipo='Usuarios',
-                                   urls=urls, columnas=cols, results=results)
+            return render_catalog('usuarios', 'Usuarios', cols, USUARIOS_CATALOG)
         return redirect(url_for('home'))
 
     @app.route('/zonas/')
+    @connection_pool.read_only
     def ver_zona():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
             cols = ['id', 'Nombre', 'Centro Gestor']
-            query = ("SELECT z.id_zona, z.nombre, z.centrogestor FROM zona AS z;")
-            cur = driver.connection.cursor()
-            cur.execute(query)
-            results = cur.fetchall()
-            if len(results) == 0:
-                results = None
-            return render_template('catalogo.html', tipo='Zonas',
-                                   urls=urls, columnas=cols, results=results)
+            return render_catalog('zonas', 'Zonas', cols, ZONAS_CATALOG)
         return redirect(url_for('home'))
 
     @app.route('/departamentos/')
+    @connection_pool.read_only
     def ver_departamento():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
             cols = ['id', 'Nombre', 'Clave']
-            query = (
-                "SELECT d.id_departamento, d.nombre, d.c_clave FROM departamento AS d;")
-            cur = driver.connection.cursor()
-            cur.execute(query)
-            results = cur.fetchall()
-            if len(results) == 0:
-                results = None
-            return render_template('catalogo.html', tipo='Departamentos',
-                                   urls=urls, columnas=cols, results=results)
+            return render_catalog('departamentos', 'Departamentos', cols, DEPARTAMENTOS_CATALOG)
         return redirect(url_for('home'))
 
     @app.route('/solicitudes/capturar/')
+    @connection_pool.read_only
     def captura_solicitud():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
-            cur = driver.connection.cursor()
-            query = ("SELECT m.id_material, gm.nombre, m.precio_unitario, "
-                     "m.unidad_medida, m.descripcion FROM materiales AS m "
-                     " INNER JOIN grupo AS gm ON(gm.id_grupo=m.id_grupo);")
-            cur.execute(query)
-            mats = cur.fetchall()
+            mats = fetch_catalog('materiales', MATERIALES_QUERY)
             if len(mats) == 0:
                 mats = None
-            return render_template('captura.html', urls=urls, mats=mats)
+            return render_template('captura.html', mats=mats)
         return redirect(url_for('home'))
 
     @app.route('/solicitudes/post/', methods=['POST'])
@@ -223,186 +264,152 @@ def create_app():
                     return '{"success":false}', {"Content-Type": "application/json"}
                 if int(request.form['cantidad']) < 1:
                     return '{"success":false}', {"Content-Type": "application/json"}
-                driver = database_driver.DatabaseDriver(
-                    database_type=obj_ds["driver"], datasource_object=obj_ds)
-                cur = driver.connection.cursor()
-                query = "SELECT descripcion FROM periodo WHERE id_periodo = ? AND activo=1 "
-                query += (" AND (fecha_inicio <= CURRENT_TIMESTAMP "
-                          "AND fecha_fin >= CURRENT_TIMESTAMP)")
-                params = []
-                params.append(request.form['periodo'])
-                cur.execute(query, params)
-                arr = cur.fetchall()
-                if len(arr) == 0:
+                if not periodo_abierto(request.form['periodo']):
                     return '{"success":false}', {"Content-Type": "application/json"}
-                params.clear()
-                params.append(request.form['material'])
-                params.append(session['deptoid'])
-                params.append(request.form['periodo'])
-                params.append(session['zonaid'])
-                query = ("SELECT m.id_material, p.id_periodo, m.descripcion, s.cantidad,"
-                         " m.precio_unitario FROM solicitudes AS s "
-                         " INNER JOIN departamento AS d ON(d.id_departamento=s.id_departamento)"
-                         " INNER JOIN zona AS z ON(z.id_zona=s.id_zona)"
-                         " INNER JOIN materiales AS m ON(m.id_material=s.id_material)"
-                         " INNER JOIN periodo AS p ON(p.id_periodo = s.id_periodo)"
-                         " WHERE s.id_material=? AND s.id_departamento=?"
-                         " AND p.id_periodo=? AND s.id_zona=?")
-                cur.execute(query, params)
-                arr = cur.fetchall()
-                params.clear()
-                params.append(request.form['cantidad'])
-                params.append(request.form['material'])
-                params.append(session['zonaid'])
-                params.append(session['deptoid'])
-                params.append(request.form['periodo'])
-                query = ("INSERT INTO solicitudes(cantidad,id_material,id_zona,"
-                         "id_departamento,id_periodo) "
-                         "VALUES(?, ?, ?, ?, ?);")
-                if len(arr) > 0:
-                    query = ("UPDATE solicitudes SET cantidad=? WHERE id_material=? "
-                             "AND id_zona=? AND id_departamento=? AND id_periodo=?;")
-                cur.execute(query, params)
-                cur.connection.commit()
+                journal = write_behind.get_journal(app)
+                if journal is None:
+                    solicitudes.save(connection_pool.get_driver(), request.form['material'],
+                                     session['zonaid'], session['deptoid'],
+                                     request.form['periodo'], request.form['cantidad'],
+                                     app.config['SUMMARIES'])
+                else:
+                    # the save is acknowledged before it reaches the database,
+                    # so an unknown material is refused here
+                    if request.form['material'] not in materiales():
+                        return '{"success":false}', {"Content-Type": "application/json"}
+                    session[write_behind.SEQ_KEY] = journal.save(
+                        request.form['material'], session['zonaid'], session['deptoid'],
+                        request.form['periodo'], request.form['cantidad'])
+                connection_pool.record_write()
                 return '{"success":true}', {"Content-Type": "application/json"}
             return '{"success":false}', {"Content-Type": "application/json"}
         return '{"success":false}', {"Content-Type": "application/json"}
 
+    @app.route('/solicitudes/importar/', methods=['POST'])
+    def importar_solicitudes():
+        if utils.is_logged_in(session):
+            archivo = request.files.get('archivo')
+            if archivo is None or request.form.get('periodo') is None:
+                return '{"success":false}', {"Content-Type": "application/json"}
+            if not periodo_abierto(request.form['periodo']):
+                return '{"success":false}', {"Content-Type": "application/json"}
+            write_behind.flush_pending(app)
+            importer = solicitudes.SolicitudImport(
+                connection_pool.get_driver(), session['zonaid'], session['deptoid'],
+                request.form['periodo'], app.config['SUMMARIES'])
+            try:
+                result = importer.run(solicitudes.text_stream(archivo.stream))
+            except (solicitudes.ImportFileError, UnicodeDecodeError) as exc:
+                return jsonify({'success': False, 'error': str(exc)})
+            connection_pool.record_write()
+            return jsonify(result.as_dict())
+        return '{"success":false}', {"Content-Type": "application/json"}
+
+    @app.route('/solicitudes/batch/', methods=['POST'])
+    def solicitudes_batch():
+        if utils.is_logged_in(session):
+            kjson = request.json
+            if kjson.get('id_periodo') is None or not periodo_abierto(kjson['id_periodo']):
+                return '{"success":false}', {"Content-Type": "application/json"}
+            materials = materiales()
+            write_behind.flush_pending(app)
+            try:
+                rows, deleted = solicitudes.apply_batch(
+                    connection_pool.get_driver(), session['zonaid'], session['deptoid'],
+                    kjson['id_periodo'], kjson.get('operaciones'), materials,
+                    app.config['SUMMARIES'])
+            except solicitudes.BatchError as exc:
+                return jsonify({'success': False, 'errores': exc.errors})
+            connection_pool.record_write()
+            return jsonify({'success': True, 'id_periodo': kjson['id_periodo'],
+                            'headings': SOLICITUDES_FORMAT.headings,
+                            'data': SOLICITUDES_FORMAT(rows), 'eliminados': deleted})
+        return '{"success":false}', {"Content-Type": "application/json"}
+
     @app.route('/solicitudes/get/', methods=['POST'])
+    @connection_pool.read_only
     def solicitudes_data():
         if utils.is_logged_in(session):
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
-            cur = driver.connection.cursor()
-            where = ""
-            query = ("SELECT m.id_material, p.id_periodo, m.descripcion, s.cantidad,"
-                     " m.unidad_medida, m.precio_unitario FROM solicitudes AS s "
-                     " INNER JOIN departamento AS d ON(d.id_departamento=s.id_departamento)"
-                     " INNER JOIN zona AS z ON(z.id_zona=s.id_zona)"
-                     " INNER JOIN materiales AS m ON(m.id_material=s.id_material)"
-                     " INNER JOIN periodo AS p ON(p.id_periodo = s.id_periodo)")
-            where = " WHERE z.id_zona=? AND d.id_departamento=? AND p.id_periodo=? "
-            params = []
             kjson = request.json
-            params.append(kjson['id_zona'])
-            params.append(kjson['id_departamento'])
-            params.append(kjson['id_periodo'])
-            if params:
-                query += where
-                cur.execute(query, params)
-            else:
-                cur.execute(query)
-            k = cur.fetchall()
-            if len(k) != 0:
-                data = {}
-                temp_params = []
-                for row in k:
-                    temp_row = []
-                    cont = 0
-                    for val in row:
-                        if not isinstance(val, str):
-                            if cont % 6 == 5:
-                                temp_row.append(f'{val:0,.2f}')
-                            else:
-                                temp_row.append(str(val))
-                        else:
-                            temp_row.append(val)
-                        cont += 1
-                    temp_params.append(temp_row)
-                data['headings'] = ['Id', 'Año', 'Material',
-                                    'Cantidad', 'Unidad', 'Precio Unitario']
-                data['data'] = temp_params
-                return json.dumps(data), {"Content-Type": "application/json"}
-            return '{"success":false}', {"Content-Type": "application/json"}
+            journal = write_behind.get_journal(app)
+            if journal is not None:
+                journal.wait(session.get(write_behind.SEQ_KEY))
+            cur, page, total = solicitudes.execute_page(
+                connection_pool.get_driver(), kjson['id_zona'], kjson['id_departamento'],
+                kjson['id_periodo'], kjson)
+            data = {}
+            data['headings'] = SOLICITUDES_FORMAT.headings
+            return streaming.json_response(data, cur, SOLICITUDES_FORMAT,
+                                           tail={'paging': page.as_dict(total)})
         return redirect(url_for('home'))
 
     @app.route('/solicitudes/delete/', methods=['POST'])
     def solicitudes_delete():
         if utils.is_logged_in(session):
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
-            cur = driver.connection.cursor()
-            query = ("DELETE FROM solicitudes WHERE id_zona=? "
-                     "AND id_departamento=? AND id_material=?;")
-            params = []
             kjson = request.json
-            params.append(session['zonaid'])
-            params.append(session['deptoid'])
-            params.append(kjson['id_material'])
-            cur.execute(query, params)
-            cur.connection.commit()
+            journal = write_behind.get_journal(app)
+            if journal is None:
+                solicitudes.delete(connection_pool.get_driver(), session['zonaid'],
+                                   session['deptoid'], kjson['id_material'],
+                                   app.config['SUMMARIES'])
+            else:
+                session[write_behind.SEQ_KEY] = journal.delete(
+                    session['zonaid'], session['deptoid'], kjson['id_material'])
+            connection_pool.record_write()
             return '{"success":true}', {"Content-Type": "application/json"}
         return redirect(url_for('home'))
 
+    @app.route('/reportes/consolidado/', methods=['POST'])
+    @connection_pool.read_only
+    def reporte_consolidado():
+        if utils.is_logged_in(session):
+            driver = connection_pool.get_driver()
+            kjson = request.json
+            try:
+                report = reports.ConsolidatedReport(
+                    driver.database_type,
+                    reports.parse_dimensions(kjson.get('agrupar', reports.DEFAULT_DIMENSIONS)),
+                    kjson, kjson.get('rollup') is not False, app.config['SUMMARIES'])
+            except reports.ReportError:
+                return '{"success":false}', {"Content-Type": "application/json"}
+            cur = report.execute(driver)
+            data = {}
+            data['headings'] = report.headings
+            return streaming.json_response(data, cur, list)
+        return redirect(url_for('home'))
+
+    @app.route('/reportes/exportar/')
+    @connection_pool.read_only
+    def exportar_solicitudes():
+        if utils.is_logged_in(session):
+            try:
+                return exports.response(request.args.get('formato', 'csv'), request.args)
+            except exports.ExportError:
+                return '{"success":false}', {"Content-Type": "application/json"}
+        return redirect(url_for('home'))
+
     @app.route('/periodo/')
+    @connection_pool.read_only
     def periodo_ver():
         if utils.is_logged_in(session):
-            urls = utils.get_res_url()
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
             cols = ['id', 'Nombre', 'Fecha Inicial', 'Fecha Final', 'Activo']
-            query = (
-                "SELECT id_periodo, descripcion, fecha_inicio, fecha_fin, activo FROM periodo;")
-            cur = driver.connection.cursor()
-            cur.execute(query)
+            cur = queries.execute(connection_pool.get_driver(), periodos.CATALOG_QUERY)
             if cur.rowcount == 0:
                 results = None
             else:
                 results = cur.fetchall()
             return render_template('catalogo.html', tipo='Periodos de apertura',
-                                   urls=urls, columnas=cols, results=results)
+                                   columnas=cols, results=results)
         return redirect(url_for('home'))
 
     @app.route('/periodo/get/', methods=['POST', 'GET'])
+    @connection_pool.read_only
     def periodo_get():
         if utils.is_logged_in(session):
-            driver = database_driver.DatabaseDriver(
-                database_type=obj_ds["driver"], datasource_object=obj_ds)
-            cur = driver.connection.cursor()
-            query = ("SELECT id_periodo, descripcion, fecha_inicio, fecha_fin, activo FROM periodo "
-                     " WHERE activo=1")
-            kjson = request.json
-            p_edit = kjson.get('editable')
-            if p_edit is not None:
-                query += (" AND (fecha_inicio > CURRENT_TIMESTAMP "
-                          "OR fecha_fin < CURRENT_TIMESTAMP) ")
-                if p_edit is True:
-                    query += (" AND (fecha_inicio <= CURRENT_TIMESTAMP"
-                              " AND fecha_fin >= CURRENT_TIMESTAMP) ")
-            query += " ORDER BY fecha_inicio DESC;"
-            cur.execute(query)
-            k = cur.fetchall()
-            if len(k) != 0:
-                data = {}
-                temp_params = []
-                for row in k:
-                    temp_row = []
-                    cont = 0
-                    for val in row:
-                        if isinstance(val, datetime):
-                            temp_row.append(val.isoformat())
-                        else:
-                            temp_row.append(val)
-                        cont += 1
-                    fecha_ini = temp_row[-3]
-                    if isinstance(temp_row[-3], str):
-                        fecha_ini = datetime.fromisoformat(temp_row[-3])
-                    fecha_fin = temp_row[-2]
-                    if isinstance(temp_row[-2], str):
-                        fecha_fin = datetime.fromisoformat(temp_row[-2])
-                    fecha_now = datetime.now()
-                    lapse_ini = fecha_fin-fecha_now
-                    lapse_final = fecha_ini-fecha_now
-                    if lapse_final.total_seconds() < 0 and lapse_ini.total_seconds() > 0:
-                        temp_row.append(True)
-                    else:
-                        temp_row.append(False)
-                    temp_params.append(temp_row)
-                data['headings'] = ['Id', 'Nombre',
-                                    'Inicio', 'Fin', 'Activo', 'Editable']
-                data['data'] = temp_params
-                return json.dumps(data), {"Content-Type": "application/json"}
-            return '{"success":false}', {"Content-Type": "application/json"}
+            rows = periodos.get_calendar().rows(request.json.get('editable'))
+            data = {}
+            data['headings'] = PERIODO_FORMAT.headings
+            return streaming.rows_response(data, rows, PERIODO_FORMAT)
         return redirect(url_for('home'))
 
     return app
@@ -0,0 +1,313 @@
+"""
+Provides an ASGI entry point with async versions of the JSON endpoints
+
+The JSON endpoints of the capture page are served by coroutines that wait
+for the database in the event loop, every other route runs the regular
+Flask application in a thread. Serve it with any ASGI server, e.g.:
+
+    uvicorn --factory consad.asgi:create_asgi_app
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, redirect, request, session, url_for
+from flask.ctx import RequestContext
+from . import (create_app, connection_pool, catalog_cache, periodos, queries, solicitudes,
+               streaming, utils, write_behind, MATERIALES_QUERY, SOLICITUDES_FORMAT,
+               PERIODO_FORMAT)
+from .async_pool import AsyncConnectionPool
+
+ASYNC_POOL_KEY = 'consad.async_pool'
+
+# threads running the routes that have no async version
+WSGI_THREADS = 16
+
+FAILURE = ('{"success":false}', {"Content-Type": "application/json"})
+
+
+def get_async_pool():
+    """ returns the async pool of the current application """
+    return current_app.extensions[ASYNC_POOL_KEY]
+
+
+async def get_calendar():
+    """ async version of periodos.get_calendar, the periods are read in the pool """
+    calendar = periodos.current_calendar(current_app)
+    if calendar is None:
+        version = catalog_cache.get_cache().version
+        calendar = periodos.install_calendar(
+            current_app, await get_async_pool().run(periodos.load_calendar, version))
+    return calendar
+
+
+async def get_materiales():
+    """ async version of the materiales helper, the catalog is read in the pool """
+    cache = catalog_cache.get_cache()
+    version = cache.version
+    ids = cache.get('materiales_ids')
+    if ids is None:
+        rows = cache.get('materiales')
+        if rows is None:
+            rows = cache.put('materiales', await get_async_pool().run(
+                lambda driver: queries.execute(driver, MATERIALES_QUERY).fetchall()), version)
+        ids = cache.put('materiales_ids', frozenset(row[0] for row in rows), version)
+    return ids
+
+
+async def solicitudes_data():
+    """ async version of /solicitudes/get/ """
+    if not utils.is_logged_in(session):
+        return redirect(url_for('home'))
+    kjson = request.json
+    journal = write_behind.get_journal(current_app)
+    if journal is not None:
+        # the journal is polled in a thread, not in the event loop
+        await asyncio.to_thread(journal.wait, session.get(write_behind.SEQ_KEY))
+
+    def fetch(driver):
+        cur, page, total = solicitudes.execute_page(driver, kjson['id_zona'],
+                                                    kjson['id_departamento'],
+                                                    kjson['id_periodo'], kjson)
+        return cur.fetchall(), page, total
+    rows, page, total = await get_async_pool().run(
+        fetch, replica=connection_pool.reads_from_replica())
+    return streaming.rows_response({'headings': SOLICITUDES_FORMAT.headings}, rows,
+                                   SOLICITUDES_FORMAT, {'paging': page.as_dict(total)})
+
+
+async def procesar_solicitud():
+    """ async version of /solicitudes/post/ """
+    if not utils.is_logged_in(session):
+        return FAILURE
+    form = request.form
+    if form.get('cantidad') is None or form.get('material') is None or form.get('periodo') is None:
+        return FAILURE
+    if int(form['cantidad']) < 1:
+        return FAILURE
+    if not (await get_calendar()).is_open(form['periodo']):
+        return FAILURE
+    journal = write_behind.get_journal(current_app)
+    if journal is None:
+        await get_async_pool().run(solicitudes.save, form['material'], session['zonaid'],
+                                   session['deptoid'], form['periodo'], form['cantidad'],
+                                   current_app.config['SUMMARIES'])
+    else:
+        # the save is acknowledged before it reaches the database,
+        # so an unknown material is refused here
+        if form['material'] not in await get_materiales():
+            return FAILURE
+        session[write_behind.SEQ_KEY] = await asyncio.to_thread(
+            journal.save, form['material'], session['zonaid'], session['deptoid'],
+            form['periodo'], form['cantidad'])
+    connection_pool.record_write()
+    return '{"success":true}', {"Content-Type": "application/json"}
+
+
+async def solicitudes_delete():
+    """ async version of /solicitudes/delete/ """
+    if not utils.is_logged_in(session):
+        return redirect(url_for('home'))
+    journal = write_behind.get_journal(current_app)
+    if journal is None:
+        await get_async_pool().run(solicitudes.delete, session['zonaid'], session['deptoid'],
+                                   request.json['id_material'], current_app.config['SUMMARIES'])
+    else:
+        session[write_behind.SEQ_KEY] = await asyncio.to_thread(
+            journal.delete, session['zonaid'], session['deptoid'], request.json['id_material'])
+    connection_pool.record_write()
+    return '{"success":true}', {"Content-Type": "application/json"}
+
+
+async def periodo_get():
+    """ async version of /periodo/get/ """
+    if not utils.is_logged_in(session):
+        return redirect(url_for('home'))
+    rows = (await get_calendar()).rows(request.json.get('editable'))
+    return streaming.rows_response({'headings': PERIODO_FORMAT.headings}, rows, PERIODO_FORMAT)
+
+
+# endpoints of the Flask application replaced by a coroutine
+ASYNC_VIEWS = {
+    'solicitudes_data': solicitudes_data,
+    'procesar_solicitud': procesar_solicitud,
+    'solicitudes_delete': solicitudes_delete,
+    'periodo_get': periodo_get,
+}
+
+
+def build_environ(scope, body):
+    """ translates an ASGI http scope into a WSGI environ """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        # the body is read completely before the application runs
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'content-length':
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+def _headers(headers):
+    return [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+class AsgiApplication():
+    """
+    ASGI application over a Flask application, requests to the endpoints in
+    ASYNC_VIEWS are answered by their coroutine inside a Flask request
+    context, any other request runs the WSGI application in a thread
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.async_pool = AsyncConnectionPool(app.extensions[connection_pool.POOL_KEY],
+                                              app.config['DRIVER'],
+                                              app.extensions.get(connection_pool.REPLICAS_KEY))
+        app.extensions[ASYNC_POOL_KEY] = self.async_pool
+        self.routes = {}
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint in ASYNC_VIEWS and 'POST' in rule.methods:
+                self.routes[rule.rule] = ASYNC_VIEWS[rule.endpoint]
+        self.__executor = ThreadPoolExecutor(max_workers=WSGI_THREADS,
+                                             thread_name_prefix='consad-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.__lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        environ = build_environ(scope, bytes(body))
+        view = self.routes.get(scope['path']) if scope['method'] == 'POST' else None
+        if view is None:
+            await self.__wsgi(environ, send)
+        else:
+            await self.__async_view(view, environ, send)
+
+    async def __lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.async_pool.close()
+                self.__executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __blocking(self, function, *args):
+        """
+        runs a step of a request that may wait for the database in a thread,
+        it sees the Flask contexts of the task through a copy of its context
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor, context.run, function, *args)
+
+    def __preprocess(self):
+        response = self.app.preprocess_request()
+        # the connection used by the before request functions goes back to
+        # the pool, the view gets its own from the async pool
+        connection_pool.release_driver()
+        return response
+
+    def __finish(self, response):
+        return self.app.process_response(self.app.make_response(response))
+
+    async def __async_view(self, view, environ, send):
+        # flask keeps its contexts in context variables, so a context pushed
+        # by this task is not seen by the other requests of the event loop.
+        # Opening and saving the session and the before request functions,
+        # which read the principal, run in threads: none of them blocks the
+        # event loop while it waits for a connection
+        request_ = self.app.request_class(environ)
+        request_.json_module = self.app.json
+        session_interface = self.app.session_interface
+        session_ = await self.__blocking(session_interface.open_session, self.app, request_)
+        if session_ is None:
+            session_ = session_interface.make_null_session(self.app)
+        ctx = RequestContext(self.app, environ, request_, session_)
+        ctx.push()
+        error = None
+        try:
+            try:
+                response = await self.__blocking(self.__preprocess)
+                if response is None:
+                    response = await view()
+                response = await self.__blocking(self.__finish, response)
+            except Exception as exc:  # pylint: disable=broad-except
+                error = exc
+                response = await self.__blocking(self.app.handle_exception, exc)
+            await send({'type': 'http.response.start', 'status': response.status_code,
+                        'headers': _headers(response.headers.items())})
+            await send({'type': 'http.response.body', 'body': response.get_data()})
+        finally:
+            ctx.pop(error)
+
+    async def __wsgi(self, environ, send):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):  # pylint: disable=unused-argument
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        def next_chunk(chunks):
+            for chunk in chunks:
+                if chunk:
+                    return chunk
+            return None
+
+        result = await loop.run_in_executor(self.__executor, self.app.wsgi_app, environ,
+                                            start_response)
+        try:
+            chunks = iter(result)
+            first = await loop.run_in_executor(self.__executor, next_chunk, chunks)
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': _headers(started['headers'])})
+            chunk = first
+            while chunk is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.__executor, next_chunk, chunks)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.__executor, result.close)
+
+
+def create_asgi_app(app=None):
+    """ wraps the application created by create_app, or the given one, for ASGI servers """
+    return AsgiApplication(app if app is not None else create_app())
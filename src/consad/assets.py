@@ -0,0 +1,194 @@
+"""
+Provides the build and the serving of the hashed static assets
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+
+assets_cli = AppGroup('assets')
+
+ASSETS_KEY = 'consad.assets'
+
+# built files live one level under static, like css/ and js/, so the
+# relative urls of the stylesheets keep pointing to ../img and ../font
+BUILD_FOLDER = 'dist'
+MANIFEST = 'manifest.json'
+
+# static resources used by the templates, by their key in urls
+STATIC_RESOURCES = {
+    'topcoat': 'css/topcoat-desktop-dark.css',
+    'compras': 'css/compras.css',
+    'flexbox': 'css/flexboxgrid.min.css',
+    'bvselect_js': 'js/bvselect.js',
+    'bvselect_css': 'css/bvselect.css',
+    'simple_table_css': 'css/style.css',
+    'simple_table_module': 'js/module.js',
+}
+
+# stylesheets linked by every page, served as one bundle once built
+STYLESHEETS = ('topcoat', 'compras', 'flexbox')
+STYLESHEETS_KEY = 'estilos'
+
+# a built file never changes its content, browsers may keep it for a year
+MAX_AGE = 365 * 24 * 3600
+
+# encodings pre-generated by the build, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+SOURCE_MAP = re.compile(r'^//# sourceMappingURL=(\S+)$', re.MULTILINE)
+
+
+def _compact_css(text):
+    """ drops the comments, indentation and blank lines of a stylesheet """
+    text = COMMENT.sub('', text)
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip()) + '\n'
+
+
+def _hashed_name(name, content):
+    stem, suffix = name.rsplit('.', 1)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}.{suffix}'
+
+
+def _compress(path, content):
+    """ writes the gzip and, with the brotli package installed, brotli variants """
+    path.with_name(path.name + '.gz').write_bytes(gzip.compress(content, 9, mtime=0))
+    try:
+        import brotli  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return
+    path.with_name(path.name + '.br').write_bytes(brotli.compress(content))
+
+
+def build(static_folder):
+    """
+    bundles the stylesheets of every page, copies the other resources of
+    the templates and writes them under content hashed names with their
+    compressed variants, returns the manifest of the built files
+    """
+    static_folder = Path(static_folder)
+    target = static_folder.joinpath(BUILD_FOLDER)
+    if target.exists():
+        shutil.rmtree(target)
+    target.mkdir()
+    files = {}
+    bundle = ''.join(_compact_css(static_folder.joinpath(STATIC_RESOURCES[key]).read_text(
+        encoding='utf-8')) for key in STYLESHEETS)
+    files[STYLESHEETS_KEY] = ('estilos.css', bundle.encode('utf-8'))
+    for key, filename in STATIC_RESOURCES.items():
+        if key in STYLESHEETS:
+            continue
+        source = static_folder.joinpath(filename)
+        content = source.read_text(encoding='utf-8')
+        if source.suffix == '.css':
+            content = _compact_css(content)
+        else:
+            # source maps stay next to the original script
+            content = SOURCE_MAP.sub(
+                lambda match, folder=source.parent.name: (
+                    f'//# sourceMappingURL=../{folder}/{match.group(1)}'), content)
+        files[key] = (source.name, content.encode('utf-8'))
+    manifest = {}
+    for key, (name, content) in files.items():
+        path = target.joinpath(_hashed_name(name, content))
+        path.write_bytes(content)
+        _compress(path, content)
+        manifest[key] = f'{BUILD_FOLDER}/{path.name}'
+    target.joinpath(MANIFEST).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return manifest
+
+
+def load_manifest(static_folder):
+    """ returns the manifest of the last build, None when assets are not built """
+    path = Path(static_folder).joinpath(BUILD_FOLDER, MANIFEST)
+    if not path.is_file():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def static_files(app):
+    """
+    returns the file under static of every resource key, the stylesheets of
+    every page are a tuple: the bundle once built, the sources otherwise
+    """
+    manifest = app.extensions.get(ASSETS_KEY)
+    if manifest is None:
+        files = dict(STATIC_RESOURCES)
+        files[STYLESHEETS_KEY] = tuple(STATIC_RESOURCES[key] for key in STYLESHEETS)
+        return files
+    files = {key: manifest.get(key, filename) for key, filename in STATIC_RESOURCES.items()}
+    files[STYLESHEETS_KEY] = (manifest[STYLESHEETS_KEY],)
+    return files
+
+
+def serve_built(filename):
+    """
+    serves a built file, the pre-compressed variant the client accepts is
+    sent when there is one, with headers to keep it cached for a year
+    """
+    folder = Path(current_app.static_folder).joinpath(BUILD_FOLDER)
+    name = Path(filename).name
+    encoding = None
+    for candidate, suffix in ENCODINGS:
+        if (request.accept_encodings[candidate]
+                and folder.joinpath(name + suffix).is_file()):
+            encoding = candidate
+            name = name + suffix
+            break
+    response = send_from_directory(folder, name, mimetype=_mimetype(filename),
+                                   max_age=MAX_AGE)
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _mimetype(filename):
+    if filename.endswith('.css'):
+        return 'text/css'
+    if filename.endswith('.js'):
+        return 'text/javascript'
+    return None
+
+
+def init_app(app):
+    """
+    uses the built assets when `flask assets build` was run, they are served
+    by their own route, more specific than the static one
+    """
+    manifest = load_manifest(app.static_folder)
+    if manifest is None:
+        return None
+    app.extensions[ASSETS_KEY] = manifest
+    app.add_url_rule(f'{app.static_url_path}/{BUILD_FOLDER}/<path:filename>', 'assets',
+                     serve_built)
+    return manifest
+
+
+@assets_cli.command('build')
+def build_assets():
+    """
+    Bundles, hashes and compresses the static resources of the templates
+    """
+    manifest = build(current_app.static_folder)
+    for key, filename in manifest.items():
+        print(f'{key}: {filename}')
+
+
+@assets_cli.command('clean')
+def clean_assets():
+    """
+    Deletes the built assets, the templates use the sources again
+    """
+    shutil.rmtree(Path(current_app.static_folder).joinpath(BUILD_FOLDER), ignore_errors=True)
@@ -0,0 +1,64 @@
+"""
+Provides an asyncio interface to the pooled database connections
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from . import database_driver
+
+
+class AsyncConnectionPool():
+    """
+    Runs database work for coroutines. The drivers of the application are
+    blocking, so every call is executed by a thread of its own executor,
+    with as many threads as connections in the wrapped ConnectionPool.
+    Coroutines wait for a free connection in the event loop instead of
+    holding a thread, so a process serves many clients with a few threads.
+    With a ReplicaSet, calls made with replica=True use the read replicas.
+    """
+
+    def __init__(self, pool, database_type, replicas=None):
+        self.__pool = pool
+        self.__replicas = replicas
+        self.__database_type = database_type
+        size = pool.size + (replicas.size if replicas is not None else 0)
+        self.__executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='consad-db')
+        self.__slots = {}
+
+    @property
+    def database_type(self):
+        """ database type of the wrapped pool """
+        return self.__database_type
+
+    def __semaphore(self, pool):
+        # asyncio primitives belong to the loop that created them
+        key = (asyncio.get_running_loop(), pool is self.__pool)
+        semaphore = self.__slots.get(key)
+        if semaphore is None:
+            semaphore = self.__slots[key] = asyncio.Semaphore(pool.size)
+        return semaphore
+
+    def __call(self, pool, function, args):
+        driver = database_driver.DatabaseDriver(database_type=self.__database_type, pool=pool)
+        try:
+            return function(driver, *args)
+        finally:
+            driver.close()
+
+    async def run(self, function, *args, replica=False):
+        """
+        calls function(driver, *args) in a worker thread with a driver holding
+        a pooled connection, the connection is checked in when it returns
+        """
+        pool = self.__replicas if replica and self.__replicas is not None else self.__pool
+        async with self.__semaphore(pool):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.__executor, self.__call, pool, function,
+                                              args)
+
+    def close(self):
+        """ stops the worker threads, the wrapped pool is left open """
+        self.__executor.shutdown(wait=True)
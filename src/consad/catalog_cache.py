@@ -0,0 +1,188 @@
+"""
+Provides an in-process cache for the catalogs of the application
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from flask import current_app
+
+CACHE_KEY = 'consad.catalog_cache'
+VERSION_FILE = 'catalog.version'
+
+# caches of this process, emptied in a forked child
+_caches = weakref.WeakSet()
+
+
+def estimate_size(value):
+    """ rough estimation in bytes of the memory held by a cached value """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, frozenset)):
+        for item in value:
+            if isinstance(item, (list, tuple)):
+                size += sys.getsizeof(item) + sum(sys.getsizeof(val) for val in item)
+            else:
+                size += sys.getsizeof(item)
+    return size
+
+
+class CatalogCache():
+    """
+    LRU cache with time to live, every entry is stamped with the catalog
+    version and becomes stale as soon as the version changes. The version is
+    kept in a file so any process (workers or the flask CLI) can bust it.
+    """
+
+    def __init__(self, version_file, ttl=300, max_bytes=32 * 1024 * 1024):
+        self.__version_file = Path(version_file)
+        self.__ttl = ttl
+        self.__max_bytes = max_bytes
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.RLock()
+        self.__stamp = None
+        self.__version = 0
+        self.__modified = 0.0
+        self.__stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        _caches.add(self)
+
+    @property
+    def version(self):
+        """ returns the current catalog version """
+        try:
+            stat = os.stat(self.__version_file)
+        except FileNotFoundError:
+            return self.__version
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self.__stamp:
+            with self.__lock:
+                try:
+                    self.__version = int(self.__version_file.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    self.__version = stat.st_mtime_ns
+                self.__modified = stat.st_mtime
+                self.__stamp = stamp
+        return self.__version
+
+    @property
+    def last_modified(self):
+        """ returns the timestamp of the last catalog change, 0 if it never changed """
+        self.version  # pylint: disable=pointless-statement
+        return self.__modified
+
+    @property
+    def stats(self):
+        """ returns a snapshot of the cache counters """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats['entries'] = len(self.__entries)
+            stats['bytes'] = self.__bytes
+            stats['version'] = self.__version
+        return stats
+
+    def get(self, key, default=None):
+        """ returns a cached value, or default when missing or stale """
+        version = self.version
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if entry[0] == version and entry[1] > time.monotonic():
+                    self.__entries.move_to_end(key)
+                    self.__stats['hits'] += 1
+                    return entry[3]
+                self.__stats['expirations'] += 1
+                self.__discard(key)
+            self.__stats['misses'] += 1
+        return default
+
+    def put(self, key, value, version=None):
+        """ stores a value stamped with the given or current version """
+        if version is None:
+            version = self.version
+        size = estimate_size(value)
+        if size > self.__max_bytes:
+            return value
+        with self.__lock:
+            if key in self.__entries:
+                self.__discard(key)
+            self.__entries[key] = (version, time.monotonic() + self.__ttl, size, value)
+            self.__bytes += size
+            while self.__bytes > self.__max_bytes:
+                oldest = next(iter(self.__entries))
+                self.__discard(oldest)
+                self.__stats['evictions'] += 1
+        return value
+
+    def get_or_load(self, key, loader):
+        """ returns the cached value, calling loader to fill the cache on a miss """
+        version = self.version
+        value = self.get(key)
+        if value is None:
+            # stamped with the version seen before loading, so a concurrent
+            # invalidation is never hidden by an older result
+            value = self.put(key, loader(), version)
+        return value
+
+    def invalidate(self):
+        """ increments the catalog version, making every entry stale """
+        with self.__lock:
+            version = self.version + 1
+            temp = self.__version_file.with_suffix('.tmp')
+            temp.write_text(str(version), encoding='utf-8')
+            os.replace(temp, self.__version_file)
+            self.clear()
+        return self.version
+
+    def clear(self):
+        """ drops every entry of this process """
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    def after_fork(self):
+        """
+        starts the cache again in a forked child, the lock may have been held
+        by a thread of the parent and the entries loaded by the parent are
+        dropped, so the child reads its catalogs again
+        """
+        self.__lock = threading.RLock()
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__stamp = None
+        self.__stats = dict.fromkeys(self.__stats, 0)
+
+    def __discard(self, key):
+        entry = self.__entries.pop(key)
+        self.__bytes -= entry[2]
+
+
+def _after_fork():
+    for cache in list(_caches):
+        cache.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def init_app(app):
+    """
+    creates the catalog cache of the application
+    """
+    cache = CatalogCache(Path(app.instance_path).joinpath(VERSION_FILE),
+                         ttl=app.config.get('CATALOG_CACHE_TTL', 300),
+                         max_bytes=app.config.get('CATALOG_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.extensions[CACHE_KEY] = cache
+    return cache
+
+
+def get_cache():
+    """ returns the catalog cache of the current application """
+    return current_app.extensions[CACHE_KEY]
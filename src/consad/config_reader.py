@@ -10,6 +10,9 @@ import json
 from flask import current_app
 from . import database_driver
 
+# data source keys a replica inherits from the primary
+REPLICA_DEFAULTS = ('database', 'username', 'password', 'port', 'server')
+
 
 def configure_app(file):
     """
@@ -30,11 +33,26 @@ def configure_app(file):
                 subconf['database'] = Path(current_app.instance_path).joinpath(subconf['database'])
             if subconf["driver"] == 'MARIADB':
                 subconf["driver"] = database_driver.DatabaseType.MARIADB
+            subconf['replicas'] = [replica_source(subconf, replica)
+                                   for replica in subconf.get('replicas', [])]
         else:
             subconf["driver"] = database_driver.DatabaseType.NONE
     return subconf
 
 
+def replica_source(subconf, replica):
+    """
+    returns the data source of a read replica, the keys missing in the
+    replica entry (credentials, database name) are taken from the primary
+    """
+    source = {key: subconf[key] for key in REPLICA_DEFAULTS if key in subconf}
+    source.update(replica)
+    source['driver'] = subconf['driver']
+    if subconf['driver'] == database_driver.DatabaseType.SQLITE:
+        source['database'] = Path(current_app.instance_path).joinpath(source['database'])
+    return source
+
+
 def parse_flask_config(subconfig):
     """
     Loads the config object into Flask distionary to run the web app
@@ -53,4 +71,27 @@ def parse_flask_config(subconfig):
         config["PORT"] = subconfig['port']
         config["SERVER"] = subconfig['server']
     config["SECRET_KEY"] = subconfig['secret_key']
+    config["POOL_SIZE"] = int(subconfig.get('pool_size', 5))
+    config["POOL_MAX_LIFETIME"] = int(subconfig.get('pool_max_lifetime', 3600))
+    config["POOL_TIMEOUT"] = int(subconfig.get('pool_timeout', 30))
+    config["SUMMARIES"] = bool(subconfig.get('summaries', False))
+    config["CATALOG_CACHE_TTL"] = int(subconfig.get('catalog_cache_ttl', 300))
+    config["CATALOG_CACHE_MAX_BYTES"] = int(subconfig.get('catalog_cache_max_bytes',
+                                                          32 * 1024 * 1024))
+    config["PRINCIPAL_CACHE_TTL"] = int(subconfig.get('principal_cache_ttl', 60))
+    config["PERIOD_CALENDAR_TTL"] = int(subconfig.get('period_calendar_ttl', 300))
+    config["SESSION_STORE"] = subconfig.get('session_store', 'cookie')
+    config["SESSION_POOL_SIZE"] = int(subconfig.get('session_pool_size', config["POOL_SIZE"]))
+    config["REPLICA_RETRY"] = int(subconfig.get('replica_retry', 30))
+    config["READ_YOUR_WRITES"] = int(subconfig.get('read_your_writes', 10))
+    config["METRICS"] = bool(subconfig.get('metrics', False))
+    config["METRICS_TOKEN"] = subconfig.get('metrics_token')
+    config["METRICS_DIR"] = subconfig.get('metrics_dir', 'metrics')
+    config["METRICS_FLUSH"] = float(subconfig.get('metrics_flush', 1.0))
+    config["SLOW_QUERY_MS"] = float(subconfig.get('slow_query_ms', 0))
+    config["SLOW_QUERY_LOG"] = subconfig.get('slow_query_log')
+    config["SQL_ECHO"] = bool(subconfig.get('sql_echo', False))
+    config["WRITE_BEHIND"] = bool(subconfig.get('write_behind', False))
+    config["WRITE_BEHIND_INTERVAL"] = float(subconfig.get('write_behind_interval', 0.2))
+    config["WRITE_BEHIND_BATCH"] = int(subconfig.get('write_behind_batch', 1000))
     return config
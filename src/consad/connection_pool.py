@@ -0,0 +1,449 @@
+"""
+Provides a bounded pool of database connections shared by the application
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import itertools
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from flask import current_app, g, has_request_context, request, session
+from . import database_driver
+
+POOL_KEY = 'consad.pool'
+REPLICAS_KEY = 'consad.replicas'
+
+# session key with the time of the last write of the user
+WRITE_KEY = 'ultima_escritura'
+
+# every pool of the process, reset in the child after a fork
+_pools = weakref.WeakSet()
+
+# connections inherited from the parent process, kept referenced so they
+# are never closed by the child, which would end the session of the parent.
+# They are released when the child exits; the pre-fork server calls
+# close_idle before every fork, so its workers inherit none
+_inherited = []
+
+
+class PoolTimeout(Exception):
+    """ raised when no connection is released before the checkout timeout """
+
+
+class PooledConnection():
+    """
+    Proxy to a raw connection, closing it returns the connection to its pool
+    """
+    __slots__ = ('_pool', '_raw', '_created', '_checked_out', '_statements')
+
+    def __init__(self, pool, raw):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, '_created', time.monotonic())
+        object.__setattr__(self, '_checked_out', False)
+        object.__setattr__(self, '_statements', {})
+
+    @property
+    def raw(self):
+        """ returns the underlying DB-API connection """
+        return self._raw
+
+    @property
+    def statements(self):
+        """ cursors of the named queries executed on this connection """
+        return self._statements
+
+    @property
+    def age(self):
+        """ seconds since the raw connection was opened """
+        return time.monotonic() - self._created
+
+    def close(self):
+        """ gives the connection back to the pool instead of closing it """
+        if self._checked_out:
+            self._pool.checkin(self)
+
+    def cursor(self, *args, **kwargs):
+        """ returns a cursor of the raw connection, instrumented when the pool is observed """
+        cursor = self._raw.cursor(*args, **kwargs)
+        observer = self._pool.observer
+        return cursor if observer is None else observer.cursor(cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        if name in PooledConnection.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+
+class ConnectionPool():
+    """
+    Thread safe pool of connections with a fixed upper bound, connections are
+    validated on checkout and recycled once they exceed max_lifetime seconds.
+    An observer, when set, wraps the cursors and is told the checkout waits.
+    """
+    observer = None
+
+    def __init__(self, factory, size=5, max_lifetime=3600, timeout=30, ping=None):
+        if size < 1:
+            raise ValueError('pool size must be at least 1')
+        self.__factory = factory
+        self.__ping = ping
+        self.__size = size
+        self.__max_lifetime = max_lifetime
+        self.__timeout = timeout
+        self.__idle = deque()
+        self.__opened = 0
+        self.__closed = False
+        self.__cond = threading.Condition()
+        self.__stats = {'created': 0, 'recycled': 0, 'failed_checks': 0,
+                        'checkouts': 0, 'waits': 0, 'timeouts': 0}
+        _pools.add(self)
+
+    @property
+    def size(self):
+        """ maximum number of connections the pool will open """
+        return self.__size
+
+    @property
+    def stats(self):
+        """ returns a snapshot of the pool counters """
+        with self.__cond:
+            stats = dict(self.__stats)
+            stats['size'] = self.__size
+            stats['opened'] = self.__opened
+            stats['idle'] = len(self.__idle)
+            stats['in_use'] = self.__opened - len(self.__idle)
+        return stats
+
+    def checkout(self):
+        """
+        returns a connection from the pool, opening a new one while the pool
+        is below its size and waiting up to timeout seconds otherwise
+        """
+        if self.observer is None:
+            return self.__checkout()
+        start = time.perf_counter()
+        conn = self.__checkout()
+        self.observer.on_checkout(time.perf_counter() - start)
+        return conn
+
+    def __checkout(self):
+        deadline = time.monotonic() + self.__timeout
+        conn = None
+        with self.__cond:
+            while True:
+                if self.__closed:
+                    raise PoolTimeout('the connection pool is closed')
+                if self.__idle:
+                    conn = self.__idle.pop()
+                    break
+                if self.__opened < self.__size:
+                    self.__opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.__stats['timeouts'] += 1
+                    raise PoolTimeout(f'no connection available after {self.__timeout}s')
+                self.__stats['waits'] += 1
+                self.__cond.wait(remaining)
+            self.__stats['checkouts'] += 1
+        if conn is not None:
+            if self.__is_usable(conn):
+                object.__setattr__(conn, '_checked_out', True)
+                return conn
+            self.__close_raw(conn)
+        # the slot reserved above is either reused or given back on failure
+        try:
+            conn = PooledConnection(self, self.__factory())
+        except Exception:
+            with self.__cond:
+                self.__opened -= 1
+                self.__cond.notify()
+            raise
+        with self.__cond:
+            self.__stats['created'] += 1
+        object.__setattr__(conn, '_checked_out', True)
+        return conn
+
+    def checkin(self, conn):
+        """ returns a connection to the pool, discarding it when it is stale """
+        object.__setattr__(conn, '_checked_out', False)
+        keep = not self.__closed and conn.age < self.__max_lifetime
+        if keep:
+            try:
+                conn.raw.rollback()
+            except Exception:  # pylint: disable=broad-except
+                keep = False
+        if not keep:
+            self.__close_raw(conn)
+        with self.__cond:
+            if keep:
+                self.__idle.append(conn)
+            else:
+                self.__opened -= 1
+            self.__cond.notify()
+
+    def close(self):
+        """ closes every idle connection and refuses further checkouts """
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+        self.close_idle()
+
+    def close_idle(self):
+        """ closes the idle connections, the pool opens new ones on demand """
+        with self.__cond:
+            idle = list(self.__idle)
+            self.__idle.clear()
+            self.__opened -= len(idle)
+        for conn in idle:
+            self.__close_raw(conn)
+
+    def after_fork(self):
+        """
+        starts the pool again in a forked child, the connections of the
+        parent are left open for it and new ones are opened on demand
+        """
+        _inherited.extend(self.__idle)
+        self.__idle = deque()
+        self.__opened = 0
+        self.__cond = threading.Condition()
+        self.__stats = dict.fromkeys(self.__stats, 0)
+
+    def __is_usable(self, conn):
+        if conn.age >= self.__max_lifetime:
+            with self.__cond:
+                self.__stats['recycled'] += 1
+            return False
+        if self.__ping is None:
+            return True
+        try:
+            if self.__ping(conn.raw) is not False:
+                return True
+        except Exception:  # pylint: disable=broad-except
+            pass
+        with self.__cond:
+            self.__stats['failed_checks'] += 1
+        return False
+
+    @staticmethod
+    def __close_raw(conn):
+        try:
+            conn.raw.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+class ReplicaSet():
+    """
+    Pools of the read replicas used in round robin. A replica that fails to
+    give a connection is skipped for retry seconds, when no replica is
+    available the connection comes from the primary pool. It has the
+    checkout interface of ConnectionPool, so a DatabaseDriver can be created
+    over it.
+    """
+
+    def __init__(self, primary, replicas, retry=30):
+        self.__primary = primary
+        self.__replicas = list(replicas)
+        self.__retry = retry
+        self.__down_until = [0.0] * len(self.__replicas)
+        self.__turn = itertools.count()
+        self.__lock = threading.Lock()
+        self.__stats = {'replica_checkouts': 0, 'failovers': 0, 'primary_fallbacks': 0}
+
+    @property
+    def pools(self):
+        """ pools of the replicas, in configuration order """
+        return list(self.__replicas)
+
+    @property
+    def size(self):
+        """ connections the replicas can open together """
+        return sum(pool.size for pool in self.__replicas)
+
+    @property
+    def stats(self):
+        """ returns a snapshot of the routing counters and the replicas that are down """
+        now = time.monotonic()
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats['down'] = [index for index, until in enumerate(self.__down_until)
+                             if until > now]
+        stats['replicas'] = [pool.stats for pool in self.__replicas]
+        return stats
+
+    def __count(self, name):
+        with self.__lock:
+            self.__stats[name] += 1
+
+    def __candidates(self):
+        # every replica is tried once, starting with the next one in turn
+        start = next(self.__turn)
+        now = time.monotonic()
+        for offset in range(len(self.__replicas)):
+            index = (start + offset) % len(self.__replicas)
+            if self.__down_until[index] <= now:
+                yield index
+
+    def checkout(self):
+        """
+        returns a connection of the next healthy replica, falling back to the
+        primary when every replica is down or exhausted
+        """
+        for index in self.__candidates():
+            try:
+                conn = self.__replicas[index].checkout()
+            except PoolTimeout:
+                continue
+            except Exception:  # pylint: disable=broad-except
+                with self.__lock:
+                    self.__down_until[index] = time.monotonic() + self.__retry
+                    self.__stats['failovers'] += 1
+                continue
+            self.__count('replica_checkouts')
+            return conn
+        self.__count('primary_fallbacks')
+        return self.__primary.checkout()
+
+    def close(self):
+        """ closes the pools of every replica """
+        for pool in self.__replicas:
+            pool.close()
+
+
+def close_idle():
+    """ closes the idle connections of every pool of this process, called before a fork """
+    for pool in list(_pools):
+        pool.close_idle()
+
+
+def _after_fork():
+    for pool in list(_pools):
+        pool.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def create_pool(app, data_source, size=None):
+    """
+    returns a pool of connections to a data source with the settings of the
+    application, of POOL_SIZE connections unless size is given
+    """
+    database_type = data_source['driver']
+
+    def factory():
+        driver = database_driver.DatabaseDriver(
+            database_type=database_type, datasource_object=data_source)
+        if driver.connection is None:
+            raise ConnectionError('unable to open a database connection')
+        return driver.connection
+
+    return ConnectionPool(factory,
+                          size=size or app.config.get('POOL_SIZE', 5),
+                          max_lifetime=app.config.get('POOL_MAX_LIFETIME', 3600),
+                          timeout=app.config.get('POOL_TIMEOUT', 30),
+                          ping=database_driver.DatabaseDriver.ping_function(database_type))
+
+
+def init_app(app, data_source):
+    """
+    creates the application pool, and the replica set when the configuration
+    lists read replicas, and ties connection checkin to app teardown
+    """
+    pool = create_pool(app, data_source)
+    app.extensions[POOL_KEY] = pool
+    if data_source.get('replicas'):
+        app.extensions[REPLICAS_KEY] = ReplicaSet(
+            pool, [create_pool(app, replica) for replica in data_source['replicas']],
+            retry=app.config.get('REPLICA_RETRY', 30))
+    app.teardown_appcontext(release_driver)
+    return pool
+
+
+def close_pools(app):
+    """ closes the idle connections of the pools of an application """
+    pool = app.extensions.get(POOL_KEY)
+    if pool is not None:
+        pool.close()
+    replicas = app.extensions.get(REPLICAS_KEY)
+    if replicas is not None:
+        replicas.close()
+
+
+def get_pool():
+    """ returns the pool of the current application """
+    return current_app.extensions[POOL_KEY]
+
+
+def get_replicas():
+    """ returns the replica set of the current application, None without replicas """
+    return current_app.extensions.get(REPLICAS_KEY)
+
+
+def read_only(view):
+    """
+    marks a view that only reads, its queries may be answered by a replica
+    """
+    view.read_only = True
+    return view
+
+
+def record_write():
+    """
+    remembers that the user of the session wrote, its reads stay on the
+    primary for READ_YOUR_WRITES seconds so replica lag never hides them
+    """
+    if get_replicas() is not None:
+        session[WRITE_KEY] = time.time()
+
+
+def reads_from_replica():
+    """ tells if the reads of the current session may go to a replica """
+    if get_replicas() is None:
+        return False
+    last_write = session.get(WRITE_KEY)
+    return last_write is None or \
+        time.time() - last_write > current_app.config.get('READ_YOUR_WRITES', 10)
+
+
+def get_driver():
+    """
+    returns the driver of the current app context, the pooled connection is
+    checked out on first use and checked in when the context is torn down.
+    Requests to views marked read_only are served by a replica.
+    """
+    if 'db_driver' not in g:
+        pool = get_pool()
+        if has_request_context() and reads_from_replica():
+            view = current_app.view_functions.get(request.endpoint)
+            if getattr(view, 'read_only', False):
+                pool = get_replicas()
+        g.db_driver = database_driver.DatabaseDriver(
+            database_type=current_app.config['DRIVER'], pool=pool)
+    return g.db_driver
+
+
+def detach_driver():
+    """
+    takes the driver out of the app context so it outlives the request, used
+    by streamed responses, the caller is responsible for closing it
+    """
+    return g.pop('db_driver', None)
+
+
+def release_driver(exc=None):  # pylint: disable=unused-argument
+    """ returns the connection of the current app context to the pool """
+    driver = g.pop('db_driver', None)
+    if driver is not None:
+        driver.close()
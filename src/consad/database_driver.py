@@ -6,9 +6,12 @@ provides an standarized interface to multiple database engines
 # Autor: Rafael Amador Galván
 # Fecha: 11/07/2022
 import enum
+import importlib
+import logging
 from pathlib import Path
-import sqlite3
-import mariadb
+
+
+logger = logging.getLogger(__name__)
 
 
 class DatabaseType(enum.Enum):
@@ -18,6 +21,31 @@ class DatabaseType(enum.Enum):
     MARIADB = 2
 
 
+# DB-API module of every database type, imported the first time a
+# connection of that type is opened so a process only loads its own driver
+DRIVER_MODULES = {DatabaseType.SQLITE: 'sqlite3', DatabaseType.MARIADB: 'mariadb'}
+
+
+def driver_module(database_type):
+    """ returns the DB-API module of a database type, importing it when needed """
+    return importlib.import_module(DRIVER_MODULES[database_type])
+
+
+def upsert_statement(database_type, table, columns, keys):
+    """
+    returns an INSERT that updates the non key columns when a row with the
+    same keys already exists, in the syntax of database_type
+    """
+    values = ', '.join('?' * len(columns))
+    query = f"INSERT INTO {table}({', '.join(columns)}) VALUES({values})"
+    updates = [column for column in columns if column not in keys]
+    if database_type == DatabaseType.MARIADB:
+        return query + ' ON DUPLICATE KEY UPDATE ' + ', '.join(
+            f'{column}=VALUES({column})' for column in updates)
+    return query + f" ON CONFLICT({', '.join(keys)}) DO UPDATE SET " + ', '.join(
+        f'{column}=excluded.{column}' for column in updates)
+
+
 class DatabaseDriver():
     """Module that works as a simple abstraction layer for database operations"""
     # Internal Variables
@@ -25,6 +53,7 @@ class DatabaseDriver():
     __data_source = None
     __connection = None
     __sq_connection = None
+    __pool = None
 
     # Propiedades
     @property
@@ -86,16 +115,54 @@ class DatabaseDriver():
         """ returns the connection object to the database"""
         return self.__connection
 
+    @property
+    def pool(self):
+        """ returns the pool the connection was checked out from, if any"""
+        return self.__pool
+
     # Constructor
-    def __init__(self, database_type=DatabaseType.NONE, datasource_object=None):
+    def __init__(self, database_type=DatabaseType.NONE, datasource_object=None, pool=None):
         if not isinstance(database_type, DatabaseType):
             raise IndexError
         if database_type is database_type.NONE:
             raise NotImplementedError
         self.__database_type = database_type
-        if datasource_object is not None:
+        if pool is not None:
+            self.__pool = pool
+            self.__connection = pool.checkout()
+        elif datasource_object is not None:
             self.data_source = datasource_object
 
+    def close(self):
+        """ closes the connection or returns it to its pool """
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
+    def stream_cursor(self):
+        """
+        returns a cursor that fetches the rows from the server as they are
+        read instead of buffering the whole result set in the client
+        """
+        if self.database_type == DatabaseType.MARIADB:
+            return self.__connection.cursor(buffered=False)
+        # sqlite cursors already step through the result one row at a time
+        return self.__connection.cursor()
+
+    def upsert_query(self, table, columns, keys):
+        """
+        returns an INSERT that updates the non key columns when a row with the
+        same keys already exists, in the syntax of the database type
+        """
+        return upsert_statement(self.database_type, table, columns, keys)
+
+    @staticmethod
+    def ping_function(database_type):
+        """ returns a callable that checks if a raw connection is still alive """
+        if database_type == DatabaseType.MARIADB:
+            return lambda connection: connection.ping()
+        return lambda connection: connection.execute('SELECT 1').fetchone()
+
     def __is_sqlite3(self, database_file):
         """Function that checks if given file has a valid SQLite format"""
         # SQLite database file header is 100 bytes
@@ -108,8 +175,12 @@ class DatabaseDriver():
     def __create_connection(self, data_source):
         # print('----------->',data_source['database'].resolve(), file=sys.stdout)
         if self.database_type == DatabaseType.SQLITE:
-            self.__connection = sqlite3.connect(data_source['database'].resolve())
+            # pooled connections may be checked in and out from several threads
+            sqlite3 = driver_module(DatabaseType.SQLITE)
+            self.__connection = sqlite3.connect(data_source['database'].resolve(),
+                                                check_same_thread=False)
         if self.database_type == DatabaseType.MARIADB:
+            mariadb = driver_module(DatabaseType.MARIADB)
             try:
                 self.__connection = mariadb.connect(
                     user=data_source['username'],
@@ -119,7 +190,8 @@ class DatabaseDriver():
                     database=data_source['database']
                 )
             except mariadb.Error as exc:
-                print(f"Error connecting to MariaDB Platform: {exc}")
+                logger.error('error connecting to MariaDB at %s:%s: %s',
+                             data_source['server'], data_source['port'], exc)
 
     def parse_to_path(self, obj_to_parse):
         """ Parse a string into a path """
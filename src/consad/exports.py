@@ -0,0 +1,235 @@
+"""
+Provides streamed exports of solicitudes to CSV and XLSX files
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import csv
+import io
+import itertools
+from decimal import Decimal
+import sys
+import zipfile
+from xml.sax.saxutils import escape
+import click
+from flask import Response
+from . import connection_pool
+from . import queries
+from .reports import reports_cli
+from .streaming import iter_batches
+
+BATCH_SIZE = 2000
+
+HEADINGS = ['periodo', 'zona', 'departamento', 'grupo', 'id_material', 'material',
+            'unidad', 'cantidad', 'precio_unitario', 'importe']
+
+EXPORT_QUERY = ("SELECT p.descripcion, z.nombre, d.nombre, g.nombre, m.id_material, "
+                "m.descripcion, m.unidad_medida, s.cantidad, m.precio_unitario, "
+                "s.cantidad * m.precio_unitario FROM solicitudes AS s"
+                " INNER JOIN periodo AS p ON(p.id_periodo=s.id_periodo)"
+                " INNER JOIN zona AS z ON(z.id_zona=s.id_zona)"
+                " INNER JOIN departamento AS d ON(d.id_departamento=s.id_departamento)"
+                " INNER JOIN materiales AS m ON(m.id_material=s.id_material)"
+                " INNER JOIN grupo AS g ON(g.id_grupo=m.id_grupo)")
+
+# follows the index on (id_periodo, id_zona, id_material), so nothing is sorted
+EXPORT_ORDER = " ORDER BY s.id_periodo, s.id_zona, s.id_material"
+
+FILTERS = {
+    'id_periodo': 's.id_periodo',
+    'id_zona': 's.id_zona',
+    'id_grupo': 'm.id_grupo',
+}
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="solicitudes" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+
+class ExportError(ValueError):
+    """ raised when an export is requested in an unknown format """
+
+
+def statement(filters=None):
+    """
+    registers the export query restricted by the given filters, one query
+    per combination of filters, returns its name and parameters
+    """
+    filters = filters or {}
+    filters = {key: filters[key] for key in FILTERS if filters.get(key) not in (None, '')}
+    query = EXPORT_QUERY
+    if filters:
+        query += ' WHERE ' + ' AND '.join(f'{FILTERS[key]}=?' for key in filters)
+    # without periodo or zona every solicitud is exported
+    name = queries.register(':'.join(('exportar.solicitudes',) + tuple(filters)),
+                            query + EXPORT_ORDER, full_scan=not ('id_periodo' in filters
+                                                                 or 'id_zona' in filters))
+    return name, list(filters.values())
+
+
+def _register_all():
+    """ registers the query of every combination of filters for the index advisor """
+    for count in range(len(FILTERS) + 1):
+        for keys in itertools.combinations(FILTERS, count):
+            statement(dict.fromkeys(keys, 0))
+
+
+_register_all()
+
+
+def iter_csv(headings, batches):
+    """ yields a CSV file as text, one chunk per batch of rows """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headings)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink():
+    """
+    Write only file handed to zipfile, it has no tell or seek so the archive
+    is written as a stream and its output is collected between batches
+    """
+
+    def __init__(self):
+        self.__chunks = []
+
+    def write(self, data):
+        """ keeps the bytes written until they are taken """
+        self.__chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """ nothing is buffered by the sink itself """
+
+    def take(self):
+        """ returns and forgets the bytes written so far """
+        data = b''.join(self.__chunks)
+        self.__chunks.clear()
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _xlsx_row(row):
+    return '<row>' + ''.join(map(_xlsx_cell, row)) + '</row>'
+
+
+def iter_xlsx(headings, batches):
+    """
+    yields a single sheet XLSX file as bytes, the worksheet is compressed
+    while the rows arrive so only the current batch is held in memory
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/'
+                        b'spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(headings).encode('utf-8'))
+            for batch in batches:
+                sheet.write(''.join(map(_xlsx_row, batch)).encode('utf-8'))
+                yield sink.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'xlsx': (iter_xlsx, XLSX_MIMETYPE),
+}
+
+
+def execute(driver, filters=None):
+    """ runs the export query on a server side cursor, the rows are left in it """
+    name, params = statement(filters)
+    return queries.execute(driver, name, params, cursor=driver.stream_cursor())
+
+
+def response(formato, filters=None):
+    """
+    streams the export as a file download, the pooled connection stays
+    checked out until the response is closed, even when its body is never
+    iterated
+    """
+    if formato not in FORMATS:
+        raise ExportError(f'unknown format: {formato}')
+    writer, mimetype = FORMATS[formato]
+    cur = execute(connection_pool.get_driver(), filters)
+    driver = connection_pool.detach_driver()
+    resp = Response(writer(HEADINGS, iter_batches(cur, BATCH_SIZE)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=solicitudes.{formato}'})
+    resp.call_on_close(driver.close)
+    return resp
+
+
+@reports_cli.command('exportar')
+@click.option('--formato', type=click.Choice(list(FORMATS)), default='csv', show_default=True)
+@click.option('--salida', type=click.Path(dir_okay=False), default=None,
+              help='file to write, CSV is written to the standard output by default')
+@click.option('--periodo', 'id_periodo', type=int, default=None)
+@click.option('--zona', 'id_zona', type=int, default=None)
+@click.option('--grupo', 'id_grupo', type=int, default=None)
+def export_solicitudes(formato, salida, id_periodo, id_zona, id_grupo):
+    """
+    Exports the solicitudes with their catalogs as CSV or XLSX
+    """
+    if salida is None and formato != 'csv':
+        raise click.BadParameter('XLSX files need an output file', param_hint='--salida')
+    writer = FORMATS[formato][0]
+    cur = execute(connection_pool.get_driver(),
+                  {'id_periodo': id_periodo, 'id_zona': id_zona, 'id_grupo': id_grupo})
+    chunks = writer(HEADINGS, iter_batches(cur, BATCH_SIZE))
+    if salida is None:
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+        return
+    mode = 'w' if formato == 'csv' else 'wb'
+    encoding = 'utf-8' if formato == 'csv' else None
+    with open(salida, mode, encoding=encoding, newline='' if encoding else None) as output:
+        for chunk in chunks:
+            output.write(chunk)
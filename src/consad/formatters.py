@@ -0,0 +1,146 @@
+"""
+Provides column typed formatting of result sets for the JSON endpoints
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import enum
+from datetime import datetime
+from itertools import repeat
+
+
+class ColumnType(enum.Enum):
+    """ Enum the kinds of columns a formatter knows """
+    PASSTHROUGH = 0
+    TEXT = 1
+    CURRENCY = 2
+    ISO_DATETIME = 3
+    COMPUTED = 4
+
+
+def _currency(value):
+    if isinstance(value, str):
+        return value
+    return f'{value:0,.2f}'
+
+
+def _iso_datetime(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def to_datetime(value):
+    """ converts a date given as ISO text or datetime to a datetime """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class Column():
+    """
+    Declares a column of a result set, computed columns are built by compute
+    from the list of source columns and are not read from the rows
+    """
+
+    def __init__(self, heading, kind=ColumnType.PASSTHROUGH, compute=None):
+        if (kind == ColumnType.COMPUTED) != (compute is not None):
+            raise ValueError('only computed columns have a compute function')
+        self.heading = heading
+        self.kind = kind
+        self.compute = compute
+
+    def format(self, values):
+        """
+        formats a whole column, the fast path applies a single conversion to
+        every value and falls back to checking each one on mixed columns
+        """
+        if self.kind == ColumnType.TEXT:
+            return list(map(str, values))
+        if self.kind == ColumnType.CURRENCY:
+            try:
+                return list(map(format, values, repeat('0,.2f')))
+            except (TypeError, ValueError):
+                return list(map(_currency, values))
+        if self.kind == ColumnType.ISO_DATETIME:
+            # sqlite returns dates as text, those columns are left untouched
+            if isinstance(values[0], str):
+                return values
+            try:
+                return list(map(datetime.isoformat, values))
+            except TypeError:
+                return list(map(_iso_datetime, values))
+        return values
+
+
+class RowFormatter():
+    """
+    Formats batches of rows column by column according to a schema declared
+    once per endpoint, the result is a list of rows ready to be encoded
+    """
+
+    def __init__(self, *columns):
+        self.__columns = columns
+
+    @property
+    def headings(self):
+        """ headings of the columns, in output order """
+        return [column.heading for column in self.__columns]
+
+    def __call__(self, rows):
+        if not rows:
+            return []
+        source = list(zip(*rows))
+        output = []
+        index = 0
+        for column in self.__columns:
+            if column.kind == ColumnType.COMPUTED:
+                output.append(column.compute(source))
+            else:
+                output.append(column.format(source[index]))
+                index += 1
+        return list(map(list, zip(*output)))
+
+
+def text(heading):
+    """ column converted to its string representation """
+    return Column(heading, ColumnType.TEXT)
+
+
+def currency(heading):
+    """ numeric column shown with thousands separator and two decimals """
+    return Column(heading, ColumnType.CURRENCY)
+
+
+def iso_datetime(heading):
+    """ datetime column shown in ISO 8601 format """
+    return Column(heading, ColumnType.ISO_DATETIME)
+
+
+def passthrough(heading):
+    """ column encoded as it comes from the database """
+    return Column(heading, ColumnType.PASSTHROUGH)
+
+
+def computed(heading, compute):
+    """ column calculated from the source columns of the batch """
+    return Column(heading, ColumnType.COMPUTED, compute)
+
+
+def is_open(inicio, fin, now=None):
+    """ checks if the current time is between two dates, given as text or datetime """
+    if now is None:
+        now = datetime.now()
+    return to_datetime(inicio) < now < to_datetime(fin)
+
+
+def open_between(start, end):
+    """
+    returns a compute function flagging the rows whose start and end source
+    columns enclose the current time
+    """
+    def compute(source):
+        now = datetime.now()
+        return [is_open(ini, final, now) for ini, final in zip(source[start], source[end])]
+    return compute
@@ -0,0 +1,70 @@
+"""
+Provides HTTP validators (ETag and Last-Modified) for cacheable pages
+
+The validators of the catalog pages follow the catalog version, which only
+changes with `flask database invalidate-cache`; edits made directly in the
+database must run that command or clients keep their copies.
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from flask import request, make_response
+
+
+def source_stamp(folder):
+    """
+    returns the newest modification time of the files in a folder, pages
+    rendered from them must be revalidated after a deployment
+    """
+    stamp = 0.0
+    for file in Path(folder).rglob('*'):
+        if file.is_file():
+            stamp = max(stamp, file.stat().st_mtime)
+    return stamp
+
+
+def make_etag(*parts):
+    """ builds a strong entity tag from the values the page depends on """
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
+def to_http_date(timestamp):
+    """ converts a unix timestamp to a datetime with seconds precision """
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+def is_not_modified(etag):
+    """
+    checks the conditional headers of the current request. Only a matching
+    If-None-Match is answered with 304: the entity tag covers the user and
+    the page, the modification date does not, so If-Modified-Since alone
+    never is.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return False
+
+
+def set_validators(response, etag, last_modified):
+    """
+    adds the validators to a response, clients must always revalidate and
+    shared caches must not give the page of a session to another one
+    """
+    response.set_etag(etag)
+    response.last_modified = to_http_date(last_modified)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag, last_modified):
+    """ returns an empty 304 response """
+    return set_validators(make_response('', 304), etag, last_modified)
@@ -0,0 +1,130 @@
+"""
+Provides the analysis of the query plans of the registered queries
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import re
+from . import queries
+from .database_driver import DatabaseType
+
+WHERE = re.compile(r'\bWHERE\b', re.IGNORECASE)
+
+# subqueries in FROM or JOIN and common table expressions, named by their alias
+SUBQUERY = re.compile(r'\b(?:FROM|JOIN)\s*\(', re.IGNORECASE)
+ALIAS = re.compile(r'\s*AS\s+(\w+)', re.IGNORECASE)
+CTE = re.compile(r'\bWITH\s+(\w+)\s+AS\s*\(', re.IGNORECASE)
+
+# MariaDB access types that read a whole table or a whole index
+MARIADB_SCANS = ('ALL', 'index')
+
+
+class PlanStep():
+    """ one table access of a query plan """
+
+    def __init__(self, table, detail, full_scan):
+        self.table = table
+        self.detail = detail
+        self.full_scan = full_scan
+
+
+class QueryPlan():
+    """
+    Plan of a registered query. A full scan is flagged when the query
+    filters its rows, scans of queries without WHERE read every row anyway,
+    as do the queries registered with full_scan=True
+    """
+
+    def __init__(self, name, sql, steps=(), error=None):
+        self.name = name
+        self.sql = sql
+        self.steps = list(steps)
+        self.error = error
+        self.expected = (WHERE.search(sql) is None
+                         or queries.REGISTRY.expects_full_scan(name))
+
+    @property
+    def flagged(self):
+        """ steps reading a whole table in a query that should use an index """
+        if self.expected:
+            return []
+        return [step for step in self.steps if step.full_scan]
+
+
+def derived_tables(sql):
+    """
+    returns the aliases of the subqueries and common table expressions of a
+    query, their rows are built by the query itself so reading them whole
+    is no missing index
+    """
+    names = set(CTE.findall(sql))
+    for match in SUBQUERY.finditer(sql):
+        depth = 1
+        pos = match.end()
+        while depth and pos < len(sql):
+            depth += {'(': 1, ')': -1}.get(sql[pos], 0)
+            pos += 1
+        alias = ALIAS.match(sql, pos)
+        if alias is not None:
+            names.add(alias.group(1))
+    return names
+
+
+def _explain_sqlite(cursor, sql, params):
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    steps = []
+    for row in cursor.fetchall():
+        detail = row[-1]
+        words = detail.split()
+        if len(words) > 1 and words[0] in ('SCAN', 'SEARCH') and words[1] != 'CONSTANT':
+            table = words[2] if words[1] == 'TABLE' and len(words) > 2 else words[1]
+            # a covering index scan still reads every entry of the index
+            steps.append(PlanStep(table, detail, words[0] == 'SCAN'))
+    return steps
+
+
+def _explain_mariadb(cursor, sql, params):
+    cursor.execute('EXPLAIN ' + sql, params)
+    columns = [column[0] for column in cursor.description]
+    steps = []
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        detail = (f"type={row.get('type')} key={row.get('key')} rows={row.get('rows')} "
+                  f"{row.get('Extra') or ''}").strip()
+        # <derived2>, <union1,2> and the like are results of the query itself
+        table = str(row.get('table') or '')
+        steps.append(PlanStep(row.get('table'), detail,
+                              row.get('type') in MARIADB_SCANS and not table.startswith('<')))
+    return steps
+
+
+def explain(driver, name):
+    """ returns the QueryPlan of a registered query on the database of a driver """
+    sql = queries.REGISTRY.sql(name, driver.database_type)
+    # the plan does not depend on the values, '0' keeps MariaDB on the
+    # indexes of text and numeric columns alike
+    params = ['0'] * sql.count('?')
+    cursor = driver.connection.cursor()
+    try:
+        if driver.database_type == DatabaseType.MARIADB:
+            steps = _explain_mariadb(cursor, sql, params)
+        else:
+            steps = _explain_sqlite(cursor, sql, params)
+    except Exception as exc:  # pylint: disable=broad-except
+        return QueryPlan(name, sql, error=str(exc))
+    finally:
+        driver.connection.rollback()
+    derived = derived_tables(sql)
+    for step in steps:
+        if step.table in derived:
+            step.full_scan = False
+    return QueryPlan(name, sql, steps)
+
+
+def analyze(driver, names=None):
+    """
+    returns the plans of the given registered queries, every query by
+    default, reports and exports register their common variants on import
+    """
+    return [explain(driver, name) for name in (names or queries.REGISTRY.names())]
@@ -0,0 +1,490 @@
+"""
+Provides query instrumentation, the slow query log and Prometheus metrics
+
+Every process writes the totals of its metrics to a file of the metrics
+folder of the instance METRICS_FLUSH seconds after a request, on every
+scrape and when a worker stops, and /metrics answers the sum of every file. A scrape reaches
+a single worker of the pre-fork server, yet sees the requests of all of
+them, up to METRICS_FLUSH seconds behind. Totals of retired workers are
+kept so counters never go back, the pool gauges only count live ones.
+The endpoint asks for 'Authorization: Bearer <metrics_token>' when the
+token is configured and only answers the loopback address otherwise.
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import bisect
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from . import connection_pool
+from . import queries
+
+METRICS_KEY = 'consad.metrics'
+
+# upper bounds in seconds of the latency buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# clients allowed to scrape when no metrics token is configured
+LOOPBACK = ('127.0.0.1', '::1')
+
+POOL_GAUGES = ('in_use', 'idle')
+POOL_COUNTERS = ('checkouts', 'waits', 'timeouts')
+
+slow_query_log = logging.getLogger('consad.slow_queries')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter():
+    """ monotonic counter by label values """
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.__values = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, amount=1, values=()):
+        """ adds amount to the counter of a tuple of label values """
+        with self.__lock:
+            self.__values[values] = self.__values.get(values, 0) + amount
+
+    def snapshot(self):
+        """ returns the totals as a list of [label values, total] """
+        with self.__lock:
+            return [[list(values), total] for values, total in self.__values.items()]
+
+    def load(self, snapshot):
+        """ adds the totals of a snapshot """
+        for values, total in snapshot:
+            self.inc(total, tuple(values))
+
+    def render(self):
+        """ returns the lines of the counter in the Prometheus text format """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self.__lock:
+            for values, total in sorted(self.__values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, values)} {_number(total)}')
+        return lines
+
+
+class Histogram():
+    """ distribution of observed values in fixed buckets, by label values """
+
+    def __init__(self, name, description, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.__series = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, value, values=()):
+        """ counts value in its bucket for a tuple of label values """
+        position = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            series = self.__series.get(values)
+            if series is None:
+                # one count per bucket plus +Inf, the sum and the count
+                series = self.__series[values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """ returns the series as a list of [label values, bucket counts, sum, count] """
+        with self.__lock:
+            return [[list(values), [*counts], total, count]
+                    for values, (counts, total, count) in self.__series.items()]
+
+    def load(self, snapshot):
+        """ adds the series of a snapshot, taken with the same buckets """
+        with self.__lock:
+            for values, counts, total, count in snapshot:
+                series = self.__series.setdefault(
+                    tuple(values), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                series[0] = [mine + theirs for mine, theirs in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+    def render(self):
+        """ returns the lines of the histogram in the Prometheus text format """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self.__lock:
+            series = sorted((values, ([*counts], total, count))
+                            for values, (counts, total, count) in self.__series.items())
+        for values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket
+                labels = _labels(self.labels, values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _labels(self.labels, values)
+            lines.append(f'{self.name}_sum{labels} {_number(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def current_endpoint():
+    """ endpoint of the request being served, 'none' outside of a request """
+    if has_request_context():
+        return request.endpoint or 'none'
+    return 'none'
+
+
+class InstrumentedCursor():
+    """
+    Cursor proxy that times every execute. The rows are the rowcount of the
+    driver when it knows them: MariaDB buffered cursors know the rows of a
+    SELECT, sqlite3 only the rows of a write. Otherwise the rows are counted
+    as they are fetched and the slow query log reports -1.
+    """
+    __slots__ = ('_cursor', '_observer', '_counting')
+
+    def __init__(self, cursor, observer):
+        self._cursor = cursor
+        self._observer = observer
+        self._counting = False
+
+    def __executed(self, query, start):
+        rows = self._cursor.rowcount
+        self._counting = rows < 0
+        self._observer.on_query(query, time.perf_counter() - start, rows)
+
+    def execute(self, query, *args, **kwargs):
+        """ executes the query and reports it to the observer """
+        start = time.perf_counter()
+        result = self._cursor.execute(query, *args, **kwargs)
+        self.__executed(query, start)
+        return self if result is self._cursor else result
+
+    def executemany(self, query, rows, *args, **kwargs):
+        """ executes the query for every row and reports it to the observer """
+        start = time.perf_counter()
+        result = self._cursor.executemany(query, rows, *args, **kwargs)
+        self.__executed(query, start)
+        return self if result is self._cursor else result
+
+    def __fetched(self, rows):
+        if self._counting and rows:
+            self._observer.on_rows(rows)
+
+    def fetchone(self):
+        """ returns the next row, counting it when the rowcount was unknown """
+        row = self._cursor.fetchone()
+        self.__fetched(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        """ returns the next rows, counting them when the rowcount was unknown """
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self.__fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        """ returns the remaining rows, counting them when the rowcount was unknown """
+        rows = self._cursor.fetchall()
+        self.__fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        if not self._counting:
+            return iter(self._cursor)
+        return self.__counted()
+
+    def __counted(self):
+        count = 0
+        try:
+            for row in self._cursor:
+                count += 1
+                yield row
+        finally:
+            self.__fetched(count)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class QueryObserver():
+    """
+    Receives the queries and connection checkouts of the pools. Queries
+    slower than slow_seconds are written to the slow query log as one JSON
+    object per line, with metrics they are also counted by endpoint.
+    """
+
+    def __init__(self, metrics=None, slow_seconds=0):
+        self.metrics = metrics
+        self.slow_seconds = slow_seconds
+
+    def cursor(self, cursor):
+        """ wraps a cursor of a pooled connection """
+        return InstrumentedCursor(cursor, self)
+
+    def on_checkout(self, wait):
+        """ records the time a request waited for a pooled connection """
+        if has_app_context():
+            g.db_acquire_wait = g.get('db_acquire_wait', 0.0) + wait
+        if self.metrics is not None:
+            self.metrics.acquire_wait.observe(wait)
+
+    def on_query(self, query, duration, rows):
+        """ records a query executed on a pooled connection """
+        endpoint = None
+        if self.metrics is not None:
+            endpoint = current_endpoint()
+            self.metrics.query_duration.observe(duration, (endpoint,))
+            if rows > 0:
+                self.metrics.query_rows.inc(rows, (endpoint,))
+        if self.slow_seconds and duration >= self.slow_seconds:
+            endpoint = endpoint or current_endpoint()
+            wait = g.get('db_acquire_wait', 0.0) if has_app_context() else 0.0
+            if self.metrics is not None:
+                self.metrics.slow_queries.inc(1, (endpoint,))
+            slow_query_log.warning(json.dumps({
+                'duration_ms': round(duration * 1000, 3), 'rows': rows, 'endpoint': endpoint,
+                'acquire_wait_ms': round(wait * 1000, 3), 'sql': ' '.join(query.split())}))
+
+    def on_rows(self, rows):
+        """ records rows fetched from a query whose rowcount was unknown """
+        if self.metrics is not None:
+            self.metrics.query_rows.inc(rows, (current_endpoint(),))
+
+
+class Metrics():
+    """
+    metrics of an application process, with a directory they are written
+    there and rendered together with those of the other processes
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.request_duration = Histogram(
+            'consad_request_duration_seconds', 'Time to answer a request by route.',
+            ('route', 'method'))
+        self.query_duration = Histogram(
+            'consad_query_duration_seconds', 'Time to execute a query by endpoint.',
+            ('endpoint',))
+        self.query_rows = Counter(
+            'consad_query_rows_total', 'Rows reported by the queries by endpoint.',
+            ('endpoint',))
+        self.slow_queries = Counter(
+            'consad_slow_queries_total', 'Queries over the slow query threshold by endpoint.',
+            ('endpoint',))
+        self.acquire_wait = Histogram(
+            'consad_pool_acquire_seconds', 'Time waited to check out a pooled connection.')
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.__next_flush = 0.0
+        self.__pending = False
+        self.__flush_lock = threading.Lock()
+
+    def collectors(self):
+        """ returns every metric of the process """
+        return (self.request_duration, self.query_duration, self.query_rows,
+                self.slow_queries, self.acquire_wait)
+
+    def start_request(self):
+        """ before_request hook, notes when the request started """
+        g.request_started = time.perf_counter()
+
+    def end_request(self, response):
+        """ after_request hook, observes the latency of the route """
+        started = g.get('request_started')
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.request_duration.observe(time.perf_counter() - started,
+                                          (route, request.method))
+        if self.directory is not None:
+            self.__schedule(current_app._get_current_object())  # pylint: disable=protected-access
+        return response
+
+    def __schedule(self, app):
+        """ flushes once the interval elapsed, an idle worker still writes its last requests """
+        with self.__flush_lock:
+            if self.__pending:
+                return
+            self.__pending = True
+        timer = threading.Timer(max(0.0, self.__next_flush - time.monotonic()), self.flush,
+                                (app,))
+        timer.daemon = True
+        timer.start()
+
+    def snapshot(self, app):
+        """ returns the totals of this process, as written to the metrics folder """
+        snapshot = {'pid': os.getpid(),
+                    'metrics': {metric.name: metric.snapshot() for metric in self.collectors()},
+                    'queries': {name: [stats['calls'], stats['total']]
+                                for name, stats in queries.REGISTRY.stats().items()}}
+        pool = app.extensions.get(connection_pool.POOL_KEY)
+        if pool is not None:
+            stats = pool.stats
+            snapshot['pool'] = {name: stats[name] for name in POOL_GAUGES + POOL_COUNTERS}
+        return snapshot
+
+    def flush(self, app):
+        """ writes the totals of this process to its file of the metrics folder """
+        if self.directory is None:
+            return
+        with self.__flush_lock:
+            self.__pending = False
+            self.__next_flush = time.monotonic() + self.flush_interval
+            path = Path(self.directory).joinpath(f'{os.getpid()}.json')
+            temporary = path.with_suffix('.tmp')
+            temporary.write_text(json.dumps(self.snapshot(app)), encoding='utf-8')
+            os.replace(temporary, path)
+
+    def render(self, app):
+        """ returns every metric of the application in the Prometheus text format """
+        if self.directory is None:
+            return _render([self.snapshot(app)])
+        self.flush(app)
+        return _render(_read_snapshots(self.directory))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_snapshots(directory):
+    snapshots = []
+    for path in sorted(Path(directory).glob('*.json')):
+        try:
+            snapshots.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            # removed since it was listed
+            continue
+    return snapshots
+
+
+def _render(snapshots):
+    """ sums the snapshots of every process in the Prometheus text format """
+    metrics = Metrics().collectors()
+    named = {}
+    pools = []
+    for snapshot in snapshots:
+        for metric in metrics:
+            metric.load(snapshot['metrics'].get(metric.name, []))
+        for name, (calls, seconds) in snapshot['queries'].items():
+            stats = named.setdefault(name, [0, 0.0])
+            stats[0] += calls
+            stats[1] += seconds
+        if 'pool' in snapshot:
+            pools.append((snapshot['pid'], snapshot['pool']))
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    if pools:
+        lines.append('# TYPE consad_pool_connections gauge')
+        live = [stats for pid, stats in pools if pid == os.getpid() or _alive(pid)]
+        for state in POOL_GAUGES:
+            lines.append(f'consad_pool_connections{{state="{state}"}} '
+                         f'{sum(stats[state] for stats in live)}')
+        for name in POOL_COUNTERS:
+            lines.append(f'# TYPE consad_pool_{name}_total counter')
+            lines.append(f'consad_pool_{name}_total {sum(stats[name] for _, stats in pools)}')
+    if named:
+        lines.append('# TYPE consad_named_query_seconds summary')
+        for name, (calls, seconds) in sorted(named.items()):
+            lines.append(f'consad_named_query_seconds_sum{{query="{_escape(name)}"}} '
+                         f'{_number(seconds)}')
+            lines.append(f'consad_named_query_seconds_count{{query="{_escape(name)}"}} '
+                         f'{calls}')
+    return '\n'.join(lines) + '\n'
+
+
+def _refused(app):
+    """ returns the answer to a scrape that is not allowed, None when it is allowed """
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        header = request.headers.get('Authorization', '')
+        if hmac.compare_digest(header.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            return None
+        return Response('unauthorized\n', status=401, content_type=CONTENT_TYPE,
+                        headers={'WWW-Authenticate': 'Bearer'})
+    if request.remote_addr in LOOPBACK:
+        return None
+    return Response('forbidden\n', status=403, content_type=CONTENT_TYPE)
+
+
+def flush(app):
+    """ writes the metrics of this process, a stopping worker calls it last """
+    metrics = app.extensions.get(METRICS_KEY)
+    if metrics is not None:
+        metrics.flush(app)
+
+
+def init_app(app):
+    """
+    installs the instrumentation chosen by METRICS and SLOW_QUERY_MS, with
+    both disabled nothing is installed and queries run on the bare cursors
+    """
+    enabled = app.config.get('METRICS', False)
+    slow_ms = app.config.get('SLOW_QUERY_MS', 0)
+    if not enabled and not slow_ms:
+        return None
+    metrics = None
+    if enabled:
+        directory = None
+        if app.config.get('METRICS_DIR', 'metrics'):
+            directory = Path(app.instance_path).joinpath(app.config.get('METRICS_DIR',
+                                                                        'metrics'))
+            directory.mkdir(parents=True, exist_ok=True)
+            # totals of processes gone, from a previous run or generation
+            for path in directory.glob('*.json'):
+                if path.stem.isdigit() and not _alive(int(path.stem)):
+                    path.unlink(missing_ok=True)
+        metrics = Metrics(directory, app.config.get('METRICS_FLUSH', 1.0))
+    observer = QueryObserver(metrics, slow_ms / 1000)
+    pools = [app.extensions[connection_pool.POOL_KEY]]
+    replicas = app.extensions.get(connection_pool.REPLICAS_KEY)
+    if replicas is not None:
+        pools.extend(replicas.pools)
+    for pool in pools:
+        pool.observer = observer
+    if slow_ms and app.config.get('SLOW_QUERY_LOG'):
+        path = str(Path(app.instance_path).joinpath(app.config['SLOW_QUERY_LOG']))
+        if not any(getattr(handler, 'baseFilename', None) == path
+                   for handler in slow_query_log.handlers):
+            handler = logging.FileHandler(path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_query_log.addHandler(handler)
+    if metrics is not None:
+        app.extensions[METRICS_KEY] = metrics
+        app.before_request(metrics.start_request)
+        app.after_request(metrics.end_request)
+
+        def scrape():
+            refused = _refused(app)
+            if refused is not None:
+                return refused
+            return Response(metrics.render(app), content_type=CONTENT_TYPE)
+        app.add_url_rule('/metrics', 'metrics', scrape)
+    return observer
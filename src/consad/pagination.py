@@ -0,0 +1,148 @@
+"""
+Provides server side pagination, sorting and filtering of SQL queries
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+from . import queries
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def escape_like(text):
+    """ escapes the wildcards of a LIKE pattern using ! as escape character """
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+class PagedQuery():
+    """
+    A SELECT split in its parts, so it can be filtered, sorted, counted and
+    paged in the database. columns maps the public name of every column to
+    its SQL expression, only those names are accepted as sort keys. A named
+    query runs through the query registry, every combination of sort, order
+    and filter is registered as a query of its own.
+    """
+
+    def __init__(self, columns, source, search=(), has_where=False, name=None):
+        self.__columns = dict(columns)
+        self.__source = source
+        self.__search = tuple(search)
+        self.__has_where = has_where
+        self.__name = name
+        if name is not None:
+            # the default page and the filtered one are known up front
+            self.register(PageRequest(self.columns))
+            if self.__search:
+                self.register(PageRequest(self.columns, search='?'))
+
+    @property
+    def columns(self):
+        """ public names of the columns, in select order """
+        return list(self.__columns.keys())
+
+    def page_request(self, args):
+        """ builds a page request for this query from request arguments """
+        return PageRequest(self.columns, page=args.get('page'),
+                           per_page=args.get('per_page'), sort=args.get('sort'),
+                           order=args.get('order'), search=args.get('q'))
+
+    def statements(self, page):
+        """
+        returns the count and page statements for a request, plus the extra
+        parameters of the filter
+        """
+        where = ''
+        params = []
+        if page.search and self.__search:
+            pattern = '%' + escape_like(page.search) + '%'
+            where = ' OR '.join(f"{expr} LIKE ? ESCAPE '!'" for expr in self.__search)
+            where = (' AND (' if self.__has_where else ' WHERE (') + where + ')'
+            params = [pattern] * len(self.__search)
+        select = ', '.join(self.__columns.values())
+        tiebreak = next(iter(self.__columns.values()))
+        order = self.__columns[page.sort]
+        direction = 'DESC' if page.order == 'desc' else 'ASC'
+        count_sql = f'SELECT COUNT(*) FROM {self.__source}{where}'
+        page_sql = (f'SELECT {select} FROM {self.__source}{where} '
+                    f'ORDER BY {order} {direction}')
+        if order != tiebreak:
+            page_sql += f', {tiebreak} {direction}'
+        page_sql += ' LIMIT ? OFFSET ?'
+        return count_sql, page_sql, params
+
+    def register(self, page):
+        """
+        registers the statements of a page request in the query registry,
+        returns their names and the parameters of the filter
+        """
+        count_sql, page_sql, filter_params = self.statements(page)
+        variant = ':q' if filter_params else ''
+        # searches match substrings, no index can answer them
+        full_scan = bool(filter_params)
+        count_name = queries.register(f'{self.__name}.total{variant}', count_sql, full_scan)
+        page_name = queries.register(f'{self.__name}.pagina:{page.sort}:{page.order}{variant}',
+                                     page_sql, full_scan)
+        return count_name, page_name, filter_params
+
+    def run(self, driver, page, params=()):
+        """
+        executes a named query through the registry, returns the cursor with
+        the rows of the page and the total of rows
+        """
+        count_name, page_name, filter_params = self.register(page)
+        params = list(params) + filter_params
+        total = queries.execute(driver, count_name, params).fetchone()[0]
+        return queries.execute(driver, page_name, params + [page.per_page, page.offset]), total
+
+
+class PageRequest():
+    """
+    Page, sort and filter parameters requested by a client, every value is
+    normalized so invalid input falls back to the defaults
+    """
+
+    def __init__(self, columns, page=1, per_page=DEFAULT_PER_PAGE, sort=None,
+                 order='asc', search=None):
+        self.page = max(_to_int(page, 1), 1)
+        self.per_page = min(max(_to_int(per_page, DEFAULT_PER_PAGE), 1), MAX_PER_PAGE)
+        self.sort = sort if sort in columns else columns[0]
+        self.order = 'desc' if order == 'desc' else 'asc'
+        self.search = search.strip() if isinstance(search, str) and search.strip() else None
+
+    @property
+    def offset(self):
+        """ number of rows skipped before this page """
+        return (self.page - 1) * self.per_page
+
+    @property
+    def key(self):
+        """ hashable representation, used in cache keys and entity tags """
+        return (self.page, self.per_page, self.sort, self.order, self.search)
+
+    def args(self, **changes):
+        """ returns the request as query arguments, replacing the given values """
+        args = {'page': self.page, 'per_page': self.per_page, 'sort': self.sort,
+                'order': self.order}
+        if self.search:
+            args['q'] = self.search
+        args.update(changes)
+        return args
+
+    def pages(self, total):
+        """ number of pages needed to show total rows """
+        return max((total + self.per_page - 1) // self.per_page, 1)
+
+    def as_dict(self, total):
+        """ paging information returned to the client """
+        return {'page': self.page, 'per_page': self.per_page, 'sort': self.sort,
+                'order': self.order, 'q': self.search, 'total': total,
+                'pages': self.pages(total)}
@@ -0,0 +1,186 @@
+"""
+Provides the queries on the periods of the application and their calendar
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from . import catalog_cache
+from . import connection_pool
+from . import formatters
+from . import queries
+
+CALENDAR_KEY = 'consad.periodos'
+
+CATALOG_QUERY = queries.register(
+    'periodo.catalogo',
+    "SELECT id_periodo, descripcion, fecha_inicio, fecha_fin, activo FROM periodo")
+
+CALENDAR_QUERY = queries.register(
+    'periodo.calendario',
+    "SELECT id_periodo, descripcion, fecha_inicio, fecha_fin, activo FROM periodo "
+    " WHERE activo=1 ORDER BY fecha_inicio DESC")
+
+# time of the database, periods open and close by its clock like the SQL
+# comparisons with CURRENT_TIMESTAMP did; in UTC for SQLite
+CLOCK_QUERY = queries.register('periodo.reloj', "SELECT CURRENT_TIMESTAMP")
+
+# longest wait of the timer, a far boundary is approached in steps
+MAX_WAIT = 24 * 3600
+
+_lock = threading.Lock()
+
+
+class PeriodCalendar():
+    """
+    Active periods kept in memory. A period is open from fecha_inicio until
+    fecha_fin. The dates of every period are sorted once as boundaries,
+    between two consecutive boundaries the open periods do not change, so
+    they are computed once per interval and the interval of a moment is
+    found with a binary search. A timer moves the current interval when the
+    next boundary is reached; reads also compare the current time with the
+    end of the interval, so a late timer or a forked worker without the
+    thread never answer with a closed period. The current time is the
+    clock of the process plus clock_offset, the difference with the clock
+    of the database measured when the periods were read.
+    """
+
+    def __init__(self, rows, version=None, clock_offset=timedelta(0)):
+        self.version = version
+        self.clock_offset = clock_offset
+        self.loaded = time.monotonic()
+        self.__rows = []
+        self.__ids = {}
+        for row in rows:
+            inicio = formatters.to_datetime(row[2])
+            fin = formatters.to_datetime(row[3])
+            self.__rows.append((tuple(row), inicio, fin))
+            self.__ids[str(row[0])] = row[0]
+        self.__boundaries = sorted({date for _, inicio, fin in self.__rows
+                                    for date in (inicio, fin)})
+        # interval i goes from boundaries[i - 1] to boundaries[i], nothing
+        # is open before the first boundary
+        self.__open = [frozenset()] + [
+            frozenset(row[0] for row, inicio, fin in self.__rows if inicio <= start < fin)
+            for start in self.__boundaries]
+        self.__current = None
+        self.__timer = None
+        self.__lock = threading.Lock()
+        self.__advance()
+
+    def now(self):
+        """ returns the current time by the clock of the database """
+        return datetime.now() + self.clock_offset
+
+    def interval(self, now):
+        """ returns the index of the interval of a moment """
+        return bisect.bisect_right(self.__boundaries, now)
+
+    def open_at(self, now):
+        """ returns the ids of the periods open at a moment """
+        return self.__open[self.interval(now)]
+
+    @property
+    def current(self):
+        """ returns the ids of the periods open now """
+        until, open_ids = self.__current
+        if until is not None and self.now() >= until:
+            until, open_ids = self.__advance()
+        return open_ids
+
+    def is_open(self, id_periodo):
+        """ checks if a period is open now, ids may be given as text """
+        return self.__ids.get(str(id_periodo)) in self.current
+
+    def rows(self, editable=None):
+        """
+        returns the active periods, newest first, filtered by their editable
+        state when editable is True or False. The open state of every period
+        is appended to its row.
+        """
+        open_ids = self.current
+        return [row + (row[0] in open_ids,) for row, _, _ in self.__rows
+                if editable is None or (row[0] in open_ids) == editable]
+
+    def __advance(self):
+        """ moves to the interval of the current time """
+        with self.__lock:
+            index = self.interval(self.now())
+            until = self.__boundaries[index] if index < len(self.__boundaries) else None
+            self.__current = (until, self.__open[index])
+            return self.__current
+
+    def start(self):
+        """ schedules the timer for the next boundary """
+        self.stop()
+        until = self.__current[0]
+        if until is None:
+            return
+        wait = min(max((until - self.now()).total_seconds(), 0), MAX_WAIT)
+        self.__timer = threading.Timer(wait, self.__tick)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def stop(self):
+        """ cancels the timer """
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def __tick(self):
+        self.__advance()
+        self.start()
+
+
+def load_calendar(driver, version=None):
+    """
+    reads the active periods and the clock of the database into a calendar,
+    its timer is not started
+    """
+    rows = queries.execute(driver, CALENDAR_QUERY).fetchall()
+    database_now = formatters.to_datetime(queries.execute(driver, CLOCK_QUERY).fetchone()[0])
+    return PeriodCalendar(rows, version, database_now - datetime.now())
+
+
+def current_calendar(app):
+    """
+    returns the calendar of an application, None when missing or stale: the
+    catalog version changed or it is older than PERIOD_CALENDAR_TTL seconds
+    """
+    calendar = app.extensions.get(CALENDAR_KEY)
+    if calendar is None or calendar.version != app.extensions[catalog_cache.CACHE_KEY].version:
+        return None
+    if time.monotonic() - calendar.loaded >= app.config.get('PERIOD_CALENDAR_TTL', 300):
+        return None
+    return calendar
+
+
+def install_calendar(app, calendar):
+    """ replaces the calendar of an application and starts its timer """
+    with _lock:
+        previous = app.extensions.get(CALENDAR_KEY)
+        if previous is not None:
+            previous.stop()
+        app.extensions[CALENDAR_KEY] = calendar
+        calendar.start()
+    return calendar
+
+
+def get_calendar():
+    """
+    returns the calendar of the current application, it is read again when
+    the catalog version changes, e.g. after 'flask database invalidate-cache',
+    and every PERIOD_CALENDAR_TTL seconds, so periods edited directly in the
+    database and drift of the clocks are picked up
+    """
+    calendar = current_calendar(current_app)
+    if calendar is None:
+        version = catalog_cache.get_cache().version
+        calendar = install_calendar(
+            current_app, load_calendar(connection_pool.get_driver(), version))
+    return calendar
@@ -0,0 +1,113 @@
+"""
+Provides a cache of the authenticated users and their zona and departamento
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import hashlib
+from pathlib import Path
+from flask import current_app, request, session
+from . import catalog_cache
+from . import connection_pool
+from . import queries
+
+CACHE_KEY = 'consad.principals'
+
+PRINCIPAL_QUERY = ("SELECT u.id_usuario, u.nombre, z.id_zona, z.nombre AS zona, "
+                   "d.id_departamento, d.nombre AS departamento, u.token "
+                   "FROM usuarios AS u INNER JOIN zona AS z ON(z.id_zona = u.id_zona) "
+                   "INNER JOIN departamento AS d ON(d.id_departamento = u.id_departamento) ")
+
+BY_TOKEN = queries.register('principal.token', PRINCIPAL_QUERY + 'WHERE u.token=?')
+BY_ID = queries.register('principal.usuario', PRINCIPAL_QUERY + 'WHERE u.id_usuario=?')
+
+# session keys filled from a principal, in the order of PRINCIPAL_QUERY
+SESSION_KEYS = ('userid', 'username', 'zonaid', 'zonaname', 'deptoid', 'deptoname')
+
+# endpoints of the static files, served without a session
+STATIC_ENDPOINTS = ('static', 'assets')
+
+
+def token_hash(token):
+    """ returns the key of a token in the cache, tokens are never kept in memory """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _load(name, value):
+    row = queries.execute(connection_pool.get_driver(), name, [value]).fetchone()
+    if row is None:
+        return None
+    return tuple(row[:6]) + (token_hash(row[6]),)
+
+
+def authenticate(token):
+    """
+    returns the principal of a token, the JOIN only runs when the token is
+    not cached, unknown tokens are not cached
+    """
+    key = token_hash(token)
+    cache = get_cache()
+    principal = cache.get(key)
+    if principal is None:
+        version = cache.version
+        principal = _load(BY_TOKEN, token)
+        if principal is not None:
+            cache.put(key, principal, version)
+    return principal
+
+
+def start_session(principal):
+    """ copies a principal to the session of the user """
+    rotate = getattr(session, 'rotate', None)
+    if rotate is not None:
+        # server side sessions get a new id on every login
+        rotate()
+    session.update(zip(SESSION_KEYS, principal))
+    session['principal'] = principal[6]
+
+
+def revalidate_session():
+    """
+    checks the principal of the session before every request. Cached
+    principals expire after a short time or when the catalogs are
+    invalidated, then the user is read again by id, so a reassigned zona or
+    departamento reaches the session without a new login and a changed or
+    deleted token ends it.
+    """
+    # static files must not read the session, it would make them vary by cookie
+    if request.endpoint in STATIC_ENDPOINTS:
+        return
+    if session.get('userid') is None:
+        return
+    key = session.get('principal')
+    cache = get_cache()
+    principal = cache.get(key) if key is not None else None
+    if principal is None:
+        version = cache.version
+        principal = _load(BY_ID, session['userid'])
+        if principal is None or principal[6] != key:
+            session.clear()
+            return
+        cache.put(key, principal, version)
+    if any(session.get(name) != value for name, value in zip(SESSION_KEYS, principal)):
+        session.update(zip(SESSION_KEYS, principal))
+
+
+def init_app(app):
+    """
+    creates the principal cache, it shares the version file of the catalog
+    cache so 'flask database invalidate-cache' also drops every principal
+    """
+    cache = catalog_cache.CatalogCache(
+        Path(app.instance_path).joinpath(catalog_cache.VERSION_FILE),
+        ttl=app.config.get('PRINCIPAL_CACHE_TTL', 60),
+        max_bytes=app.config.get('PRINCIPAL_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+    app.extensions[CACHE_KEY] = cache
+    app.before_request(revalidate_session)
+    return cache
+
+
+def get_cache():
+    """ returns the principal cache of the current application """
+    return current_app.extensions[CACHE_KEY]
@@ -0,0 +1,145 @@
+"""
+Provides the registry of the named queries of the application
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import threading
+import time
+from .database_driver import DatabaseType
+
+
+class QueryError(KeyError):
+    """ raised when a query is not registered or is registered twice """
+
+
+class QueryRegistry():
+    """
+    Queries declared once by name and executed by name. The SQL of a query
+    is either a string or a callable receiving the DatabaseType, for
+    statements written differently by each database. Every pooled connection
+    keeps one cursor per query, MariaDB cursors are prepared, so a statement
+    is parsed once per connection; sqlite3 reuses the statement from its own
+    cache because the SQL text of a name never changes. The time spent in
+    execute is accumulated per query. Queries that can not avoid reading a
+    whole table, like searches by substring, are registered with
+    full_scan=True so the index advisor does not flag them. Statements built
+    from options, like reports, register one name per variant when first run.
+    """
+
+    def __init__(self):
+        self.__queries = {}
+        self.__full_scans = set()
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def register(self, name, sql, full_scan=False):
+        """ declares a query, registering the same name and SQL again is allowed """
+        with self.__lock:
+            current = self.__queries.get(name)
+            if current is not None and not _same_sql(current, sql):
+                raise QueryError(f'query {name} is already registered')
+            self.__queries[name] = sql
+            if full_scan:
+                self.__full_scans.add(name)
+            self.__stats.setdefault(name, [0, 0.0, 0.0])
+        return name
+
+    def expects_full_scan(self, name):
+        """ tells if a query was registered as reading whole tables on purpose """
+        return name in self.__full_scans
+
+    def __contains__(self, name):
+        return name in self.__queries
+
+    def names(self):
+        """ returns the names of the registered queries, sorted """
+        return sorted(self.__queries)
+
+    def sql(self, name, database_type=DatabaseType.SQLITE):
+        """ returns the SQL of a query for a database type """
+        try:
+            sql = self.__queries[name]
+        except KeyError:
+            raise QueryError(f'unknown query {name}') from None
+        return sql(database_type) if callable(sql) else sql
+
+    def cursor(self, driver, name):
+        """
+        returns the cursor of a query on the connection of a driver, created
+        and prepared on first use. Rows must be read before the same query is
+        executed again on that connection.
+        """
+        statements = getattr(driver.connection, 'statements', None)
+        if statements is None:
+            # connections outside a pool get a new cursor every time
+            return driver.connection.cursor()
+        cur = statements.get(name)
+        if cur is None:
+            if driver.database_type == DatabaseType.MARIADB:
+                cur = driver.connection.cursor(prepared=True)
+            else:
+                cur = driver.connection.cursor()
+            statements[name] = cur
+        return cur
+
+    def execute(self, driver, name, params=(), cursor=None):
+        """
+        executes a query by name and returns its cursor with the rows, a
+        cursor given, like a server side one, is used instead of the cached one
+        """
+        sql = self.sql(name, driver.database_type)
+        cur = cursor if cursor is not None else self.cursor(driver, name)
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        self.__record(name, time.perf_counter() - start)
+        return cur
+
+    def executemany(self, driver, name, rows):
+        """ executes a query by name once per row, returns its cursor """
+        sql = self.sql(name, driver.database_type)
+        cur = self.cursor(driver, name)
+        start = time.perf_counter()
+        cur.executemany(sql, rows)
+        self.__record(name, time.perf_counter() - start)
+        return cur
+
+    def __record(self, name, elapsed):
+        with self.__lock:
+            stats = self.__stats[name]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+    def stats(self):
+        """ returns calls, total and maximum seconds of every query executed so far """
+        with self.__lock:
+            return {name: {'calls': calls, 'total': total, 'max': longest,
+                           'mean': total / calls}
+                    for name, (calls, total, longest) in self.__stats.items() if calls}
+
+    def reset_stats(self):
+        """ clears the timing of every query """
+        with self.__lock:
+            for name in self.__stats:
+                self.__stats[name] = [0, 0.0, 0.0]
+
+
+def _same_sql(current, sql):
+    """ callables registered again are the same query when they write the same SQL """
+    if current == sql:
+        return True
+    if not (callable(current) or callable(sql)):
+        return False
+    return all((current(database_type) if callable(current) else current) ==
+               (sql(database_type) if callable(sql) else sql)
+               for database_type in (DatabaseType.SQLITE, DatabaseType.MARIADB))
+
+
+REGISTRY = QueryRegistry()
+
+# pylint: disable=invalid-name
+register = REGISTRY.register
+execute = REGISTRY.execute
+executemany = REGISTRY.executemany
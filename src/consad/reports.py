@@ -0,0 +1,263 @@
+"""
+Provides consolidation reports aggregated inside the database
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import csv
+import itertools
+import sys
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from . import connection_pool
+from . import queries
+from .database_driver import DatabaseType
+from .summaries import populated
+
+reports_cli = AppGroup('reportes')
+
+# key in the aggregated solicitudes, catalog table, catalog key and label
+DIMENSIONS = {
+    'periodo': ('b.id_periodo', 'periodo', 'id_periodo', 'descripcion'),
+    'zona': ('b.id_zona', 'zona', 'id_zona', 'nombre'),
+    'grupo': ('m.id_grupo', 'grupo', 'id_grupo', 'nombre'),
+    'material': ('b.id_material', 'materiales', 'id_material', 'descripcion'),
+}
+
+# dimensions that are columns of solicitudes and are aggregated first
+BASE_DIMENSIONS = ('periodo', 'zona')
+
+FILTERS = {
+    'id_periodo': 's.id_periodo',
+    'id_zona': 's.id_zona',
+    'id_grupo': 'm.id_grupo',
+}
+
+
+DEFAULT_DIMENSIONS = 'periodo,grupo,material'
+
+# groupings registered on import with every combination of filters, so the
+# index advisor explains them before anyone requests them
+ADVISED_DIMENSIONS = (DEFAULT_DIMENSIONS, 'periodo,zona')
+
+# filters that restrict the solicitudes read, without them a report reads all
+RESTRICTING_FILTERS = ('id_periodo', 'id_zona')
+
+
+class ReportError(ValueError):
+    """ raised when a report is requested with invalid dimensions """
+
+
+class ConsolidatedReport():
+    """
+    Totals of cantidad and importe (cantidad * precio_unitario) grouped by
+    the requested dimensions, with optional subtotals for every level like
+    GROUP BY ... WITH ROLLUP. MariaDB runs the native ROLLUP, SQLite gets
+    the same grouping sets as a UNION ALL, both without leaving the database.
+    With summaries the report reads the materialized summary tables when
+    its dimensions and filters allow it and refresh-summaries completed
+    them, solicitudes otherwise. Every combination of dimensions, filters,
+    rollup and source is a query of its own in the registry.
+    """
+
+    def __init__(self, database_type, dimensions, filters=None, rollup=True, summaries=False):
+        if not dimensions:
+            raise ReportError('at least one dimension is required')
+        for dimension in dimensions:
+            if dimension not in DIMENSIONS:
+                raise ReportError(f'unknown dimension: {dimension}')
+        if len(set(dimensions)) != len(dimensions):
+            raise ReportError('dimensions must not repeat')
+        self.__database_type = database_type
+        self.__dimensions = list(dimensions)
+        filters = filters or {}
+        # in the order of FILTERS, so the same filters always give the same query
+        self.__filters = {key: filters[key] for key in FILTERS
+                          if filters.get(key) not in (None, '')}
+        self.__rollup = rollup
+        self.__summary = self.__pick_summary() if summaries else None
+
+    def __pick_summary(self):
+        """ returns the materialized summary able to answer the report, if any """
+        dimensions = set(self.__dimensions)
+        filters = set(self.__filters)
+        if dimensions <= {'periodo', 'grupo', 'material'} and filters <= {'id_periodo', 'id_grupo'}:
+            return 'resumen_periodo_material'
+        if dimensions <= {'periodo', 'zona'} and filters <= {'id_periodo', 'id_zona'}:
+            return 'resumen_periodo_zona'
+        return None
+
+    @property
+    def headings(self):
+        """ names of the columns returned by the report """
+        headings = []
+        for dimension in self.__dimensions:
+            headings.append(f'id_{dimension}')
+            headings.append(dimension)
+        return headings + ['cantidad', 'importe', 'solicitudes']
+
+    def __detail(self):
+        """
+        aggregation by every requested dimension. solicitudes is summed per
+        material first, so the index on (id_periodo, id_material) answers it
+        and materiales is only joined to the already aggregated rows
+        """
+        if self.__summary == 'resumen_periodo_zona':
+            return self.__zona_summary()
+        source = 'solicitudes'
+        count = 'COUNT(*)'
+        if self.__summary is not None:
+            source = self.__summary
+            count = 'SUM(s.solicitudes)'
+        base_keys = ['s.id_material AS id_material']
+        base_group = ['s.id_material']
+        for dimension in BASE_DIMENSIONS:
+            if dimension in self.__dimensions:
+                base_keys.append(f's.id_{dimension} AS id_{dimension}')
+                base_group.append(f's.id_{dimension}')
+        base_filters = [key for key in self.__filters if FILTERS[key].startswith('s.')]
+        detail_filters = [key for key in self.__filters if FILTERS[key].startswith('m.')]
+        base = ('SELECT ' + ', '.join(base_keys) + ', SUM(s.cantidad) AS cantidad, '
+                f'{count} AS solicitudes FROM {source} AS s')
+        if base_filters:
+            base += ' WHERE ' + ' AND '.join(f'{FILTERS[key]}=?' for key in base_filters)
+        base += ' GROUP BY ' + ', '.join(base_group)
+        keys = [DIMENSIONS[dimension][0] for dimension in self.__dimensions]
+        query = ('SELECT ' + ', '.join(f'{expr} AS k{pos}' for pos, expr in enumerate(keys)) +
+                 ', SUM(b.cantidad) AS cantidad, SUM(b.cantidad * m.precio_unitario) AS importe,'
+                 ' SUM(b.solicitudes) AS solicitudes'
+                 f' FROM ({base}) AS b'
+                 ' INNER JOIN materiales AS m ON(m.id_material=b.id_material)')
+        if detail_filters:
+            query += ' WHERE ' + ' AND '.join(f'{FILTERS[key]}=?' for key in detail_filters)
+        query += ' GROUP BY ' + ', '.join(keys)
+        params = ([self.__filters[key] for key in base_filters] +
+                  [self.__filters[key] for key in detail_filters])
+        return query, params
+
+    def __zona_summary(self):
+        """ aggregation read from the summary by periodo and zona """
+        keys = [DIMENSIONS[dimension][0] for dimension in self.__dimensions]
+        query = ('SELECT ' + ', '.join(f'{expr} AS k{pos}' for pos, expr in enumerate(keys)) +
+                 ', SUM(b.cantidad) AS cantidad, SUM(b.importe) AS importe,'
+                 ' SUM(b.solicitudes) AS solicitudes FROM resumen_periodo_zona AS b')
+        if self.__filters:
+            query += ' WHERE ' + ' AND '.join(f'b.{key}=?' for key in self.__filters)
+        query += ' GROUP BY ' + ', '.join(keys)
+        return query, list(self.__filters.values())
+
+    @property
+    def name(self):
+        """ name of the query of the report in the registry """
+        return ':'.join(('reportes.consolidado', ','.join(self.__dimensions),
+                         ','.join(self.__filters), 'rollup' if self.__rollup else 'detalle',
+                         self.__summary or 'solicitudes'))
+
+    def statement(self):
+        """ returns the SQL of the report and its parameters """
+        return self.__statement(self.__database_type)
+
+    def sql(self, database_type):
+        """ returns the SQL of the report for a database type, the SQL of its query """
+        return self.__statement(database_type)[0]
+
+    def __statement(self, database_type):
+        levels = len(self.__dimensions)
+        prefix = ''
+        inner, params = self.__detail()
+        if self.__rollup and database_type == DatabaseType.MARIADB:
+            inner += ' WITH ROLLUP'
+        elif self.__rollup:
+            # every subtotal level is summed from the detail rows
+            prefix = f'WITH d AS ({inner}) '
+            parts = []
+            for level in range(levels, -1, -1):
+                keys = [f'k{pos}' if pos < level else f'NULL AS k{pos}'
+                        for pos in range(levels)]
+                part = ('SELECT ' + ', '.join(keys) + ', SUM(cantidad) AS cantidad, '
+                        'SUM(importe) AS importe, SUM(solicitudes) AS solicitudes FROM d')
+                if level > 0:
+                    part += ' GROUP BY ' + ', '.join(f'k{pos}' for pos in range(level))
+                parts.append(part)
+            inner = ' UNION ALL '.join(parts)
+        columns = []
+        joins = []
+        order = []
+        for pos, dimension in enumerate(self.__dimensions):
+            _, table, key, label = DIMENSIONS[dimension]
+            columns.append(f'r.k{pos}, c{pos}.{label}')
+            joins.append(f' LEFT JOIN {table} AS c{pos} ON(c{pos}.{key}=r.k{pos})')
+            # subtotals go after the detail rows they summarize
+            order.append(f'r.k{pos} IS NULL, r.k{pos}')
+        query = (prefix + 'SELECT ' + ', '.join(columns) +
+                 ', r.cantidad, r.importe, r.solicitudes '
+                 f'FROM ({inner}) AS r' + ''.join(joins) + ' WHERE r.solicitudes > 0'
+                 ' ORDER BY ' + ', '.join(order))
+        return query, params
+
+    def register(self):
+        """ registers the query of the report, returns its name """
+        name = self.name
+        if name not in queries.REGISTRY:
+            # the summaries are small, solicitudes is read whole when unfiltered
+            queries.register(name, self.sql, full_scan=self.__summary is not None or not any(
+                key in self.__filters for key in RESTRICTING_FILTERS))
+        return name
+
+    def execute(self, driver):
+        """ runs the report, the rows are left in the cursor returned """
+        if self.__summary is not None and not populated(driver):
+            self.__summary = None
+        name = self.register()
+        return queries.execute(driver, name, self.statement()[1])
+
+
+def parse_dimensions(value):
+    """ accepts a list or a comma separated string of dimensions """
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(',') if item.strip()]
+    return list(value or [])
+
+
+def _register_advised():
+    """ registers the reports of ADVISED_DIMENSIONS for the index advisor """
+    for dimensions in ADVISED_DIMENSIONS:
+        for count in range(len(FILTERS) + 1):
+            for keys in itertools.combinations(FILTERS, count):
+                for summaries in (False, True):
+                    ConsolidatedReport(DatabaseType.SQLITE, parse_dimensions(dimensions),
+                                       dict.fromkeys(keys, 0), True, summaries).register()
+
+
+_register_advised()
+
+
+@reports_cli.command('consolidado')
+@click.option('--agrupar', default=DEFAULT_DIMENSIONS, show_default=True,
+              help='dimensions separated by commas: periodo, zona, grupo, material')
+@click.option('--periodo', 'id_periodo', type=int, default=None)
+@click.option('--zona', 'id_zona', type=int, default=None)
+@click.option('--grupo', 'id_grupo', type=int, default=None)
+@click.option('--rollup/--no-rollup', default=True, show_default=True)
+def consolidated_report(agrupar, id_periodo, id_zona, id_grupo, rollup):
+    """
+    Prints the consolidated report as CSV
+    """
+    driver = connection_pool.get_driver()
+    try:
+        report = ConsolidatedReport(driver.database_type, parse_dimensions(agrupar),
+                                    {'id_periodo': id_periodo, 'id_zona': id_zona,
+                                     'id_grupo': id_grupo}, rollup,
+                                    current_app.config.get('SUMMARIES', False))
+    except ReportError as exc:
+        raise click.BadParameter(str(exc), param_hint='--agrupar')
+    cur = report.execute(driver)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(report.headings)
+    while True:
+        rows = cur.fetchmany(1000)
+        if not rows:
+            break
+        writer.writerows(rows)
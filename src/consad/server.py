@@ -0,0 +1,320 @@
+"""
+Provides the pre-fork server of the application
+
+A master process binds the socket, creates the application and forks the
+workers, every worker answers requests on a fixed number of threads. The
+master restarts workers that die, reloads them when config.json changes
+or on SIGHUP and stops them on SIGTERM or SIGINT; workers stop accepting
+and finish the requests in progress before they exit. Run it with:
+
+    consad serve [--host H] [--port P] [--workers N] [--threads N]
+
+Every worker answers on as many threads as its pool has connections
+(pool_size) unless --threads says otherwise; more threads than
+connections only wait in the pool, so a larger value is warned about.
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import click
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from . import create_app
+from . import connection_pool
+from . import metrics
+from . import sessions
+from . import write_behind
+
+logger = logging.getLogger('consad.server')
+
+# a worker that dies sooner than this after its start is restarted later
+MIN_LIFETIME = 1.0
+
+# seconds between checks of the workers and of config.json
+TICK = 0.5
+
+
+class RequestHandler(WSGIRequestHandler):
+    """ answers one request per connection, workers never wait on idle keep-alives """
+    protocol_version = 'HTTP/1.0'
+    access_log = False
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class WorkerServer(BaseWSGIServer):
+    """
+    WSGI server of a worker, it shares the listening socket of the master and
+    answers on a fixed number of threads. A connection is only accepted when
+    a thread is free, the others are left for the other workers.
+    """
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, fd, threads):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        # the socket is shared, a worker that loses the race to accept
+        # must not block
+        self.socket.setblocking(False)
+        self.__parent = os.getppid()
+        self.__free = threading.BoundedSemaphore(threads)
+        self.__executor = ThreadPoolExecutor(max_workers=threads,
+                                             thread_name_prefix='consad-worker')
+
+    def stop(self):
+        """ stops accepting, shutdown waits for serve_forever so it runs in a thread """
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def service_actions(self):
+        # a worker whose master was killed stops on its own
+        if os.getppid() != self.__parent:
+            self.__parent = os.getppid()
+            self.stop()
+
+    def get_request(self):
+        self.__free.acquire()
+        try:
+            return super().get_request()
+        except OSError:
+            self.__free.release()
+            raise
+
+    def process_request(self, request, client_address):
+        request.setblocking(True)
+        self.__executor.submit(self.__answer, request, client_address)
+
+    def __answer(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.__free.release()
+
+    def drain(self):
+        """ waits for the requests in progress """
+        self.__executor.shutdown(wait=True)
+
+
+def run_worker(app, listener, threads):
+    """ body of a forked worker, it never returns """
+    status = 0
+    try:
+        host, port = listener.getsockname()[:2]
+        server = WorkerServer(host, port, app, listener.fileno(), threads)
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: server.stop())
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        server.serve_forever(poll_interval=TICK)
+        server.drain()
+        metrics.flush(app)
+        write_behind.close(app)
+        sessions.close(app)
+        connection_pool.close_pools(app)
+    except BaseException:  # pylint: disable=broad-except
+        logger.exception('worker %s failed', os.getpid())
+        status = 1
+    finally:
+        logging.shutdown()
+        os._exit(status)  # pylint: disable=protected-access
+
+
+class Master():
+    """
+    Forks and supervises the workers. Every generation of workers comes
+    from an application created in the master, forked workers share its
+    memory; the master closes its idle connections before every fork and
+    the fork handlers empty the pools and caches in the child, so no
+    connection crosses a fork. The config.json of the instance folder is
+    watched for changes.
+    """
+
+    def __init__(self, factory, listener, workers, threads=None, graceful_timeout=30):
+        self.factory = factory
+        self.listener = listener
+        self.workers = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.__app = None
+        self.__worker_threads = threads
+        self.__current = {}
+        self.__retiring = {}
+        self.__signals = []
+        self.__config_stamp = None
+
+    def __stamp(self):
+        try:
+            stat = os.stat(Path(self.__app.instance_path).joinpath('config.json'))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def __use(self, app):
+        """ makes app the application of the next workers, sized by its pool """
+        self.__app = app
+        pool_size = app.config.get('POOL_SIZE', 5)
+        if self.threads is None:
+            self.__worker_threads = pool_size
+        else:
+            self.__worker_threads = self.threads
+            if self.threads > pool_size:
+                logger.warning('%s threads per worker share %s pooled connections, the '
+                               'rest wait up to pool_timeout for one', self.threads, pool_size)
+
+    def __spawn(self):
+        connection_pool.close_idle()
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            run_worker(self.__app, self.listener, self.__worker_threads)
+        self.__current[pid] = time.monotonic()
+        logger.info('worker %s started', pid)
+
+    def __reload(self):
+        """ starts a new generation of workers, the previous one drains and exits """
+        try:
+            app = self.factory()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('reload failed, the workers keep the previous configuration')
+            return
+        old = self.__app
+        self.__use(app)
+        previous = self.__current
+        self.__current = {}
+        for _ in range(self.workers):
+            self.__spawn()
+        self.__retire(previous)
+        # the new generation forked without them, the master closes them too
+        write_behind.close(old)
+        sessions.close(old)
+        connection_pool.close_pools(old)
+        logger.info('reloaded %s workers', self.workers)
+
+    def __retire(self, workers):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in workers:
+            self.__retiring[pid] = deadline
+            self.__kill(pid, signal.SIGTERM)
+
+    @staticmethod
+    def __kill(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def __reap(self):
+        """ collects the workers that exited, returns the unexpected ones """
+        lost = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.__retiring.pop(pid, None) is not None:
+                continue
+            started = self.__current.pop(pid, None)
+            if started is not None:
+                logger.warning('worker %s exited with status %s', pid, status)
+                lost.append(started)
+        return lost
+
+    def __expire_retiring(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.__retiring.items()):
+            if now >= deadline:
+                logger.warning('worker %s did not drain in time', pid)
+                self.__kill(pid, signal.SIGKILL)
+                self.__retiring[pid] = float('inf')
+
+    def run(self):
+        """ serves until SIGTERM or SIGINT, then drains every worker """
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self.__signals.append(signum))
+        self.__use(self.factory())
+        logger.info('%s workers of %s threads', self.workers, self.__worker_threads)
+        self.__config_stamp = self.__stamp()
+        for _ in range(self.workers):
+            self.__spawn()
+        while True:
+            time.sleep(TICK)
+            if signal.SIGTERM in self.__signals or signal.SIGINT in self.__signals:
+                break
+            stamp = self.__stamp()
+            if signal.SIGHUP in self.__signals or stamp != self.__config_stamp:
+                self.__signals.clear()
+                self.__config_stamp = stamp
+                self.__reload()
+            for started in self.__reap():
+                if time.monotonic() - started < MIN_LIFETIME:
+                    time.sleep(MIN_LIFETIME)
+                self.__spawn()
+            self.__expire_retiring()
+        logger.info('stopping, waiting for the requests in progress')
+        self.__retire(list(self.__current))
+        self.__current = {}
+        while self.__retiring:
+            time.sleep(TICK / 5)
+            self.__reap()
+            self.__expire_retiring()
+        write_behind.close(self.__app)
+        sessions.close(self.__app)
+        connection_pool.close_pools(self.__app)
+        self.listener.close()
+
+
+def listen(host, port, backlog=2048):
+    """ binds the socket shared by the workers """
+    listener = socket.create_server((host, port), backlog=backlog)
+    listener.set_inheritable(True)
+    return listener
+
+
+@click.group()
+def cli():
+    """ consad application server """
+
+
+@cli.command('serve')
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8000, show_default=True, type=int)
+@click.option('--workers', default=os.cpu_count() or 1, show_default='CPU count', type=int)
+@click.option('--threads', default=None, show_default='pool_size', type=int,
+              help='requests answered at once by every worker')
+@click.option('--graceful-timeout', default=30, show_default=True, type=int,
+              help='seconds a stopping worker has to finish its requests')
+@click.option('--instance', 'instance_path', default=None,
+              help='instance folder with config.json')
+@click.option('--access-log', is_flag=True, help='log every request')
+def serve(host, port, workers, threads, graceful_timeout, instance_path, access_log):
+    """
+    Serves the application with pre-forked workers
+    """
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+    RequestHandler.access_log = access_log
+    if instance_path is not None:
+        instance_path = str(Path(instance_path).resolve())
+    listener = listen(host, port)
+    logger.info('listening on http://%s:%s', host, listener.getsockname()[1])
+    Master(lambda: create_app(instance_path), listener, workers, threads,
+           graceful_timeout).run()
+
+
+if __name__ == '__main__':
+    cli()
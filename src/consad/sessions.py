@@ -0,0 +1,242 @@
+"""
+Provides server side sessions stored in SQLite or in the application database
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import json
+import secrets
+import threading
+import time
+from pathlib import Path
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from . import connection_pool
+from . import database_driver
+from . import queries
+from .database_driver import DatabaseType
+
+STORE_KEY = 'consad.session_store'
+SESSIONS_FILE = 'sessions.db'
+
+# expired sessions deleted by each purge statement
+PURGE_BATCH = 1000
+
+CREATE_TABLE = ("CREATE TABLE IF NOT EXISTS sesiones(id_sesion TEXT PRIMARY KEY, "
+                "datos TEXT NOT NULL, expira REAL NOT NULL, id_usuario INTEGER)")
+CREATE_INDEXES = ("CREATE INDEX IF NOT EXISTS ix_sesiones_expira ON sesiones(expira)",
+                  "CREATE INDEX IF NOT EXISTS ix_sesiones_usuario ON sesiones(id_usuario)")
+
+
+def _save(database_type):
+    return database_driver.upsert_statement(database_type, 'sesiones',
+                                            ('id_sesion', 'datos', 'expira', 'id_usuario'),
+                                            ('id_sesion',))
+
+
+def _purge(database_type):
+    if database_type == DatabaseType.MARIADB:
+        return 'DELETE FROM sesiones WHERE expira<=? LIMIT ?'
+    return ('DELETE FROM sesiones WHERE id_sesion IN '
+            '(SELECT id_sesion FROM sesiones WHERE expira<=? LIMIT ?)')
+
+
+LOAD = queries.register('sesiones.leer', 'SELECT datos, expira FROM sesiones '
+                        'WHERE id_sesion=? AND expira>?')
+SAVE = queries.register('sesiones.guardar', _save)
+DELETE = queries.register('sesiones.borrar', 'DELETE FROM sesiones WHERE id_sesion=?')
+REVOKE = queries.register('sesiones.revocar', 'DELETE FROM sesiones WHERE id_usuario=?')
+PURGE = queries.register('sesiones.depurar', _purge)
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """
+    Session whose values live in a store, the client only keeps its id
+    """
+
+    def __init__(self, initial=None, sid=None, expires=None):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.previous_sid = None
+        self.modified = False
+
+    def rotate(self):
+        """ gives the session a new id, used after a login to avoid fixation """
+        if self.sid is not None and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+
+class SessionStore():
+    """
+    Sessions kept in a table of a pooled database. Expired rows are deleted in
+    batches by purge, at most once every purge_interval seconds per process.
+    """
+
+    def __init__(self, pool, database_type=DatabaseType.SQLITE, purge_interval=60):
+        self.__pool = pool
+        self.__database_type = database_type
+        self.__purge_interval = purge_interval
+        self.__next_purge = time.monotonic() + purge_interval
+        self.__lock = threading.Lock()
+
+    def close(self):
+        """ closes the connections of the store """
+        self.__pool.close()
+
+    def __run(self, name, params=(), fetch=False):
+        driver = database_driver.DatabaseDriver(self.__database_type, pool=self.__pool)
+        try:
+            cur = queries.execute(driver, name, params)
+            result = cur.fetchone() if fetch else cur.rowcount
+            driver.connection.commit()
+            return result
+        finally:
+            driver.close()
+
+    def load(self, sid):
+        """ returns the data and expiration of a session, None if missing or expired """
+        row = self.__run(LOAD, (sid, time.time()), fetch=True)
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, data, expires):
+        """ stores the data of a session """
+        self.__run(SAVE, (sid, _dumps(data), expires, data.get('userid')))
+        self.maybe_purge()
+
+    def delete(self, sid):
+        """ removes a session """
+        self.__run(DELETE, (sid,))
+
+    def revoke(self, id_usuario):
+        """ removes every session of a user, in every worker, returns how many """
+        return self.__run(REVOKE, (id_usuario,))
+
+    def purge(self, batch=PURGE_BATCH):
+        """ deletes expired sessions in batches, returns how many were deleted """
+        total = 0
+        now = time.time()
+        while True:
+            deleted = self.__run(PURGE, (now, batch))
+            total += deleted
+            if deleted < batch:
+                return total
+
+    def maybe_purge(self):
+        """ purges when the purge interval of this process elapsed """
+        with self.__lock:
+            now = time.monotonic()
+            if now < self.__next_purge:
+                return
+            self.__next_purge = now + self.__purge_interval
+        self.purge()
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Keeps the session in a SessionStore, the cookie carries only an opaque
+    random id. Unchanged sessions are not written again until half of their
+    lifetime has passed.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            stored = self.store.load(sid)
+            if stored is not None:
+                return ServerSession(stored[0], sid, stored[1])
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+            session.previous_sid = None
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        refresh = session.expires is None or session.expires - now < lifetime / 2
+        if not (session.modified or session.sid is None or refresh):
+            return
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.expires = now + lifetime
+        self.store.save(session.sid, dict(session), session.expires)
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+
+
+def sqlite_store(path, pool_size=5):
+    """ returns a store in a local SQLite file, the table is created when missing """
+    sqlite3 = database_driver.driver_module(DatabaseType.SQLITE)
+
+    def factory():
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    pool = connection_pool.ConnectionPool(factory, size=pool_size)
+    conn = pool.checkout()
+    try:
+        conn.execute(CREATE_TABLE)
+        for query in CREATE_INDEXES:
+            conn.execute(query)
+        conn.commit()
+    finally:
+        conn.close()
+    return SessionStore(pool, DatabaseType.SQLITE)
+
+
+def init_app(app, data_source=None):
+    """
+    installs the session store chosen by SESSION_STORE: 'cookie' keeps the
+    signed cookie of flask, 'sqlite' uses a file in the instance folder and
+    'database' the sesiones table of the configured database. The database
+    store has a pool of its own: sessions are saved after the view while the
+    request still holds its connection, sharing the request pool would need
+    two connections per request and deadlock once every one is taken
+    """
+    kind = app.config.get('SESSION_STORE', 'cookie')
+    if kind == 'sqlite':
+        store = sqlite_store(Path(app.instance_path).joinpath(SESSIONS_FILE))
+    elif kind == 'database' and data_source is not None:
+        store = SessionStore(connection_pool.create_pool(
+            app, data_source, app.config.get('SESSION_POOL_SIZE')), app.config['DRIVER'])
+    else:
+        return None
+    app.extensions[STORE_KEY] = store
+    app.session_interface = ServerSessionInterface(store)
+    return store
+
+
+def get_store(app):
+    """ returns the session store of an application, None with cookie sessions """
+    return app.extensions.get(STORE_KEY)
+
+
+def close(app):
+    """ closes the connections of the session store of an application """
+    store = get_store(app)
+    if store is not None:
+        store.close()
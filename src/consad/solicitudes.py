@@ -0,0 +1,331 @@
+"""
+Provides bulk import and batch edition of solicitudes
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import codecs
+import csv
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from . import connection_pool
+from . import database_driver
+from . import pagination
+from . import queries
+from . import summaries
+
+solicitudes_cli = AppGroup('solicitudes')
+
+# primary key of solicitudes, saves are upserts on it
+SOLICITUD_KEY = ('id_material', 'id_zona', 'id_departamento', 'id_periodo')
+
+# rows written by each executemany, every batch is its own transaction
+BATCH_SIZE = 1000
+
+# per row errors kept in the result, the rest are only counted
+MAX_ERRORS = 200
+
+# operations accepted in a single batch, also bounds the IN lists built from it
+MAX_OPERATIONS = 500
+
+# columns of the rows returned after a batch, same as the capture table
+CHANGED_QUERY = ("SELECT m.id_material, p.id_periodo, m.descripcion, s.cantidad, "
+                 "m.unidad_medida, m.precio_unitario FROM solicitudes AS s "
+                 " INNER JOIN materiales AS m ON(m.id_material=s.id_material)"
+                 " INNER JOIN periodo AS p ON(p.id_periodo = s.id_periodo)"
+                 " WHERE s.id_zona=? AND s.id_departamento=? AND s.id_periodo=?")
+
+# lengths of the IN lists of CHANGED_QUERY, a batch pads its list to the next one
+CHANGED_SIZES = (1, 10, 100, MAX_OPERATIONS)
+CHANGED = {size: queries.register(f'solicitudes.cambios:{size}', CHANGED_QUERY +
+                                  f' AND s.id_material IN ({", ".join("?" * size)})'
+                                  ' ORDER BY m.descripcion')
+           for size in CHANGED_SIZES}
+
+# solicitudes of a zona, departamento and periodo as shown in the capture table
+PAGE_QUERY = pagination.PagedQuery(
+    {'id': 'm.id_material', 'periodo': 'p.id_periodo', 'material': 'm.descripcion',
+     'cantidad': 's.cantidad', 'unidad': 'm.unidad_medida',
+     'precio': 'm.precio_unitario'},
+    "solicitudes AS s "
+    " INNER JOIN departamento AS d ON(d.id_departamento=s.id_departamento)"
+    " INNER JOIN zona AS z ON(z.id_zona=s.id_zona)"
+    " INNER JOIN materiales AS m ON(m.id_material=s.id_material)"
+    " INNER JOIN periodo AS p ON(p.id_periodo = s.id_periodo)"
+    " WHERE s.id_zona=? AND s.id_departamento=? AND s.id_periodo=?",
+    search=('m.id_material', 'm.descripcion'), has_where=True, name='solicitudes')
+
+
+def _upsert(database_type):
+    return database_driver.upsert_statement(database_type, 'solicitudes',
+                                            SOLICITUD_KEY + ('cantidad',), SOLICITUD_KEY)
+
+
+UPSERT = queries.register('solicitudes.guardar', _upsert)
+DELETE = queries.register('solicitudes.borrar', "DELETE FROM solicitudes WHERE id_material=? "
+                          "AND id_zona=? AND id_departamento=? AND id_periodo=?")
+DELETE_MATERIAL = queries.register('solicitudes.borrar_material',
+                                   "DELETE FROM solicitudes WHERE id_zona=? "
+                                   "AND id_departamento=? AND id_material=?")
+# imports check every material of the file against the catalog
+MATERIAL_IDS = queries.register('materiales.claves', 'SELECT id_material FROM materiales',
+                                full_scan=True)
+
+# accepted names of the columns of the file
+HEADINGS = {
+    'id_material': 'id_material', 'material': 'id_material', 'clave': 'id_material',
+    'cantidad': 'cantidad',
+}
+
+
+class ImportFileError(ValueError):
+    """ raised when a file can not be imported at all """
+
+
+class BatchError(ValueError):
+    """ raised when any operation of a batch is invalid, nothing is applied """
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid operations')
+        self.errors = errors
+
+
+class ImportResult():
+    """ counters and per row errors of an import """
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+
+    def error(self, line, message):
+        """ records a rejected row """
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'linea': line, 'error': message})
+
+    def as_dict(self):
+        """ result returned to the client """
+        return {'success': True, 'importados': self.imported, 'rechazados': self.rejected,
+                'errores': self.errors}
+
+
+def execute_page(driver, id_zona, id_departamento, id_periodo, args):
+    """
+    runs the page of solicitudes requested in args, returns the cursor with
+    the rows, the page request and the total of rows
+    """
+    page = PAGE_QUERY.page_request(args)
+    cur, total = PAGE_QUERY.run(driver, page, [id_zona, id_departamento, id_periodo])
+    return cur, page, total
+
+
+def save(driver, id_material, id_zona, id_departamento, id_periodo, cantidad,
+         refresh_summaries=False):
+    """ inserts or updates a solicitud with a single statement and commits """
+    keys = [(id_material, id_zona, id_departamento, id_periodo)]
+    if refresh_summaries:
+        summaries.subtract(driver, keys)
+    queries.execute(driver, UPSERT, [id_material, id_zona, id_departamento, id_periodo, cantidad])
+    if refresh_summaries:
+        summaries.add(driver, keys)
+    driver.connection.commit()
+
+
+def delete(driver, id_zona, id_departamento, id_material, refresh_summaries=False):
+    """ deletes a material from the solicitudes of a zona and departamento and commits """
+    keys = []
+    if refresh_summaries:
+        keys = [(id_material, id_zona, id_departamento, id_periodo)
+                for id_periodo in summaries.periods_of(driver, id_zona, id_departamento,
+                                                       id_material)]
+        summaries.subtract(driver, keys)
+    queries.execute(driver, DELETE_MATERIAL, [id_zona, id_departamento, id_material])
+    if keys:
+        summaries.add(driver, keys)
+    driver.connection.commit()
+
+
+def material_index(driver):
+    """ returns the set of valid material ids """
+    return {row[0] for row in queries.execute(driver, MATERIAL_IDS).fetchall()}
+
+
+def text_stream(stream):
+    """
+    wraps an uploaded binary file to read it as text without loading it, a
+    stream reader only needs read(), the spooled files of the uploads have
+    no readable() before Python 3.11 so io.TextIOWrapper refuses them
+    """
+    return codecs.getreader('utf-8-sig')(stream)
+
+
+class SolicitudImport():
+    """
+    Imports the lines of a CSV file as solicitudes of a zona, departamento
+    and periodo. The file is parsed while it is read, materials are checked
+    against an index loaded once and valid rows are written with executemany
+    in batches, existing solicitudes are updated with the new cantidad.
+    """
+
+    def __init__(self, driver, id_zona, id_departamento, id_periodo,
+                 refresh_summaries=False, batch_size=BATCH_SIZE):
+        self.__driver = driver
+        self.__key = (id_zona, id_departamento, id_periodo)
+        self.__refresh_summaries = refresh_summaries
+        self.__batch_size = batch_size
+
+    def __columns(self, heading):
+        columns = {}
+        for pos, name in enumerate(heading):
+            name = HEADINGS.get(name.strip().lower())
+            if name is not None and name not in columns:
+                columns[name] = pos
+        if len(columns) != 2:
+            raise ImportFileError('the file needs the columns id_material and cantidad')
+        return columns['id_material'], columns['cantidad']
+
+    def __write(self, cur, batch):
+        keys = [row[:4] for row in batch]
+        if self.__refresh_summaries:
+            summaries.subtract(self.__driver, keys)
+        queries.executemany(self.__driver, UPSERT, batch)
+        if self.__refresh_summaries:
+            summaries.add(self.__driver, keys)
+        cur.connection.commit()
+
+    def run(self, lines):
+        """ imports an iterable of CSV lines, returns an ImportResult """
+        result = ImportResult()
+        reader = csv.reader(lines)
+        heading = next(reader, None)
+        if heading is None:
+            raise ImportFileError('the file is empty')
+        col_material, col_cantidad = self.__columns(heading)
+        width = max(col_material, col_cantidad) + 1
+        cur = self.__driver.connection.cursor()
+        materials = material_index(self.__driver)
+        batch = []
+        for row in reader:
+            line = reader.line_num
+            if not any(field.strip() for field in row):
+                continue
+            if len(row) < width:
+                result.error(line, 'missing columns')
+                continue
+            id_material = row[col_material].strip()
+            if id_material not in materials:
+                result.error(line, f'unknown material {id_material}')
+                continue
+            try:
+                cantidad = int(row[col_cantidad])
+            except ValueError:
+                result.error(line, f'invalid cantidad {row[col_cantidad]}')
+                continue
+            if cantidad < 1:
+                result.error(line, 'cantidad must be at least 1')
+                continue
+            batch.append((id_material,) + self.__key + (cantidad,))
+            if len(batch) >= self.__batch_size:
+                self.__write(cur, batch)
+                result.imported += len(batch)
+                batch = []
+        if batch:
+            self.__write(cur, batch)
+            result.imported += len(batch)
+        return result
+
+
+def parse_operations(operations, materials):
+    """
+    validates a list of operations {op: upsert|delete, id_material, cantidad},
+    returns the cantidad of every upserted material and the deleted materials.
+    A later operation on the same material replaces the earlier ones.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError([{'indice': None, 'error': 'operaciones must be a non empty list'}])
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError([{'indice': None,
+                           'error': f'at most {MAX_OPERATIONS} operations per batch'}])
+    upserts = {}
+    deletes = set()
+    errors = []
+    for pos, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append({'indice': pos, 'error': 'invalid operation'})
+            continue
+        id_material = operation.get('id_material')
+        if id_material not in materials:
+            errors.append({'indice': pos, 'error': f'unknown material {id_material}'})
+            continue
+        if operation.get('op') == 'delete':
+            upserts.pop(id_material, None)
+            deletes.add(id_material)
+        elif operation.get('op') == 'upsert':
+            try:
+                cantidad = int(operation.get('cantidad'))
+            except (TypeError, ValueError):
+                cantidad = 0
+            if cantidad < 1:
+                errors.append({'indice': pos, 'error': 'cantidad must be at least 1'})
+                continue
+            deletes.discard(id_material)
+            upserts[id_material] = cantidad
+        else:
+            errors.append({'indice': pos, 'error': f"unknown op {operation.get('op')}"})
+    if errors:
+        raise BatchError(errors)
+    return upserts, sorted(deletes)
+
+
+def apply_batch(driver, id_zona, id_departamento, id_periodo, operations, materials,
+                refresh_summaries=False):
+    """
+    applies a batch of operations on the solicitudes of a zona, departamento
+    and periodo in one transaction. Returns the upserted rows as shown in the
+    capture table and the list of deleted materials.
+    """
+    upserts, deletes = parse_operations(operations, materials)
+    key = (id_zona, id_departamento, id_periodo)
+    keys = [(id_material,) + key for id_material in list(upserts) + deletes]
+    if refresh_summaries:
+        summaries.subtract(driver, keys)
+    if upserts:
+        queries.executemany(driver, UPSERT, [(id_material,) + key + (cantidad,)
+                                             for id_material, cantidad in upserts.items()])
+    if deletes:
+        queries.executemany(driver, DELETE, [(id_material,) + key for id_material in deletes])
+    if refresh_summaries:
+        summaries.add(driver, keys)
+    driver.connection.commit()
+    rows = []
+    if upserts:
+        materials = list(upserts)
+        size = next(size for size in CHANGED_SIZES if size >= len(materials))
+        # repeating a material in the IN list does not repeat its row
+        materials += materials[-1:] * (size - len(materials))
+        rows = queries.execute(driver, CHANGED[size], list(key) + materials).fetchall()
+    return rows, deletes
+
+
+@solicitudes_cli.command('import')
+@click.argument('archivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--zona', 'id_zona', type=int, required=True)
+@click.option('--departamento', 'id_departamento', type=int, required=True)
+@click.option('--periodo', 'id_periodo', type=int, required=True)
+def import_solicitudes(archivo, id_zona, id_departamento, id_periodo):
+    """
+    Imports the solicitudes of a zona and departamento from a CSV file
+    """
+    driver = connection_pool.get_driver()
+    importer = SolicitudImport(driver, id_zona, id_departamento, id_periodo,
+                               current_app.config.get('SUMMARIES', False))
+    try:
+        result = importer.run(archivo)
+    except ImportFileError as exc:
+        raise click.BadParameter(str(exc), param_hint='ARCHIVO')
+    for error in result.errors:
+        click.echo(f"line {error['linea']}: {error['error']}", err=True)
+    click.echo(f'{result.imported} imported, {result.rejected} rejected')
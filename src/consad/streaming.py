@@ -0,0 +1,67 @@
+"""
+Provides streaming JSON responses built from database cursors
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import json
+from flask import Response
+from . import connection_pool
+
+BATCH_SIZE = 500
+
+
+def iter_batches(cursor, batch_size=BATCH_SIZE, first=None):
+    """ yields the rows of an executed cursor in lists of batch_size rows """
+    if first:
+        yield first
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_json(head, batches, format_batch, tail=None):
+    """
+    yields a JSON object incrementally, the keys of head are written first,
+    followed by the rows under "data" and the keys of tail. format_batch
+    receives a list of rows and returns the list of values to encode.
+    """
+    encode = json.JSONEncoder().encode
+    yield json.dumps(head)[:-1] + (', ' if head else '') + '"data": ['
+    separator = ''
+    for batch in batches:
+        yield separator + ', '.join(map(encode, format_batch(batch)))
+        separator = ', '
+    if tail:
+        yield '], ' + json.dumps(tail)[1:]
+    else:
+        yield ']}'
+
+
+def rows_response(head, rows, format_batch, tail=None):
+    """ encodes rows already read in the same JSON as json_response """
+    if not rows:
+        return '{"success":false}', {"Content-Type": "application/json"}
+    return Response(''.join(iter_json(head, [rows], format_batch, tail)),
+                    mimetype='application/json')
+
+
+def json_response(head, cursor, format_batch, tail=None, batch_size=BATCH_SIZE):
+    """
+    streams the rows of an executed cursor as a chunked JSON response, the
+    pooled connection stays checked out until the response is closed, which
+    also happens when the body is never iterated (HEAD requests or clients
+    gone before the first chunk)
+    """
+    first = cursor.fetchmany(batch_size)
+    if not first:
+        return '{"success":false}', {"Content-Type": "application/json"}
+    driver = connection_pool.detach_driver()
+    resp = Response(iter_json(head, iter_batches(cursor, batch_size, first), format_batch, tail),
+                    mimetype='application/json')
+    if driver is not None:
+        resp.call_on_close(driver.close)
+    return resp
@@ -0,0 +1,135 @@
+"""
+Provides maintenance of the materialized period summaries
+
+Writes apply their delta to the summaries in the transaction of the write:
+the solicitudes about to change are subtracted from their groups, written,
+then added back with their new cantidad, and groups left without
+solicitudes are removed. Both steps read the written solicitudes by their
+primary key, so the cost of a write only grows with the rows it touches.
+The summary rows are incremented in place, concurrent writes to the same
+group never overwrite each other. The importe of a delta uses the current
+precio_unitario, after a price change `flask database refresh-summaries`
+rebuilds every group. Summaries only hold the groups written since they
+were enabled until that command rebuilds them all, which marks them as
+complete; reports read them only after that. Run it again whenever
+summaries were disabled for a while.
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import time
+from . import database_driver
+from . import queries
+from .database_driver import DatabaseType
+
+# one row, written by refresh_all, tells the summaries hold every group
+STATE_TABLE = 'resumen_estado'
+CREATE_STATE = (f'CREATE TABLE IF NOT EXISTS {STATE_TABLE}(id_resumen INTEGER PRIMARY KEY, '
+                'actualizado REAL NOT NULL)')
+
+SUMMARIES = {
+    'material': ('resumen_periodo_material', 'id_material'),
+    'zona': ('resumen_periodo_zona', 'id_zona'),
+}
+
+
+def _delta(summary):
+    """ adds the totals of one solicitud, multiplied by a sign, to its group """
+    table, key = SUMMARIES[summary]
+    totals = ('cantidad', 'importe', 'solicitudes')
+
+    def sql(database_type):
+        query = (f'INSERT INTO {table}(id_periodo, {key}, cantidad, importe, solicitudes) '
+                 f'SELECT s.id_periodo, s.{key}, ? * SUM(s.cantidad), '
+                 '? * SUM(s.cantidad * m.precio_unitario), ? * COUNT(*) FROM solicitudes AS s '
+                 'INNER JOIN materiales AS m ON(m.id_material=s.id_material) '
+                 'WHERE s.id_material=? AND s.id_zona=? AND s.id_departamento=? '
+                 f'AND s.id_periodo=? GROUP BY s.id_periodo, s.{key}')
+        if database_type == DatabaseType.MARIADB:
+            # qualified, solicitudes of the SELECT has a cantidad column too
+            return query + ' ON DUPLICATE KEY UPDATE ' + ', '.join(
+                f'{table}.{column}={table}.{column}+VALUES({column})' for column in totals)
+        return query + f' ON CONFLICT(id_periodo, {key}) DO UPDATE SET ' + ', '.join(
+            f'{column}={column}+excluded.{column}' for column in totals)
+    return sql
+
+
+# a rebuild reads every solicitud on purpose
+CLEARS = {summary: queries.register(f'{table}.vaciar', f'DELETE FROM {table}', full_scan=True)
+          for summary, (table, _) in SUMMARIES.items()}
+REBUILDS = {summary: queries.register(
+    f'{table}.reconstruir', f'INSERT INTO {table}(id_periodo, {key}, cantidad, importe, '
+    f'solicitudes) SELECT s.id_periodo, s.{key}, SUM(s.cantidad), '
+    'SUM(s.cantidad * m.precio_unitario), COUNT(*) FROM solicitudes AS s '
+    'INNER JOIN materiales AS m ON(m.id_material=s.id_material)'
+    f' GROUP BY s.id_periodo, s.{key}', full_scan=True)
+    for summary, (table, key) in SUMMARIES.items()}
+DELTAS = {summary: queries.register(f'{table}.delta', _delta(summary))
+          for summary, (table, _) in SUMMARIES.items()}
+PRUNES = {summary: queries.register(f'{table}.depurar', f'DELETE FROM {table} '
+                                    f'WHERE id_periodo=? AND {key}=? AND solicitudes=0')
+          for summary, (table, key) in SUMMARIES.items()}
+PERIODS = queries.register('solicitudes.periodos', 'SELECT DISTINCT id_periodo FROM solicitudes '
+                           'WHERE id_zona=? AND id_departamento=? AND id_material=?')
+# the state table holds a single row
+STATE_CLEAR = queries.register(f'{STATE_TABLE}.vaciar', f'DELETE FROM {STATE_TABLE}',
+                               full_scan=True)
+STATE_MARK = queries.register(f'{STATE_TABLE}.marcar', f'INSERT INTO {STATE_TABLE}'
+                              '(id_resumen, actualizado) VALUES(1, ?)')
+STATE_COUNT = queries.register(f'{STATE_TABLE}.contar', f'SELECT COUNT(*) FROM {STATE_TABLE}',
+                               full_scan=True)
+
+
+def _apply(driver, keys, sign):
+    for summary in SUMMARIES:
+        queries.executemany(driver, DELTAS[summary], [(sign, sign, sign) + tuple(key)
+                                                      for key in keys])
+
+
+def subtract(driver, keys):
+    """
+    takes solicitudes out of the summaries before they are written, keys are
+    (id_material, id_zona, id_departamento, id_periodo). The caller commits
+    so the summaries change in the same transaction as solicitudes
+    """
+    _apply(driver, list(dict.fromkeys(keys)), -1)
+
+
+def add(driver, keys):
+    """
+    adds the written solicitudes of keys to the summaries, the groups left
+    without solicitudes are removed
+    """
+    keys = list(dict.fromkeys(keys))
+    _apply(driver, keys, 1)
+    queries.executemany(driver, PRUNES['material'],
+                        list(dict.fromkeys((key[3], key[0]) for key in keys)))
+    queries.executemany(driver, PRUNES['zona'],
+                        list(dict.fromkeys((key[3], key[1]) for key in keys)))
+
+
+def periods_of(driver, id_zona, id_departamento, id_material):
+    """ returns the periods with solicitudes of a material, used before deletes """
+    return [row[0] for row in queries.execute(driver, PERIODS,
+                                              (id_zona, id_departamento, id_material))]
+
+
+def refresh_all(driver):
+    """ rebuilds both summaries from scratch and marks them as complete """
+    for summary in SUMMARIES:
+        queries.execute(driver, CLEARS[summary])
+        queries.execute(driver, REBUILDS[summary])
+    driver.connection.cursor().execute(CREATE_STATE)
+    queries.execute(driver, STATE_CLEAR)
+    queries.execute(driver, STATE_MARK, (time.time(),))
+
+
+def populated(driver):
+    """ tells if refresh_all ran, before that the summaries may miss groups """
+    try:
+        cur = queries.execute(driver, STATE_COUNT)
+    except database_driver.driver_module(driver.database_type).Error:
+        # databases created before the state table existed
+        return False
+    return cur.fetchone()[0] > 0
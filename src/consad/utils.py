@@ -4,28 +4,53 @@ Provides methods to create config files and restores default settings
 
 import json
 from pathlib import Path
-from flask import url_for, current_app
+import click
+from flask import url_for, current_app, has_request_context, request
 from flask.cli import AppGroup
-from data_object import ORMConnection, models
+from . import assets
+from . import catalog_cache
+from . import connection_pool
+from . import index_advisor
+from . import queries
+from . import summaries
+from . import sessions
+from . import write_behind
 
 config_cli = AppGroup('user')
 database_cli = AppGroup('database')
 
+STATIC_URLS_KEY = 'consad.static_urls'
+
+
 def get_res_url():
     """
-    gets The url to the static resources in the application
+    gets The url to the static resources in the application, they are built
+    once per application and script root, the prefix the app is mounted at.
+    The stylesheets of every page are a list under 'estilos'.
     """
-    urls = {}
-    urls["topcoat"] = url_for('static', filename='css/topcoat-desktop-dark.css')
-    urls["compras"] = url_for('static', filename='css/compras.css')
-    urls["flexbox"] = url_for('static', filename='css/flexboxgrid.min.css')
-    urls["bvselect_js"] = url_for('static', filename='js/bvselect.js')
-    urls["bvselect_css"] = url_for('static', filename='css/bvselect.css')
-    urls["simple_table_css"] = url_for('static', filename='css/style.css')
-    urls["simple_table_module"] = url_for('static', filename='js/module.js')
+    cache = current_app.extensions.setdefault(STATIC_URLS_KEY, {})
+    urls = cache.get(request.script_root)
+    if urls is None:
+        urls = {}
+        for key, filename in assets.static_files(current_app).items():
+            if isinstance(filename, tuple):
+                urls[key] = [url_for('static', filename=name) for name in filename]
+            else:
+                urls[key] = url_for('static', filename=filename)
+        cache[request.script_root] = urls
     return urls
 
 
+def static_urls():
+    """
+    context processor that gives every template rendered in a request the
+    urls of the static resources
+    """
+    if not has_request_context():
+        return {}
+    return {'urls': get_res_url()}
+
+
 def is_logged_in(session=None):
     """
     Checks if user is logged in
@@ -45,6 +70,18 @@ def create_config():
     create_config_file(filename,j_obj)
 
 
+@config_cli.command('revoke')
+@click.argument('id_usuario', type=int)
+def revoke_sessions(id_usuario):
+    """
+    Ends every server side session of a user
+    """
+    store = sessions.get_store(current_app)
+    if store is None:
+        raise click.UsageError('sessions are kept in cookies, set session_store first')
+    print(f'{store.revoke(id_usuario)} sessions revoked')
+
+
 def prepare_config():
     """
     Creates an empty config file
@@ -57,6 +94,28 @@ def prepare_config():
     engine = {}
     engine['driver'] = 'SQLITE'
     engine['database'] = 'database.db'
+    engine['pool_size'] = 5
+    engine['pool_max_lifetime'] = 3600
+    engine['pool_timeout'] = 30
+    engine['summaries'] = False
+    engine['catalog_cache_ttl'] = 300
+    engine['catalog_cache_max_bytes'] = 32 * 1024 * 1024
+    engine['principal_cache_ttl'] = 60
+    engine['period_calendar_ttl'] = 300
+    engine['session_store'] = 'cookie'
+    engine['replicas'] = []
+    engine['replica_retry'] = 30
+    engine['read_your_writes'] = 10
+    engine['metrics'] = False
+    engine['metrics_token'] = None
+    engine['metrics_dir'] = 'metrics'
+    engine['metrics_flush'] = 1.0
+    engine['slow_query_ms'] = 0
+    engine['slow_query_log'] = 'slow_queries.log'
+    engine['sql_echo'] = False
+    engine['write_behind'] = False
+    engine['write_behind_interval'] = 0.2
+    engine['write_behind_batch'] = 1000
     json_obj['sqlite'] = engine.copy()
 
     # MARIADB parameters
@@ -91,12 +150,106 @@ def create_database():
     """
     Creates a database from scratch
     """
+    # the ORM is only needed by these commands, not by the web app
+    from data_object import ORMConnection, models  # pylint: disable=import-outside-toplevel
     o_conn=ORMConnection(current_app.config)
     models.Base.metadata.create_all(bind=o_conn.engine)
 
+@database_cli.command('create-indexes')
+def create_indexes():
+    """
+    Creates the indexes declared in the models that are missing in the database
+    """
+    from data_object import ORMConnection, models  # pylint: disable=import-outside-toplevel
+    o_conn=ORMConnection(current_app.config)
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=o_conn.engine, checkfirst=True)
+
+
+@database_cli.command('refresh-summaries')
+def refresh_summaries():
+    """
+    Rebuilds the summaries by period from the solicitudes table
+    """
+    driver = connection_pool.get_driver()
+    summaries.refresh_all(driver)
+    driver.connection.commit()
+
+
+@database_cli.command('purge-sessions')
+def purge_sessions():
+    """
+    Deletes the expired server side sessions
+    """
+    store = sessions.get_store(current_app)
+    if store is not None:
+        print(f'{store.purge()} sessions deleted')
+
+
+@database_cli.command('invalidate-cache')
+def invalidate_cache():
+    """
+    Invalidates the catalog cache of every running worker
+    """
+    version = catalog_cache.get_cache().invalidate()
+    print(f'catalog version: {version}')
+
+
+@database_cli.command('flush-journal')
+def flush_journal():
+    """
+    Writes the saves left in the write-behind journal to the database
+    """
+    journal = write_behind.get_journal(current_app)
+    if journal is None:
+        raise click.UsageError('saves are written directly, set write_behind first')
+    print(f'{journal.flush()} journal entries flushed')
+    for entry in journal.rejected():
+        print(f'rejected {entry[0]} {entry[1]} {entry[2]}: {entry[-1]}')
+
+
+@database_cli.command('queries')
+def list_queries():
+    """
+    Lists the named queries of the registry with their SQL
+    """
+    for name in queries.REGISTRY.names():
+        print(f'{name}: {queries.REGISTRY.sql(name, current_app.config["DRIVER"])}')
+
+
+@database_cli.command('analyze')
+@click.option('--all', 'show_all', is_flag=True, help='show the plan of every query')
+@click.option('--strict', is_flag=True, help='exit with an error when a query is flagged')
+def analyze_queries(show_all, strict):
+    """
+    Explains the registered queries and flags the full table scans
+    """
+    flagged = 0
+    for plan in index_advisor.analyze(connection_pool.get_driver()):
+        if plan.error is not None:
+            print(f'ERROR {plan.name}: {plan.error}')
+            flagged += 1
+        elif plan.flagged:
+            flagged += 1
+            for step in plan.flagged:
+                print(f'SCAN  {plan.name}: {step.table}: {step.detail}')
+        elif show_all:
+            for step in plan.steps:
+                print(f'ok    {plan.name}: {step.table}: {step.detail}')
+    print(f'{flagged} queries with full scans')
+    if strict and flagged:
+        raise SystemExit(1)
+
+
 @database_cli.command('migrate')
 def migrate_database():
     """
     Migrates the database the current version
     """
-    raise NotImplementedError
+    from data_object import ORMConnection, migrations  # pylint: disable=import-outside-toplevel
+    o_conn=ORMConnection(current_app.config)
+    applied = migrations.migrate(o_conn.engine)
+    for statement in applied:
+        print(statement)
+    print(f'{len(applied)} migration statements applied')
@@ -0,0 +1,371 @@
+"""
+Provides the write-behind journal of the capture saves
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+import logging
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from . import connection_pool
+from . import database_driver
+from . import queries
+from . import solicitudes
+from . import summaries
+from .database_driver import DatabaseType
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # without file locks only one process may use the journal
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_KEY = 'consad.write_behind'
+JOURNAL_FILE = 'write_behind.db'
+
+# session key with the last journal entry of the user
+SEQ_KEY = 'diario'
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+# seconds a read waits for the saves of its user to reach the database
+READ_WAIT = 5
+
+# seconds between checks of the journal while a read waits
+POLL = 0.05
+
+CREATE_TABLES = (
+    "CREATE TABLE IF NOT EXISTS diario(seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "operacion TEXT NOT NULL, id_material TEXT NOT NULL, id_zona INTEGER NOT NULL, "
+    "id_departamento INTEGER NOT NULL, id_periodo INTEGER, cantidad INTEGER, "
+    "creado REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS rechazos(seq INTEGER PRIMARY KEY, "
+    "operacion TEXT NOT NULL, id_material TEXT NOT NULL, id_zona INTEGER NOT NULL, "
+    "id_departamento INTEGER NOT NULL, id_periodo INTEGER, cantidad INTEGER, "
+    "creado REAL NOT NULL, error TEXT NOT NULL)")
+
+ENTRY_COLUMNS = ('seq, operacion, id_material, id_zona, id_departamento, id_periodo, '
+                 'cantidad, creado')
+
+# every journal of the process, restarted in the child after a fork
+_journals = weakref.WeakSet()
+
+
+def coalesce(entries):
+    """
+    reduces journal entries (operacion, id_material, id_zona, id_departamento,
+    id_periodo, cantidad), in the order they were written, to the writes that
+    leave the same rows: the deleted (material, zona, departamento) and the
+    last cantidad of every solicitud written after its delete. Deletes must
+    be applied before the upserts.
+    """
+    deletes = {}
+    upserts = {}
+    for operacion, id_material, id_zona, id_departamento, id_periodo, cantidad in entries:
+        key = (id_material, id_zona, id_departamento)
+        if operacion == DELETE:
+            upserts.pop(key, None)
+            deletes[key] = None
+        else:
+            upserts.setdefault(key, {})[id_periodo] = cantidad
+    return list(deletes), [key + (id_periodo, cantidad)
+                           for key, periods in upserts.items()
+                           for id_periodo, cantidad in periods.items()]
+
+
+def apply(driver, deletes, upserts, refresh_summaries=False):
+    """
+    writes coalesced entries to the database in one transaction, the
+    summaries receive the delta of the written solicitudes in the same
+    transaction
+    """
+    keys = []
+    if refresh_summaries:
+        for id_material, id_zona, id_departamento in deletes:
+            keys.extend((id_material, id_zona, id_departamento, id_periodo)
+                        for id_periodo in summaries.periods_of(driver, id_zona,
+                                                               id_departamento, id_material))
+        keys.extend(upsert[:4] for upsert in upserts)
+        summaries.subtract(driver, keys)
+    if deletes:
+        queries.executemany(driver, solicitudes.DELETE_MATERIAL,
+                            [(id_zona, id_departamento, id_material)
+                             for id_material, id_zona, id_departamento in deletes])
+    if upserts:
+        queries.executemany(driver, solicitudes.UPSERT, upserts)
+    if keys:
+        summaries.add(driver, keys)
+    driver.connection.commit()
+
+
+class Journal():
+    """
+    Saves and deletes of solicitudes appended to a local SQLite file in WAL
+    mode and acknowledged once the append is durable. A thread of every
+    process flushes the journal to the database in batches of one
+    transaction, writes to the same solicitud are coalesced first. Entries
+    are deleted from the journal after the database commits, so entries left
+    by a stopped process are replayed by the next flush; replaying a batch
+    twice leaves the same rows. A file lock lets one process flush at a time.
+    Entries the database refuses, e.g. an unknown material, are moved to
+    the rechazos table instead of blocking the ones behind them.
+    """
+
+    def __init__(self, path, pool, database_type=DatabaseType.SQLITE,
+                 refresh_summaries=False, interval=0.2, batch=1000):
+        self.path = Path(path)
+        self.__pool = pool
+        self.__database_type = database_type
+        self.__refresh_summaries = refresh_summaries
+        self.__interval = interval
+        self.__batch = batch
+        self.__journal = _journal_pool(self.path)
+        self.__errors = database_driver.driver_module(database_type)
+        self.__stats = dict.fromkeys(('appended', 'flushed', 'batches', 'rejected',
+                                      'failures'), 0)
+        self.__reset()
+        _journals.add(self)
+
+    def __reset(self):
+        self.__thread = None
+        self.__stats_lock = threading.Lock()
+        self.__stopping = threading.Event()
+        self.__wake = threading.Event()
+        self.__flushed = threading.Condition()
+
+    @property
+    def stats(self):
+        """ returns the counters of the journal in this process """
+        with self.__stats_lock:
+            return dict(self.__stats)
+
+    def __count(self, name, value=1):
+        with self.__stats_lock:
+            self.__stats[name] += value
+
+    def after_fork(self):
+        """ a forked child has no flusher thread, it starts on its first request """
+        self.__reset()
+
+    def __run(self, query, params=(), fetch=False):
+        conn = self.__journal.checkout()
+        try:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            result = cur.fetchall() if fetch else cur.lastrowid
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+
+    def __append(self, operacion, id_material, id_zona, id_departamento, id_periodo=None,
+                 cantidad=None):
+        seq = self.__run(
+            'INSERT INTO diario(operacion, id_material, id_zona, id_departamento, '
+            'id_periodo, cantidad, creado) VALUES(?, ?, ?, ?, ?, ?, ?)',
+            (operacion, id_material, int(id_zona), int(id_departamento),
+             None if id_periodo is None else int(id_periodo),
+             None if cantidad is None else int(cantidad), time.time()))
+        self.__count('appended')
+        return seq
+
+    def save(self, id_material, id_zona, id_departamento, id_periodo, cantidad):
+        """ journals the cantidad of a solicitud, returns the sequence of the entry """
+        return self.__append(UPSERT, id_material, id_zona, id_departamento, id_periodo,
+                             cantidad)
+
+    def delete(self, id_zona, id_departamento, id_material):
+        """ journals the delete of a material of a zona and departamento """
+        return self.__append(DELETE, id_material, id_zona, id_departamento)
+
+    def pending(self, seq=None):
+        """ counts the entries not flushed yet, up to seq when given """
+        if seq is None:
+            return self.__run('SELECT COUNT(*) FROM diario', fetch=True)[0][0]
+        return self.__run('SELECT COUNT(*) FROM diario WHERE seq<=?', (seq,), fetch=True)[0][0]
+
+    def rejected(self):
+        """ returns the entries the database refused with their error """
+        return self.__run(f'SELECT {ENTRY_COLUMNS}, error FROM rechazos ORDER BY seq',
+                          fetch=True)
+
+    def wait(self, seq, timeout=READ_WAIT):
+        """
+        waits until the entries up to seq are in the database, returns False
+        when the timeout expired first
+        """
+        if seq is None:
+            return True
+        deadline = time.monotonic() + timeout
+        self.__wake.set()
+        while self.pending(seq):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # a flush of another process is only seen by polling
+            with self.__flushed:
+                self.__flushed.wait(min(remaining, POLL))
+        return True
+
+    def flush(self, block=True):
+        """
+        writes the journal to the database, returns the entries flushed.
+        Without block it returns 0 when another flush holds the lock.
+        """
+        with open(self.path.with_name(self.path.name + '.lock'), 'a',
+                  encoding='utf-8') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    return 0
+            # entries appended while flushing wait for the next flush
+            last = self.__run('SELECT MAX(seq) FROM diario', fetch=True)[0][0]
+            total = 0
+            while last is not None:
+                entries = self.__run(f'SELECT {ENTRY_COLUMNS} FROM diario WHERE seq<=? '
+                                     'ORDER BY seq LIMIT ?', (last, self.__batch), fetch=True)
+                if not entries:
+                    break
+                self.__flush_batch(entries)
+                total += len(entries)
+        if total:
+            with self.__flushed:
+                self.__flushed.notify_all()
+        return total
+
+    def __flush_batch(self, entries):
+        driver = database_driver.DatabaseDriver(self.__database_type, pool=self.__pool)
+        try:
+            try:
+                apply(driver, *coalesce(entry[1:7] for entry in entries),
+                      self.__refresh_summaries)
+            except (self.__errors.IntegrityError, self.__errors.DataError):
+                driver.connection.rollback()
+                self.__flush_one_by_one(driver, entries)
+            except Exception:
+                driver.connection.rollback()
+                raise
+        finally:
+            driver.close()
+        self.__run('DELETE FROM diario WHERE seq<=?', (entries[-1][0],))
+        self.__count('flushed', len(entries))
+        self.__count('batches')
+
+    def __flush_one_by_one(self, driver, entries):
+        """ finds the entries refused by the database and moves them to rechazos """
+        for entry in entries:
+            try:
+                apply(driver, *coalesce([entry[1:7]]), self.__refresh_summaries)
+            except (self.__errors.IntegrityError, self.__errors.DataError) as exc:
+                driver.connection.rollback()
+                logger.warning('journal entry %s rejected: %s', entry[0], exc)
+                self.__run(f'INSERT INTO rechazos({ENTRY_COLUMNS}, error) '
+                           'VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)', tuple(entry) + (str(exc),))
+                self.__count('rejected')
+
+    def __loop(self):
+        delay = self.__interval
+        while not self.__stopping.is_set():
+            self.__wake.wait(delay)
+            self.__wake.clear()
+            try:
+                self.flush(block=False)
+                delay = self.__interval
+            except Exception:  # pylint: disable=broad-except
+                # the entries stay in the journal until the database is back
+                self.__count('failures')
+                logger.exception('journal flush failed, retrying')
+                delay = min(delay * 2, 30)
+
+    def start(self):
+        """ starts the flusher thread of this process, the journal is replayed first """
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__thread = threading.Thread(target=self.__loop, name='consad-write-behind',
+                                         daemon=True)
+        self.__thread.start()
+        self.__wake.set()
+
+    def stop(self, flush=True):
+        """ stops the flusher thread, then flushes what is left unless flush is False """
+        self.__stopping.set()
+        self.__wake.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if flush:
+            self.flush()
+
+
+def _journal_pool(path, pool_size=5):
+    """ pool of connections to the journal file, the tables are created when missing """
+    sqlite3 = database_driver.driver_module(DatabaseType.SQLITE)
+
+    def factory():
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # an acknowledged save must survive a power loss
+        conn.execute('PRAGMA synchronous=FULL')
+        return conn
+    pool = connection_pool.ConnectionPool(factory, size=pool_size)
+    conn = pool.checkout()
+    try:
+        for query in CREATE_TABLES:
+            conn.execute(query)
+        conn.commit()
+    finally:
+        conn.close()
+    return pool
+
+
+def _after_fork():
+    for journal in list(_journals):
+        journal.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def init_app(app):
+    """
+    installs the journal when WRITE_BEHIND is set, the flusher of a process
+    starts with its first request so a pre-fork master never runs one
+    """
+    if not app.config.get('WRITE_BEHIND', False):
+        return None
+    journal = Journal(Path(app.instance_path).joinpath(JOURNAL_FILE),
+                      app.extensions[connection_pool.POOL_KEY], app.config['DRIVER'],
+                      app.config.get('SUMMARIES', False),
+                      app.config.get('WRITE_BEHIND_INTERVAL', 0.2),
+                      app.config.get('WRITE_BEHIND_BATCH', 1000))
+    app.extensions[JOURNAL_KEY] = journal
+    app.before_request(journal.start)
+    return journal
+
+
+def get_journal(app):
+    """ returns the journal of an application, None when saves are written directly """
+    return app.extensions.get(JOURNAL_KEY)
+
+
+def flush_pending(app):
+    """ flushes the journal before a write that bypasses it, so the order is kept """
+    journal = get_journal(app)
+    if journal is not None:
+        journal.flush()
+
+
+def close(app):
+    """ stops the flusher of an application and flushes the journal """
+    journal = get_journal(app)
+    if journal is not None:
+        journal.stop()
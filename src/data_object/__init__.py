@@ -41,4 +41,5 @@ class ORMConnection():
                 'sqlite+pysqlite',
                 database=str(config['DATABASE'].resolve()),
             )
-        self.__engine = create_engine(url_object, future=True, echo=True)
+        self.__engine = create_engine(url_object, future=True,
+                                      echo=config.get('SQL_ECHO', False))
@@ -0,0 +1,47 @@
+"""
+Provides the migrations of databases created with previous models
+
+Every step checks the schema before it runs, so migrating a database that
+is already current does nothing and an interrupted run can be repeated.
+"""
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+# Autor: Rafael Amador Galván
+# Fecha: 18/10/2026
+from sqlalchemy import inspect, text
+
+# tables renamed to the names the queries of the application read
+TABLE_RENAMES = (
+    ('material', 'materiales'),
+    ('usuario', 'usuarios'),
+)
+
+# table, previous column and current column
+COLUMN_RENAMES = (
+    ('departamento', 'clave', 'c_clave'),
+    ('zona', 'centro_gestor', 'centrogestor'),
+)
+
+
+def pending(connection):
+    """ returns the statements the database of a connection still needs """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    statements = [f'ALTER TABLE {old} RENAME TO {new}' for old, new in TABLE_RENAMES
+                  if old in tables and new not in tables]
+    for table, old, new in COLUMN_RENAMES:
+        if table not in tables:
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        if old in columns and new not in columns:
+            statements.append(f'ALTER TABLE {table} RENAME COLUMN {old} TO {new}')
+    return statements
+
+
+def migrate(engine):
+    """ applies the pending statements in one transaction, returns them """
+    with engine.begin() as connection:
+        statements = pending(connection)
+        for statement in statements:
+            connection.execute(text(statement))
+    return statements
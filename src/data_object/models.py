@@ -1,12 +1,28 @@
 """
 Provides Abstrtaction layer to Access to Department table
 based upon SQLalchemy objects
+
+The tables and columns carry the names the queries of the application
+read: materiales, usuarios, departamento.c_clave and zona.centrogestor.
+Databases created by 'flask database create' before they were renamed
+from material, usuario, clave and centro_gestor are migrated with
+'flask database migrate', see data_object.migrations. It runs:
+
+    ALTER TABLE material RENAME TO materiales;
+    ALTER TABLE usuario RENAME TO usuarios;
+    ALTER TABLE departamento RENAME COLUMN clave TO c_clave;
+    ALTER TABLE zona RENAME COLUMN centro_gestor TO centrogestor;
+
+SQLite 3.26 and later and InnoDB rewrite the foreign keys that reference
+the renamed tables, RENAME COLUMN needs SQLite 3.25, MySQL 8.0 or
+MariaDB 10.5.2.
 """
 #!/usr/bin/env python3
 # -*- coding: UTF-8 -*-
 # Autor: Rafael Amador Galván
 # Fecha: 11/07/2022
-from sqlalchemy import Column,String,Integer, Boolean, DateTime, Float, ForeignKey, func
+from sqlalchemy import (Column, String, Integer, Boolean, DateTime, Float, Text, ForeignKey,
+                        Index, func)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -17,6 +33,10 @@ class Periodo(Base):
     Tabla Periodo
     """
     __tablename__ = 'periodo'
+    __table_args__ = (
+        # the lists of periods filter the active ones by their dates
+        Index('ix_periodo_activo_fechas', 'activo', 'fecha_inicio', 'fecha_fin'),
+    )
 
     id_periodo = Column(Integer, primary_key=True)
     descripcion = Column(String, nullable=False)
@@ -40,7 +60,8 @@ class Departamento(Base):
 
     id_departamento = Column(Integer, primary_key=True)
     nombre = Column(String, nullable=False)
-    clave = Column(String, nullable=False)
+    # the queries of the application read the column as c_clave
+    clave = Column('c_clave', String, nullable=False)
 
     usuarios = relationship('Usuario', cascade='all, delete')
     solicitudes = relationship('Solicitud', cascade='all, delete')
@@ -69,7 +90,11 @@ class Material(Base):
     """
     Tabla Material
     """
-    __tablename__ = 'material'
+    __tablename__ = 'materiales'
+    __table_args__ = (
+        # catalogs and reports join materials with their grupo
+        Index('ix_materiales_grupo', 'id_grupo'),
+    )
 
     id_material = Column(String, primary_key=True)
     id_grupo = Column(Integer, ForeignKey('grupo.id_grupo'), nullable=False)
@@ -93,8 +118,18 @@ class Solicitud(Base):
     Tabla Solicitudes
     """
     __tablename__ = 'solicitudes'
-
-    id_material = Column(String, ForeignKey('material.id_material'),
+    __table_args__ = (
+        # consolidation reports aggregate a whole period by material, cantidad
+        # is included so the index covers the aggregation
+        Index('ix_solicitudes_periodo_material', 'id_periodo', 'id_material', 'cantidad'),
+        # summaries by zona are recomputed from the solicitudes of a period and zona
+        Index('ix_solicitudes_periodo_zona', 'id_periodo', 'id_zona', 'id_material', 'cantidad'),
+        # the capture table lists the solicitudes of a zona, departamento and period
+        Index('ix_solicitudes_captura', 'id_zona', 'id_departamento', 'id_periodo',
+              'id_material'),
+    )
+
+    id_material = Column(String, ForeignKey('materiales.id_material'),
                          primary_key=True)
     id_zona = Column(Integer, ForeignKey('zona.id_zona'),
                      primary_key=True)
@@ -113,11 +148,65 @@ class Solicitud(Base):
                 'comentarios={self.comentarios!r})')
 
 
+class ResumenPeriodoMaterial(Base):
+    """
+    Tabla materializada con los totales por periodo y material
+    """
+    __tablename__ = 'resumen_periodo_material'
+
+    id_periodo = Column(Integer, ForeignKey('periodo.id_periodo'), primary_key=True)
+    id_material = Column(String, ForeignKey('materiales.id_material'), primary_key=True)
+    cantidad = Column(Float, nullable=False)
+    importe = Column(Float, nullable=False)
+    solicitudes = Column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return (f'ResumenPeriodoMaterial(id_periodo={self.id_periodo!r}, '
+                f'id_material={self.id_material!r}, cantidad={self.cantidad!r}, '
+                f'importe={self.importe!r}, solicitudes={self.solicitudes!r})')
+
+
+class ResumenPeriodoZona(Base):
+    """
+    Tabla materializada con los totales por periodo y zona
+    """
+    __tablename__ = 'resumen_periodo_zona'
+
+    id_periodo = Column(Integer, ForeignKey('periodo.id_periodo'), primary_key=True)
+    id_zona = Column(Integer, ForeignKey('zona.id_zona'), primary_key=True)
+    cantidad = Column(Float, nullable=False)
+    importe = Column(Float, nullable=False)
+    solicitudes = Column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return (f'ResumenPeriodoZona(id_periodo={self.id_periodo!r}, '
+                f'id_zona={self.id_zona!r}, cantidad={self.cantidad!r}, '
+                f'importe={self.importe!r}, solicitudes={self.solicitudes!r})')
+
+
+class ResumenEstado(Base):
+    """
+    Fecha de la última reconstrucción completa de los resúmenes
+    """
+    __tablename__ = 'resumen_estado'
+
+    id_resumen = Column(Integer, primary_key=True)
+    actualizado = Column(Float, nullable=False)
+
+    def __repr__(self) -> str:
+        return (f'ResumenEstado(id_resumen={self.id_resumen!r}, '
+                f'actualizado={self.actualizado!r})')
+
+
 class Usuario(Base):
     """
     Tabla Usuarios
     """
-    __tablename__ = 'usuario'
+    __tablename__ = 'usuarios'
+    __table_args__ = (
+        # logins look users up by token
+        Index('ix_usuario_token', 'token', unique=True),
+    )
 
     id_usuario = Column(Integer, primary_key=True)
     token = Column(String, nullable=False)
@@ -133,6 +222,26 @@ class Usuario(Base):
             'id_departamento={self.id_departamento!r})')
 
 
+class Sesion(Base):
+    """
+    Tabla de sesiones guardadas en el servidor
+    """
+    __tablename__ = 'sesiones'
+    __table_args__ = (
+        Index('ix_sesiones_expira', 'expira'),
+        Index('ix_sesiones_usuario', 'id_usuario'),
+    )
+
+    id_sesion = Column(String(64), primary_key=True)
+    datos = Column(Text, nullable=False)
+    expira = Column(Float, nullable=False)
+    id_usuario = Column(Integer, nullable=True)
+
+    def __repr__(self) -> str:
+        return (f'Sesion(id_sesion={self.id_sesion!r}, expira={self.expira!r}, '
+                f'id_usuario={self.id_usuario!r})')
+
+
 class Zona(Base):
     """
     tabla Zona
@@ -141,8 +250,8 @@ class Zona(Base):
 
     id_zona = Column(Integer, primary_key=True)
     nombre = Column(String, nullable=False)
-    centro_gestor = Column(String, nullable=False)
-    id_responsable = Column(Integer,ForeignKey('usuario.id_usuario'), nullable=True)
+    centro_gestor = Column('centrogestor', String, nullable=False)
+    id_responsable = Column(Integer,ForeignKey('usuarios.id_usuario'), nullable=True)
 
     solicitudes = relationship('Solicitud', cascade='all, delete') # CHECAR
     usuarios = relationship('Usuario', cascade='all, delete') # CHECAR
@@ -0,0 +1,143 @@
+"""
+Provides test for the ASGI entry point
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+from flask import request
+from consad import create_app, write_behind
+from consad.asgi import create_asgi_app
+
+SCHEMA = (
+    'CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE departamento(id_departamento INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE usuarios(id_usuario INTEGER PRIMARY KEY, nombre TEXT, token TEXT, '
+    'id_zona INT, id_departamento INT)',
+    'CREATE TABLE periodo(id_periodo INTEGER PRIMARY KEY, descripcion TEXT, '
+    'fecha_inicio TEXT, fecha_fin TEXT, activo INT)',
+    'CREATE TABLE grupo(id_grupo INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE materiales(id_material TEXT PRIMARY KEY, id_grupo INT, '
+    'precio_unitario REAL, unidad_medida TEXT, descripcion TEXT)',
+    'CREATE TABLE solicitudes(id_material TEXT, id_zona INT, id_departamento INT, '
+    'id_periodo INT, cantidad REAL, '
+    'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))')
+
+
+def _app(instance, **config):
+    conn = sqlite3.connect(instance.joinpath('database.db'))
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.execute("INSERT INTO zona VALUES(1, 'Norte')")
+    conn.execute("INSERT INTO departamento VALUES(1, 'Compras')")
+    conn.execute("INSERT INTO usuarios VALUES(1, 'Ana', 'token-ana', 1, 1)")
+    conn.execute("INSERT INTO periodo VALUES(1, 'Abierto', '2000-01-01 00:00:00', "
+                 "'2099-12-31 00:00:00', 1)")
+    conn.execute("INSERT INTO grupo VALUES(1, 'Papeleria')")
+    conn.executemany("INSERT INTO materiales VALUES(?, 1, 10.0, 'pza', ?)",
+                     [('M1', 'Lapiz'), ('M2', 'Goma')])
+    conn.commit()
+    instance.joinpath('config.json').write_text(json.dumps(
+        {'config': 'sqlite', 'secret_key': 'test',
+         'sqlite': dict({'driver': 'SQLITE', 'database': 'database.db'}, **config)}),
+        encoding='utf-8')
+    return conn, create_app(str(instance))
+
+
+class Client():
+    """ sends requests to an ASGI application and keeps the session cookie """
+
+    def __init__(self, asgi):
+        self.asgi = asgi
+        self.cookie = None
+
+    def request(self, method, path, body=b'', content_type=None):
+        """ returns the status, headers and body of a response """
+        headers = []
+        if content_type is not None:
+            headers.append((b'content-type', content_type.encode('latin-1')))
+        if self.cookie is not None:
+            headers.append((b'cookie', self.cookie.encode('latin-1')))
+        scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers,
+                 'query_string': b''}
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+        asyncio.run(self.asgi(scope, receive, send))
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                   for name, value in sent[0]['headers']}
+        if 'set-cookie' in headers:
+            self.cookie = headers['set-cookie'].split(';', 1)[0]
+        return sent[0]['status'], headers, b''.join(m.get('body', b'') for m in sent[1:])
+
+    def post_json(self, path, data):
+        """ posts a JSON body """
+        return self.request('POST', path, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def post_form(self, path, data):
+        """ posts an urlencoded form """
+        body = '&'.join(f'{key}={value}' for key, value in data.items()).encode('latin-1')
+        return self.request('POST', path, body, 'application/x-www-form-urlencoded')
+
+
+class TestAsgi():
+    """ Provides Test to the async views and the WSGI fallback """
+
+    def test_async_view_and_wsgi_fallback(self, tmp_path):
+        """
+        Routes without an async version run the Flask application, the async
+        views answer inside a request context whose before request functions
+        ran out of the event loop
+        """
+        _, app = _app(tmp_path)
+        threads = {}
+
+        @app.before_request
+        def record_thread():
+            threads[request.path] = threading.current_thread().name
+        client = Client(create_asgi_app(app))
+        status, headers, body = client.request('GET', '/about/')
+        assert status == 200
+        assert headers['content-type'].startswith('text/html')
+        status, _, _ = client.post_form('/login/', {'token': 'token-ana'})
+        assert status == 302
+        status, _, body = client.post_json('/periodo/get/', {})
+        assert status == 200
+        data = json.loads(body)
+        assert [row[0] for row in data['data']] == [1]
+        assert threads['/periodo/get/'] != threading.main_thread().name
+
+    def test_async_views_use_the_journal(self, tmp_path):
+        """
+        With write_behind the async views journal the saves and deletes,
+        refuse unknown materials and wait for the journal before reading
+        """
+        conn, app = _app(tmp_path, write_behind=True, write_behind_interval=30)
+        client = Client(create_asgi_app(app))
+        client.post_form('/login/', {'token': 'token-ana'})
+        query = {'id_zona': 1, 'id_departamento': 1, 'id_periodo': 1}
+        try:
+            status, _, body = client.post_form('/solicitudes/post/', {
+                'material': 'M1', 'cantidad': 4, 'periodo': 1})
+            assert status == 200 and json.loads(body)['success']
+            _, _, body = client.post_form('/solicitudes/post/', {
+                'material': 'MX', 'cantidad': 4, 'periodo': 1})
+            assert not json.loads(body)['success']
+            journal = write_behind.get_journal(app)
+            assert journal.pending() <= 1
+            _, _, body = client.post_json('/solicitudes/get/', query)
+            assert [row[0] for row in json.loads(body)['data']] == ['M1']
+            assert conn.execute('SELECT cantidad FROM solicitudes').fetchall() == [(4,)]
+            status, _, _ = client.post_json('/solicitudes/delete/', {'id_material': 'M1'})
+            assert status == 200
+            _, _, body = client.post_json('/solicitudes/get/', query)
+            assert json.loads(body) == {'success': False}
+            assert conn.execute('SELECT COUNT(*) FROM solicitudes').fetchone()[0] == 0
+            assert journal.pending() == 0
+        finally:
+            write_behind.close(app)
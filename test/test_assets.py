@@ -0,0 +1,32 @@
+"""
+Provides test for the static asset build
+"""
+import gzip
+import shutil
+from pathlib import Path
+from consad import assets
+
+STATIC = Path(__file__).resolve().parent.parent.joinpath('src', 'consad', 'static')
+
+
+class TestAssets():
+    """ Provides Test to the hashed static assets """
+
+    def test_build(self, tmp_path):
+        """
+        The stylesheets of every page become one hashed bundle, the other
+        resources get hashed names, and all of them a gzip variant
+        """
+        for filename in assets.STATIC_RESOURCES.values():
+            tmp_path.joinpath(filename).parent.mkdir(exist_ok=True)
+            shutil.copy(STATIC.joinpath(filename), tmp_path.joinpath(filename))
+        manifest = assets.build(tmp_path)
+        assert assets.load_manifest(tmp_path) == manifest
+        assert set(manifest) == ({assets.STYLESHEETS_KEY} | set(assets.STATIC_RESOURCES)) - set(
+            assets.STYLESHEETS)
+        bundle = tmp_path.joinpath(manifest[assets.STYLESHEETS_KEY])
+        assert bundle.name.startswith('estilos.') and bundle.suffix == '.css'
+        assert '/*' not in bundle.read_text(encoding='utf-8')
+        assert gzip.decompress(bundle.with_name(bundle.name + '.gz').read_bytes()) == \
+            bundle.read_bytes()
+        assert assets.build(tmp_path) == manifest
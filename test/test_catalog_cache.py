@@ -0,0 +1,72 @@
+"""
+Provides test for the catalog cache
+"""
+import json
+import os
+import pytest
+from consad.catalog_cache import CatalogCache
+
+
+class TestCatalogCache():
+    """ Provides Test to the cached catalogs """
+
+    def test_hit_and_invalidation(self, tmp_path):
+        """
+        A cached catalog is served until the version changes
+        """
+        cache = CatalogCache(tmp_path.joinpath('catalog.version'))
+        calls = []
+        loader = lambda: calls.append(1) or [(1, 'Papeleria')]
+        assert cache.get_or_load('grupos', loader) == [(1, 'Papeleria')]
+        assert cache.get_or_load('grupos', loader) == [(1, 'Papeleria')]
+        assert len(calls) == 1
+        # another process sharing the version file busts this cache too
+        CatalogCache(tmp_path.joinpath('catalog.version')).invalidate()
+        cache.get_or_load('grupos', loader)
+        assert len(calls) == 2
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 2
+
+    def test_lru_eviction(self, tmp_path):
+        """
+        The least recently used catalog is evicted when memory is exhausted
+        """
+        rows = [(i, f'material {i}') for i in range(100)]
+        cache = CatalogCache(tmp_path.joinpath('catalog.version'), max_bytes=40000)
+        cache.put('a', rows)
+        cache.put('b', list(rows))
+        cache.get('a')
+        cache.put('c', list(rows))
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.stats['evictions'] >= 1
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+    def test_after_fork(self, tmp_path):
+        """
+        A forked child starts with empty catalog and principal caches that
+        it can fill again, the parent keeps its entries
+        """
+        catalogs = CatalogCache(tmp_path.joinpath('catalog.version'))
+        principals = CatalogCache(tmp_path.joinpath('catalog.version'), ttl=60)
+        catalogs.put('grupos', [(1, 'Papeleria')])
+        principals.put(('usuario', 1), (1, 'token', 1, 1, 'Norte'))
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                result = [catalogs.stats['entries'], principals.stats['entries'],
+                          catalogs.get('grupos'), principals.stats['hits'],
+                          catalogs.put('grupos', [(2, 'Limpieza')])]
+                os.write(write, json.dumps(result).encode('utf-8'))
+                status = 0
+            finally:
+                os._exit(status)  # pylint: disable=protected-access
+        os.close(write)
+        with os.fdopen(read, 'rb') as pipe:
+            result = json.loads(pipe.read())
+        assert os.waitpid(pid, 0)[1] == 0
+        assert result == [0, 0, None, 0, [[2, 'Limpieza']]]
+        assert catalogs.get('grupos') == [(1, 'Papeleria')]
+        assert principals.stats['entries'] == 1
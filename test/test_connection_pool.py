@@ -0,0 +1,104 @@
+"""
+Provides test for the connection pool
+"""
+import sqlite3
+import pytest
+from consad.connection_pool import ConnectionPool, PoolTimeout, ReplicaSet
+
+
+class TestConnectionPool():
+    """ Provides Test to the pooled connections """
+
+    def test_connection_reuse(self):
+        """
+        A connection given back to the pool is handed out again
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=2)
+        conn = pool.checkout()
+        raw = conn.raw
+        conn.close()
+        conn = pool.checkout()
+        assert conn.raw is raw
+        assert pool.stats['created'] == 1
+        assert pool.stats['in_use'] == 1
+
+    def test_pool_is_bounded(self):
+        """
+        Checkout fails once every connection is in use
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1, timeout=0)
+        conn = pool.checkout()
+        with pytest.raises(PoolTimeout):
+            pool.checkout()
+        conn.close()
+        assert pool.checkout() is conn
+
+    def test_recycle_and_health_check(self):
+        """
+        Expired or broken connections are replaced on checkout
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1,
+                              ping=lambda raw: raw.execute('SELECT 1').fetchone())
+        conn = pool.checkout()
+        raw = conn.raw
+        conn.close()
+        raw.close()
+        conn = pool.checkout()
+        assert conn.raw is not raw
+        assert pool.stats['failed_checks'] == 1
+        conn.close()
+
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1, max_lifetime=0)
+        conn = pool.checkout()
+        conn.close()
+        pool.checkout()
+        assert pool.stats['created'] == 2
+        assert pool.stats['opened'] == 1
+
+    def test_replica_round_robin_and_failover(self):
+        """
+        Replicas are used in turn, a failing one is skipped and the primary
+        answers when no replica is left
+        """
+        def broken():
+            raise ConnectionError('replica down')
+        primary = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        first = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        second = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        replicas = ReplicaSet(primary, [first, second])
+        pools = []
+        for _ in range(4):
+            conn = replicas.checkout()
+            pools.append(conn._pool)  # pylint: disable=protected-access
+            conn.close()
+        assert pools == [first, second, first, second]
+
+        replicas = ReplicaSet(primary, [ConnectionPool(broken, size=1), second], retry=60)
+        for _ in range(3):
+            conn = replicas.checkout()
+            assert conn._pool is second  # pylint: disable=protected-access
+            conn.close()
+        assert replicas.stats['failovers'] == 1
+        assert replicas.stats['down'] == [0]
+
+        replicas = ReplicaSet(primary, [ConnectionPool(broken, size=1)])
+        conn = replicas.checkout()
+        assert conn._pool is primary  # pylint: disable=protected-access
+        assert replicas.stats['primary_fallbacks'] == 1
+
+    def test_after_fork(self):
+        """
+        A forked child starts with an empty pool, the connections of the
+        parent are never handed out nor closed by it
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1, timeout=0)
+        conn = pool.checkout()
+        raw = conn.raw
+        conn.close()
+        pool.after_fork()
+        assert pool.stats['in_use'] == 0
+        assert pool.stats['opened'] == 0
+        conn = pool.checkout()
+        assert conn.raw is not raw
+        assert raw.execute('SELECT 1').fetchone() == (1,)
+        conn.close()
@@ -0,0 +1,91 @@
+"""
+Provides test for the streamed exports
+"""
+import io
+import json
+import sqlite3
+import zipfile
+from consad import connection_pool, create_app
+from consad import queries
+from consad.exports import iter_csv, iter_xlsx, statement
+
+SCHEMA = (
+    'CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE departamento(id_departamento INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE usuarios(id_usuario INTEGER PRIMARY KEY, nombre TEXT, token TEXT, '
+    'id_zona INT, id_departamento INT)',
+    'CREATE TABLE periodo(id_periodo INTEGER PRIMARY KEY, descripcion TEXT)',
+    'CREATE TABLE grupo(id_grupo INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE materiales(id_material TEXT PRIMARY KEY, id_grupo INT, '
+    'precio_unitario REAL, unidad_medida TEXT, descripcion TEXT)',
+    'CREATE TABLE solicitudes(id_material TEXT, id_zona INT, id_departamento INT, '
+    'id_periodo INT, cantidad REAL, '
+    'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))')
+
+
+def _app(instance):
+    conn = sqlite3.connect(instance.joinpath('database.db'))
+    for query in SCHEMA:
+        conn.execute(query)
+    conn.execute("INSERT INTO zona VALUES(1, 'Norte')")
+    conn.execute("INSERT INTO departamento VALUES(1, 'Compras')")
+    conn.execute("INSERT INTO usuarios VALUES(1, 'Ana', 'token-ana', 1, 1)")
+    conn.execute("INSERT INTO periodo VALUES(1, '2026')")
+    conn.execute("INSERT INTO grupo VALUES(1, 'Papeleria')")
+    conn.execute("INSERT INTO materiales VALUES('M1', 1, 10.0, 'pza', 'Lapiz')")
+    conn.execute("INSERT INTO solicitudes VALUES('M1', 1, 1, 1, 3)")
+    conn.commit()
+    instance.joinpath('config.json').write_text(json.dumps(
+        {'config': 'sqlite', 'secret_key': 'test',
+         'sqlite': {'driver': 'SQLITE', 'database': 'database.db', 'pool_size': 2,
+                    'pool_timeout': 1}}), encoding='utf-8')
+    return create_app(str(instance))
+
+
+class TestExports():
+    """ Provides Test to the export writers """
+
+    def test_xlsx_is_streamed_per_batch(self):
+        """
+        The workbook is produced in chunks and is a valid zip archive
+        """
+        batches = [[('2026', 'Norte', 3, 10.5)], [('2026', 'Sur & Centro', None, 1)]]
+        chunks = list(iter_xlsx(['periodo', 'zona', 'cantidad', 'importe'], batches))
+        assert len(chunks) == 3
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        assert archive.testzip() is None
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        assert sheet.count('<row>') == 3
+        assert '<t>Sur &amp; Centro</t>' in sheet
+        assert '<c><v>10.5</v></c>' in sheet
+
+    def test_csv_and_filters(self):
+        """
+        Only known filters with a value restrict the export
+        """
+        text = ''.join(iter_csv(['a', 'b'], [[(1, 'x')], [(2, 'y')]]))
+        assert text.splitlines() == ['a,b', '1,x', '2,y']
+        name, params = statement({'id_zona': 3, 'id_grupo': '', 'cantidad': 1})
+        assert name == 'exportar.solicitudes:id_zona'
+        assert 'WHERE s.id_zona=?' in queries.REGISTRY.sql(name)
+        assert params == [3]
+
+    def test_unread_exports_release_the_connection(self, tmp_path):
+        """
+        A HEAD request never iterates the body of the export, its connection
+        goes back to the pool when the response is closed
+        """
+        app = _app(tmp_path)
+        client = app.test_client()
+        client.post('/login/', data={'token': 'token-ana'})
+        for formato in ('csv', 'xlsx', 'csv'):
+            resp = client.head(f'/reportes/exportar/?formato={formato}')
+            assert resp.status_code == 200
+            # what a WSGI server does once the headers are sent
+            resp.close()
+        stats = app.extensions[connection_pool.POOL_KEY].stats
+        assert stats['in_use'] == 0
+        resp = client.get('/reportes/exportar/?formato=csv')
+        assert resp.get_data(as_text=True).splitlines()[1].startswith('2026,Norte,Compras')
+        resp.close()
+        assert app.extensions[connection_pool.POOL_KEY].stats['in_use'] == 0
@@ -0,0 +1,67 @@
+"""
+Provides test for the column typed formatters
+"""
+import json
+from datetime import datetime, timedelta
+import pytest
+from consad import formatters, streaming, PERIODO_FORMAT, SOLICITUDES_FORMAT
+
+
+class TestFormatters():
+    """ Provides Test to the columns and the row formatter """
+
+    def test_columns(self):
+        """
+        Every kind of column formats whole columns, mixed columns fall back
+        to checking each value
+        """
+        moment = datetime(2026, 10, 18, 9, 30)
+        assert formatters.text('a').format([1, 2.5, None]) == ['1', '2.5', 'None']
+        assert formatters.currency('a').format([1234.5, 3]) == ['1,234.50', '3.00']
+        assert formatters.currency('a').format([1234.5, 'n/d']) == ['1,234.50', 'n/d']
+        assert formatters.iso_datetime('a').format([moment]) == ['2026-10-18T09:30:00']
+        # sqlite returns dates as text, they are left untouched
+        assert formatters.iso_datetime('a').format(['2026-10-18 09:30:00']) == \
+            ['2026-10-18 09:30:00']
+        assert formatters.iso_datetime('a').format([moment, None]) == \
+            ['2026-10-18T09:30:00', None]
+        values = [1, 'x', None]
+        assert formatters.passthrough('a').format(values) is values
+
+    def test_computed(self):
+        """
+        Computed columns are built from the source columns and do not consume one
+        """
+        now = datetime.now()
+        assert formatters.is_open(now - timedelta(days=1), (now + timedelta(days=1)).isoformat())
+        assert not formatters.is_open(now + timedelta(days=1), now + timedelta(days=2))
+        row_format = formatters.RowFormatter(
+            formatters.passthrough('Id'), formatters.iso_datetime('Inicio'),
+            formatters.iso_datetime('Fin'), formatters.computed('Abierto',
+                                                                formatters.open_between(1, 2)))
+        rows = row_format([(1, now - timedelta(days=1), now + timedelta(days=1)),
+                           (2, now + timedelta(days=1), now + timedelta(days=2))])
+        assert [row[-1] for row in rows] == [True, False]
+        assert rows[0][1] == (now - timedelta(days=1)).isoformat()
+        with pytest.raises(ValueError):
+            formatters.Column('a', formatters.ColumnType.COMPUTED)
+        with pytest.raises(ValueError):
+            formatters.Column('a', compute=len)
+
+    def test_row_formatter_contract(self):
+        """
+        A formatter exposes its headings and turns a batch of rows into a
+        list of lists ready for iter_json, an empty batch gives an empty list
+        """
+        assert SOLICITUDES_FORMAT.headings == ['Id', 'Año', 'Material', 'Cantidad', 'Unidad',
+                                               'Precio Unitario']
+        assert len(PERIODO_FORMAT.headings) == 6
+        assert SOLICITUDES_FORMAT([]) == []
+        rows = SOLICITUDES_FORMAT([('M1', 2026, 'Lapiz', 3, 'pza', 1234.5),
+                                   ('M2', 2026, 'Goma', 1.5, 'pza', 'n/d')])
+        assert rows == [['M1', '2026', 'Lapiz', '3', 'pza', '1,234.50'],
+                        ['M2', '2026', 'Goma', '1.5', 'pza', 'n/d']]
+        text = ''.join(streaming.iter_json({'headings': SOLICITUDES_FORMAT.headings},
+                                           [[('M1', 2026, 'Lapiz', 3, 'pza', 10)]],
+                                           SOLICITUDES_FORMAT))
+        assert json.loads(text)['data'] == [['M1', '2026', 'Lapiz', '3', 'pza', '10.00']]
@@ -0,0 +1,49 @@
+"""
+Provides test for the HTTP validators of the cacheable pages
+"""
+from flask import Flask, request
+from consad import http_cache
+
+
+def _app():
+    app = Flask(__name__)
+
+    @app.route('/catalogo/')
+    def catalogo():
+        etag = http_cache.make_etag('materiales', request.args.get('usuario'))
+        if http_cache.is_not_modified(etag):
+            return http_cache.not_modified(etag, 1000)
+        return http_cache.set_validators(app.make_response('tabla'), etag, 1000)
+    return app
+
+
+class TestHttpCache():
+    """ Provides Test to the conditional requests """
+
+    def test_etag_revalidation(self):
+        """
+        A matching entity tag is answered with 304, the tag of another user
+        is not, every response varies by cookie
+        """
+        client = _app().test_client()
+        response = client.get('/catalogo/?usuario=ana')
+        assert response.status_code == 200
+        assert 'Cookie' in response.vary
+        etag = response.headers['ETag']
+        response = client.get('/catalogo/?usuario=ana', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        response = client.get('/catalogo/?usuario=luis', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_modified_since_alone_is_not_enough(self):
+        """
+        If-Modified-Since without an entity tag always gets the whole page,
+        the date does not tell the user or the page apart
+        """
+        client = _app().test_client()
+        last_modified = client.get('/catalogo/?usuario=ana').headers['Last-Modified']
+        response = client.get('/catalogo/?usuario=luis',
+                              headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 200
+        assert response.data == b'tabla'
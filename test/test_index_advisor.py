@@ -0,0 +1,54 @@
+"""
+Provides test for the query plan advisor
+"""
+import sqlite3
+from sqlalchemy import create_engine
+from data_object import models
+from consad import exports, index_advisor, queries, reports
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+
+
+class TestIndexAdvisor():
+    """ Provides Test to the analysis of query plans """
+
+    def test_full_scan_is_flagged(self):
+        """
+        A filtered query without an index is flagged, with the index it is not,
+        and scans registered as expected are never flagged
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        driver.connection.execute('CREATE TABLE prueba (id INTEGER PRIMARY KEY, clave TEXT)')
+        queries.register('prueba.por_clave', 'SELECT id FROM prueba WHERE clave=?')
+        queries.register('prueba.busqueda', 'SELECT id FROM prueba WHERE clave LIKE ?',
+                         full_scan=True)
+        plan = index_advisor.explain(driver, 'prueba.por_clave')
+        assert plan.error is None
+        assert [step.table for step in plan.flagged] == ['prueba']
+        assert index_advisor.explain(driver, 'prueba.busqueda').flagged == []
+        driver.connection.execute('CREATE INDEX ix_prueba_clave ON prueba (clave)')
+        assert index_advisor.explain(driver, 'prueba.por_clave').flagged == []
+
+    def test_reports_and_exports_are_explained(self, tmp_path):
+        """
+        The common reports and every export are registered on import, the
+        subqueries and common table expressions they read whole are not flagged
+        """
+        path = tmp_path.joinpath('database.db')
+        models.Base.metadata.create_all(create_engine(f'sqlite:///{path}'))
+        pool = ConnectionPool(lambda: sqlite3.connect(path), size=1)
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        names = queries.REGISTRY.names()
+        report = reports.ConsolidatedReport(DatabaseType.SQLITE, ['periodo', 'grupo', 'material'],
+                                            {'id_periodo': 1})
+        assert report.name in names
+        assert exports.statement({'id_zona': 1})[0] in names
+        assert index_advisor.derived_tables(report.sql(DatabaseType.SQLITE)) == {'b', 'd', 'r'}
+        plans = index_advisor.analyze(driver, [name for name in names
+                                               if name.startswith(('reportes.', 'exportar.'))])
+        assert len(plans) > 8
+        for plan in plans:
+            assert plan.error is None
+            assert plan.flagged == []
+        driver.close()
@@ -0,0 +1,100 @@
+"""
+Provides test for the query instrumentation
+"""
+import json
+import logging
+import sqlite3
+from flask import Flask
+from consad import connection_pool, metrics as consad_metrics
+from consad.connection_pool import ConnectionPool
+from consad.metrics import Histogram, Metrics, QueryObserver
+
+
+class TestMetrics():
+    """ Provides Test to the instrumentation of queries """
+
+    def test_histogram_text_format(self):
+        """
+        Buckets are cumulative and end with +Inf, the sum and the count
+        """
+        histogram = Histogram('latencia', 'Latencia.', ('ruta',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, ('/a',))
+        histogram.observe(0.5, ('/a',))
+        histogram.observe(5, ('/a',))
+        assert histogram.render()[2:] == [
+            'latencia_bucket{ruta="/a",le="0.1"} 1',
+            'latencia_bucket{ruta="/a",le="1.0"} 2',
+            'latencia_bucket{ruta="/a",le="+Inf"} 3',
+            'latencia_sum{ruta="/a"} 5.55',
+            'latencia_count{ruta="/a"} 3']
+
+    def test_observed_pool(self, caplog):
+        """
+        Cursors of an observed pool are timed and slow queries are logged,
+        without observer the driver cursor is returned as is
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        conn = pool.checkout()
+        assert isinstance(conn.cursor(), sqlite3.Cursor)
+        conn.close()
+        metrics = Metrics()
+        pool.observer = QueryObserver(metrics, slow_seconds=1e-9)
+        conn = pool.checkout()
+        with caplog.at_level(logging.WARNING, logger='consad.slow_queries'):
+            assert conn.cursor().execute('SELECT 1').fetchone() == (1,)
+        record = json.loads(caplog.records[0].getMessage())
+        assert record['sql'] == 'SELECT 1'
+        assert record['endpoint'] == 'none'
+        assert 'consad_query_duration_seconds_count{endpoint="none"} 1' in \
+            metrics.query_duration.render()
+        assert 'consad_slow_queries_total{endpoint="none"} 1' in metrics.slow_queries.render()
+
+    def test_fetched_rows_are_counted(self):
+        """
+        sqlite3 does not know the rows of a SELECT, they are counted as they
+        are fetched, the rowcount of writes is used as is
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        metrics = Metrics()
+        pool.observer = QueryObserver(metrics)
+        conn = pool.checkout()
+        cur = conn.cursor()
+        cur.execute('CREATE TABLE prueba(id INTEGER)')
+        cur.executemany('INSERT INTO prueba VALUES(?)', [(1,), (2,), (3,)])
+        assert cur.execute('SELECT id FROM prueba').fetchall() == [(1,), (2,), (3,)]
+        assert len(list(cur.execute('SELECT id FROM prueba'))) == 3
+        cur.execute('SELECT id FROM prueba')
+        assert cur.fetchone() == (1,)
+        assert len(cur.fetchmany(5)) == 2
+        assert 'consad_query_rows_total{endpoint="none"} 12' in metrics.query_rows.render()
+
+    def test_scrape_is_restricted_and_aggregated(self, tmp_path):
+        """
+        /metrics asks for the token when configured, only the loopback
+        address otherwise, and sums the totals written by every process,
+        the pool gauges of processes gone are left out
+        """
+        app = Flask(__name__, instance_path=str(tmp_path))
+        app.config.update(METRICS=True, METRICS_TOKEN='secreto')
+        app.extensions[connection_pool.POOL_KEY] = ConnectionPool(
+            lambda: sqlite3.connect(':memory:'), size=1)
+        consad_metrics.init_app(app)
+        # a worker that already exited, pids never reach this number
+        gone = Metrics().snapshot(app)
+        gone['pid'] = 999999999
+        gone['pool']['in_use'] = 4
+        gone['pool']['checkouts'] = 7
+        gone['metrics']['consad_request_duration_seconds'] = [
+            [['/metrics', 'GET'], [1] + [0] * len(Metrics().request_duration.buckets), 0.5, 1]]
+        tmp_path.joinpath('metrics', '999999999.json').write_text(json.dumps(gone))
+        client = app.test_client()
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', headers={'Authorization': 'Bearer otro'}).status_code == 401
+        text = client.get('/metrics', headers={'Authorization': 'Bearer secreto'}).text
+        # the refused scrapes of this process and the request of the other one
+        assert 'consad_request_duration_seconds_count{route="/metrics",method="GET"} 3' in text
+        assert 'consad_pool_connections{state="in_use"} 0' in text
+        assert 'consad_pool_checkouts_total 7' in text
+        app.config['METRICS_TOKEN'] = None
+        assert client.get('/metrics').status_code == 200
+        assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code == 403
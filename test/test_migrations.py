@@ -0,0 +1,47 @@
+"""
+Provides test for the migrations of previous databases
+"""
+import sqlite3
+from sqlalchemy import create_engine, inspect
+from data_object import migrations, models
+
+PREVIOUS_SCHEMA = (
+    'CREATE TABLE departamento(id_departamento INTEGER PRIMARY KEY, nombre TEXT, clave TEXT)',
+    'CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT, centro_gestor TEXT)',
+    'CREATE TABLE material(id_material TEXT PRIMARY KEY, descripcion TEXT)',
+    'CREATE TABLE usuario(id_usuario INTEGER PRIMARY KEY, token TEXT)',
+    'CREATE TABLE solicitudes(id_material TEXT REFERENCES material(id_material), '
+    'cantidad REAL)')
+
+
+class TestMigrations():
+    """ Provides Test to the migration of the renamed tables and columns """
+
+    def test_renames_once(self, tmp_path):
+        """
+        A database with the previous names gets the names of the models and
+        keeps its rows, a current database needs nothing
+        """
+        path = tmp_path.joinpath('database.db')
+        conn = sqlite3.connect(path)
+        for statement in PREVIOUS_SCHEMA:
+            conn.execute(statement)
+        conn.execute("INSERT INTO material VALUES('M1', 'Lapiz')")
+        conn.execute("INSERT INTO departamento VALUES(1, 'Compras', 'C01')")
+        conn.commit()
+        conn.close()
+        engine = create_engine(f'sqlite:///{path}')
+        assert len(migrations.migrate(engine)) == 4
+        assert migrations.migrate(engine) == []
+        inspector = inspect(engine)
+        assert {'materiales', 'usuarios'} <= set(inspector.get_table_names())
+        assert 'c_clave' in {column['name'] for column in inspector.get_columns('departamento')}
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql(
+                'SELECT descripcion FROM materiales').fetchall() == [('Lapiz',)]
+            # the foreign key follows the renamed table
+            assert connection.exec_driver_sql(
+                'PRAGMA foreign_key_list(solicitudes)').fetchone()[2] == 'materiales'
+        current = create_engine(f"sqlite:///{tmp_path.joinpath('current.db')}")
+        models.Base.metadata.create_all(current)
+        assert migrations.migrate(current) == []
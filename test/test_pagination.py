@@ -0,0 +1,37 @@
+"""
+Provides test for server side pagination
+"""
+import sqlite3
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+from consad.pagination import PagedQuery
+
+
+class TestPagination():
+    """ Provides Test to paged queries """
+
+    def test_page_filter_and_sort(self, tmp_path):
+        """
+        Filters and sorting are done in SQL, only whitelisted columns are sorted
+        """
+        path = tmp_path.joinpath('database.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE grupo(id_grupo INTEGER PRIMARY KEY, nombre TEXT)')
+        conn.executemany('INSERT INTO grupo VALUES(?, ?)',
+                         [(i, f'grupo_{i % 3}') for i in range(1, 31)])
+        conn.commit()
+        driver = DatabaseDriver(DatabaseType.SQLITE,
+                                pool=ConnectionPool(lambda: sqlite3.connect(path), size=1))
+        query = PagedQuery({'id': 'id_grupo', 'nombre': 'nombre'}, 'grupo', search=('nombre',),
+                           name='test.grupo')
+        page = query.page_request({'page': '2', 'per_page': '4', 'sort': 'nombre',
+                                   'order': 'desc', 'q': 'po_1'})
+        cur, total = query.run(driver, page)
+        assert total == 10
+        assert cur.fetchall() == [(16, 'grupo_1'), (13, 'grupo_1'), (10, 'grupo_1'), (7, 'grupo_1')]
+        page = query.page_request({'sort': 'nombre; DROP TABLE grupo', 'per_page': 'x'})
+        assert page.sort == 'id'
+        assert page.per_page == 50
+        # the LIKE wildcards typed by the user are matched literally
+        _, total = query.run(driver, query.page_request({'q': '%'}))
+        assert total == 0
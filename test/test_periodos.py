@@ -0,0 +1,75 @@
+"""
+Provides test for the period calendar
+"""
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from consad import catalog_cache, periodos
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+from consad.periodos import PeriodCalendar
+
+
+class TestPeriodCalendar():
+    """ Provides Test to the calendar of the periods """
+
+    def test_open_periods(self):
+        """
+        Periods are open from their start until their end, the editable
+        filter splits the open periods from the others
+        """
+        now = datetime.now()
+        day = timedelta(days=1)
+        calendar = PeriodCalendar([
+            (3, 'futuro', (now + day).isoformat(' '), (now + 2 * day).isoformat(' '), 1),
+            (2, 'abierto', now - day, now + day, 1),
+            (1, 'cerrado', now - 2 * day, now - day, 1)])
+        assert calendar.is_open(2) and calendar.is_open('2')
+        assert not calendar.is_open(1) and not calendar.is_open(3) and not calendar.is_open(9)
+        assert [row[0] for row in calendar.rows()] == [3, 2, 1]
+        assert calendar.rows(True) == [(2, 'abierto', now - day, now + day, 1, True)]
+        assert [row[0] for row in calendar.rows(False)] == [3, 1]
+        assert calendar.open_at(now - 2 * day) == {1}
+        assert calendar.open_at(now - day) == {2}
+        assert calendar.open_at(now + 2 * day) == set()
+
+    def test_timer_flips_at_boundary(self):
+        """
+        The timer moves the calendar to the next interval at the boundary
+        """
+        now = datetime.now()
+        calendar = PeriodCalendar([(1, 'corto', now - timedelta(days=1),
+                                    now + timedelta(seconds=0.2), 1)])
+        calendar.start()
+        assert calendar.current == {1}
+        time.sleep(0.4)
+        assert calendar.current == set()
+        calendar.stop()
+
+    def test_database_clock_and_ttl(self, tmp_path):
+        """
+        The calendar follows the clock of the database, UTC for SQLite, and
+        is read again once PERIOD_CALENDAR_TTL seconds passed
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        driver.connection.execute('CREATE TABLE periodo(id_periodo INTEGER PRIMARY KEY, '
+                                  'descripcion TEXT, fecha_inicio TEXT, fecha_fin TEXT, '
+                                  'activo INT)')
+        # open by the UTC clock of SQLite, the local clock may say otherwise
+        utc = datetime.now(timezone.utc).replace(tzinfo=None)
+        driver.connection.execute('INSERT INTO periodo VALUES(1, ?, ?, ?, 1)', (
+            'abierto', (utc - timedelta(minutes=1)).isoformat(' '),
+            (utc + timedelta(minutes=1)).isoformat(' ')))
+        app = Flask(__name__, instance_path=str(tmp_path))
+        app.config['PERIOD_CALENDAR_TTL'] = 60
+        calendar = periodos.load_calendar(driver, catalog_cache.init_app(app).version)
+        assert abs(calendar.now() - utc) < timedelta(seconds=2)
+        assert calendar.is_open(1)
+        periodos.install_calendar(app, calendar)
+        assert periodos.current_calendar(app) is calendar
+        calendar.loaded -= 61
+        assert periodos.current_calendar(app) is None
+        calendar.stop()
+        driver.close()
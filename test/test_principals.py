@@ -0,0 +1,74 @@
+"""
+Provides test for the cache of the authenticated principals
+"""
+import json
+import sqlite3
+import time
+from consad import catalog_cache, create_app, principals
+from consad.queries import REGISTRY
+
+
+def _app(instance):
+    conn = sqlite3.connect(instance.joinpath('database.db'))
+    conn.execute('CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT)')
+    conn.execute('CREATE TABLE departamento(id_departamento INTEGER PRIMARY KEY, nombre TEXT)')
+    conn.execute('CREATE TABLE usuarios(id_usuario INTEGER PRIMARY KEY, nombre TEXT, '
+                 'token TEXT, id_zona INT, id_departamento INT)')
+    conn.executemany('INSERT INTO zona VALUES(?, ?)', [(1, 'Norte'), (2, 'Sur')])
+    conn.executemany('INSERT INTO departamento VALUES(?, ?)', [(1, 'Compras'), (2, 'Obras')])
+    conn.execute("INSERT INTO usuarios VALUES(1, 'Ana', 'token-ana', 1, 1)")
+    conn.commit()
+    instance.joinpath('config.json').write_text(json.dumps(
+        {'config': 'sqlite', 'secret_key': 'test',
+         'sqlite': {'driver': 'SQLITE', 'database': 'database.db',
+                    'principal_cache_ttl': 60}}), encoding='utf-8')
+    return conn, create_app(str(instance))
+
+
+def _calls(name):
+    return REGISTRY.stats().get(name, {}).get('calls', 0)
+
+
+class TestPrincipals():
+    """ Provides Test to the revalidation of the sessions """
+
+    def test_cache_hit_skips_database(self, tmp_path):
+        """
+        Requests within the time to live are answered from the cache
+        """
+        _, app = _app(tmp_path)
+        client = app.test_client()
+        client.post('/login/', data={'token': 'token-ana'})
+        calls = _calls(principals.BY_ID)
+        for _ in range(3):
+            client.get('/about/')
+        assert _calls(principals.BY_ID) == calls
+        with client.session_transaction() as session:
+            assert session['zonaid'] == 1
+
+    def test_changes_reach_the_session_after_ttl(self, tmp_path, monkeypatch):
+        """
+        A reassigned zona and departamento reach the session once the cached
+        principal expires, a rotated token ends the session
+        """
+        conn, app = _app(tmp_path)
+        client = app.test_client()
+        client.post('/login/', data={'token': 'token-ana'})
+        conn.execute('UPDATE usuarios SET id_zona=2, id_departamento=2 WHERE id_usuario=1')
+        conn.commit()
+        client.get('/about/')
+        with client.session_transaction() as session:
+            assert session['zonaid'] == 1
+        now = time.monotonic()
+        monkeypatch.setattr(catalog_cache.time, 'monotonic', lambda: now + 61)
+        client.get('/about/')
+        with client.session_transaction() as session:
+            assert (session['zonaid'], session['deptoid']) == (2, 2)
+            assert session['zonaname'] == 'Sur'
+
+        conn.execute("UPDATE usuarios SET token='token-nuevo' WHERE id_usuario=1")
+        conn.commit()
+        monkeypatch.setattr(catalog_cache.time, 'monotonic', lambda: now + 130)
+        client.get('/about/')
+        with client.session_transaction() as session:
+            assert session.get('userid') is None
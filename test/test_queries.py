@@ -0,0 +1,53 @@
+"""
+Provides test for the named query registry
+"""
+import sqlite3
+import pytest
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+from consad.queries import QueryError, QueryRegistry
+
+
+class TestQueries():
+    """ Provides Test to the named queries """
+
+    def test_execute_by_name(self):
+        """
+        A query runs by name on a cursor kept by the pooled connection and its
+        executions are timed
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        registry = QueryRegistry()
+        registry.register('numero', 'SELECT ? + 1')
+        registry.register('numero', 'SELECT ? + 1')
+        with pytest.raises(QueryError):
+            registry.register('numero', 'SELECT ? + 2')
+        with pytest.raises(QueryError):
+            registry.sql('desconocida')
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        cur = registry.execute(driver, 'numero', [1])
+        assert cur.fetchone() == (2,)
+        assert registry.execute(driver, 'numero', [2]) is cur
+        assert cur.fetchone() == (3,)
+        stats = registry.stats()['numero']
+        assert stats['calls'] == 2
+        assert stats['max'] <= stats['total']
+        registry.reset_stats()
+        assert registry.stats() == {}
+
+    def test_variants_and_cursors(self):
+        """
+        A callable registered again is the same query when it writes the same
+        SQL, and a query can run on a cursor given by the caller
+        """
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), size=1)
+        registry = QueryRegistry()
+        registry.register('variante', lambda database_type: 'SELECT ?')
+        registry.register('variante', lambda database_type: 'SELECT ?')
+        with pytest.raises(QueryError):
+            registry.register('variante', lambda database_type: 'SELECT ?, ?')
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        cursor = driver.stream_cursor()
+        assert registry.execute(driver, 'variante', [5], cursor=cursor) is cursor
+        assert cursor.fetchone() == (5,)
+        assert registry.stats()['variante']['calls'] == 1
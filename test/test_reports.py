@@ -0,0 +1,124 @@
+"""
+Provides test for the consolidation report
+"""
+import random
+import sqlite3
+from consad import queries, summaries
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+from consad.reports import ConsolidatedReport
+
+SCHEMA = (
+    'CREATE TABLE periodo(id_periodo INTEGER PRIMARY KEY, descripcion TEXT)',
+    'CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE grupo(id_grupo INTEGER PRIMARY KEY, nombre TEXT)',
+    'CREATE TABLE materiales(id_material TEXT PRIMARY KEY, id_grupo INT, '
+    'precio_unitario REAL, descripcion TEXT)',
+    'CREATE TABLE solicitudes(id_material TEXT, id_zona INT, id_departamento INT, '
+    'id_periodo INT, cantidad REAL, '
+    'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))',
+    'CREATE TABLE resumen_periodo_material(id_periodo INT, id_material TEXT, cantidad REAL, '
+    'importe REAL, solicitudes INT, PRIMARY KEY(id_periodo, id_material))',
+    'CREATE TABLE resumen_periodo_zona(id_periodo INT, id_zona INT, cantidad REAL, '
+    'importe REAL, solicitudes INT, PRIMARY KEY(id_periodo, id_zona))')
+
+DETAIL = {
+    ('periodo', 'grupo', 'material'): (
+        'SELECT s.id_periodo, m.id_grupo, s.id_material, SUM(s.cantidad), '
+        'SUM(s.cantidad * m.precio_unitario), COUNT(*) FROM solicitudes AS s '
+        'INNER JOIN materiales AS m ON(m.id_material=s.id_material) '
+        'GROUP BY s.id_periodo, m.id_grupo, s.id_material'),
+    ('periodo', 'zona'): (
+        'SELECT s.id_periodo, s.id_zona, SUM(s.cantidad), '
+        'SUM(s.cantidad * m.precio_unitario), COUNT(*) FROM solicitudes AS s '
+        'INNER JOIN materiales AS m ON(m.id_material=s.id_material) '
+        'GROUP BY s.id_periodo, s.id_zona'),
+}
+
+
+def _database():
+    conn = sqlite3.connect(':memory:')
+    for statement in SCHEMA:
+        conn.execute(statement)
+    rand = random.Random(7)
+    conn.executemany('INSERT INTO periodo VALUES(?, ?)', [(1, '2025'), (2, '2026')])
+    conn.executemany('INSERT INTO zona VALUES(?, ?)', [(zona, f'Zona {zona}')
+                                                        for zona in range(1, 4)])
+    conn.executemany('INSERT INTO grupo VALUES(?, ?)', [(1, 'Papeleria'), (2, 'Limpieza')])
+    conn.executemany('INSERT INTO materiales VALUES(?, ?, ?, ?)', [
+        (f'M{pos}', pos % 2 + 1, float(pos + 1), f'Material {pos}') for pos in range(6)])
+    conn.executemany('INSERT INTO solicitudes VALUES(?, ?, ?, ?, ?)', [
+        (f'M{pos}', zona, depto, periodo, rand.randint(1, 20))
+        for pos in range(6) for zona in range(1, 4) for depto in range(1, 3)
+        for periodo in (1, 2) if rand.random() < 0.7])
+    conn.commit()
+    return conn, DatabaseDriver(DatabaseType.SQLITE, pool=ConnectionPool(lambda: conn, size=1))
+
+
+def _report(driver, dimensions, summaries_enabled):
+    report = ConsolidatedReport(DatabaseType.SQLITE, dimensions, summaries=summaries_enabled)
+    rows = report.execute(driver).fetchall()
+    # ids and totals, the labels of the catalogs are left out
+    return report, [row[0:2 * len(dimensions):2] + row[-3:] for row in rows]
+
+
+def _rollup(detail, levels):
+    """ the rows of GROUP BY ... WITH ROLLUP computed from the plain GROUP BY """
+    totals = {}
+    for row in detail:
+        for level in range(levels, -1, -1):
+            key = row[:level] + (None,) * (levels - level)
+            total = totals.setdefault(key, [0, 0, 0])
+            for pos in range(3):
+                total[pos] += row[levels + pos]
+    return totals
+
+
+class TestConsolidatedReport():
+    """ Provides Test to the report aggregated in the database """
+
+    def test_rollup_matches_group_by(self):
+        """
+        The detail, every subtotal level and the grand total of the SQLite
+        emulation of ROLLUP match a plain GROUP BY, with and without the
+        summary tables
+        """
+        conn, driver = _database()
+        summaries.refresh_all(driver)
+        conn.commit()
+        for dimensions, query in DETAIL.items():
+            expected = _rollup(conn.execute(query).fetchall(), len(dimensions))
+            for summaries_enabled in (False, True):
+                report, rows = _report(driver, list(dimensions), summaries_enabled)
+                # every variant is a registered query with its own timing
+                assert queries.REGISTRY.stats()[report.name]['calls'] >= 1
+                assert len(rows) == len(expected)
+                for row in rows:
+                    total = expected[row[:len(dimensions)]]
+                    assert row[-3] == total[0]
+                    assert round(row[-2], 6) == round(total[1], 6)
+                    assert row[-1] == total[2]
+                # the grand total is the last row
+                assert rows[-1][:len(dimensions)] == (None,) * len(dimensions)
+
+    def test_summary_routing(self):
+        """
+        A report reads the summary matching its dimensions and filters and
+        the base table when no summary can answer it
+        """
+        _, driver = _database()
+        summaries.refresh_all(driver)
+        driver.connection.commit()
+        cases = (
+            (['periodo', 'material'], {}, 'resumen_periodo_material'),
+            (['zona'], {'id_periodo': 1}, 'resumen_periodo_zona'),
+            (['zona', 'material'], {}, None),
+            (['material'], {'id_zona': 1}, None),
+        )
+        for dimensions, filters, summary in cases:
+            query, _ = ConsolidatedReport(DatabaseType.SQLITE, dimensions, filters,
+                                          summaries=True).statement()
+            for table in ('resumen_periodo_material', 'resumen_periodo_zona'):
+                assert (table in query) == (table == summary)
+            query, _ = ConsolidatedReport(DatabaseType.SQLITE, dimensions, filters).statement()
+            assert 'resumen_' not in query
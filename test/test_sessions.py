@@ -0,0 +1,60 @@
+"""
+Provides test for the server side session store
+"""
+import json
+import sqlite3
+import time
+from consad import connection_pool, create_app, sessions
+from consad.sessions import CREATE_TABLE, sqlite_store
+
+
+class TestSessionStore():
+    """ Provides Test to the SQLite session store """
+
+    def test_expiry_and_revocation(self, tmp_path):
+        """
+        Expired sessions are not loaded and are purged in batches, revoking a
+        user removes all of its sessions
+        """
+        store = sqlite_store(tmp_path.joinpath('sessions.db'))
+        now = time.time()
+        for pos in range(5):
+            store.save(f'viejo{pos}', {'userid': 1}, now - 1)
+        store.save('a', {'userid': 1, 'zonaid': 2}, now + 60)
+        store.save('b', {'userid': 2}, now + 60)
+        assert store.load('viejo0') is None
+        assert store.load('a')[0] == {'userid': 1, 'zonaid': 2}
+        assert store.purge(batch=2) == 5
+        assert store.revoke(1) == 1
+        assert store.load('a') is None
+        assert store.load('b') is not None
+
+    def test_database_store_has_its_own_pool(self, tmp_path):
+        """
+        Sessions kept in the application database are saved while the
+        request holds its connection, a single connection per pool is enough
+        """
+        conn = sqlite3.connect(tmp_path.joinpath('database.db'))
+        conn.execute(CREATE_TABLE)
+        conn.execute('CREATE TABLE zona(id_zona INTEGER PRIMARY KEY, nombre TEXT)')
+        conn.execute('CREATE TABLE departamento(id_departamento INTEGER PRIMARY KEY, '
+                     'nombre TEXT)')
+        conn.execute('CREATE TABLE usuarios(id_usuario INTEGER PRIMARY KEY, nombre TEXT, '
+                     'token TEXT, id_zona INT, id_departamento INT)')
+        conn.execute("INSERT INTO zona VALUES(1, 'Norte')")
+        conn.execute("INSERT INTO departamento VALUES(1, 'Compras')")
+        conn.execute("INSERT INTO usuarios VALUES(1, 'Ana', 'token-ana', 1, 1)")
+        conn.commit()
+        tmp_path.joinpath('config.json').write_text(json.dumps(
+            {'config': 'sqlite', 'secret_key': 'test',
+             'sqlite': {'driver': 'SQLITE', 'database': 'database.db', 'pool_size': 1,
+                        'pool_timeout': 1, 'session_store': 'database'}}), encoding='utf-8')
+        app = create_app(str(tmp_path))
+        store = sessions.get_store(app)
+        assert store is not None
+        client = app.test_client()
+        assert client.post('/login/', data={'token': 'token-ana'}).status_code == 302
+        assert conn.execute('SELECT id_usuario FROM sesiones').fetchall() == [(1,)]
+        client.get('/about/')
+        assert app.extensions[connection_pool.POOL_KEY].stats['in_use'] == 0
+        sessions.close(app)
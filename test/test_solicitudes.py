@@ -0,0 +1,110 @@
+"""
+Provides test for the saves, bulk import and batch edition of solicitudes
+"""
+import io
+import sqlite3
+import pytest
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType, upsert_statement
+from consad.solicitudes import (SolicitudImport, BatchError, parse_operations, save,
+                                 text_stream)
+
+
+class ReadOnlyStream():
+    """ binary file with only read(), like the uploads spooled by Python 3.10 """
+
+    def __init__(self, data):
+        self.__data = io.BytesIO(data)
+
+    def read(self, size=-1):
+        """ reads up to size bytes """
+        return self.__data.read(size)
+
+
+class TestSolicitudImport():
+    """ Provides Test to the CSV import """
+
+    def test_import_upserts_and_reports_errors(self, tmp_path):
+        """
+        Valid lines are written in batches, existing rows are updated and
+        invalid lines are reported with their line number
+        """
+        database = tmp_path.joinpath('database.db')
+        conn = sqlite3.connect(database)
+        conn.execute('CREATE TABLE materiales(id_material TEXT PRIMARY KEY)')
+        conn.execute('CREATE TABLE solicitudes(id_material TEXT, id_zona INT, '
+                     'id_departamento INT, id_periodo INT, cantidad INT, '
+                     'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))')
+        conn.executemany('INSERT INTO materiales VALUES(?)', [('M1',), ('M2',), ('M3',)])
+        conn.execute("INSERT INTO solicitudes VALUES('M1', 1, 1, 1, 9)")
+        conn.commit()
+        pool = ConnectionPool(lambda: sqlite3.connect(database), size=1)
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        lines = '\ufeffcantidad,material\r\n5,M1\r\n2,M2\n1,X\ndos,M3\n0,M3\n\n4,M3'
+        result = SolicitudImport(driver, 1, 1, 1, batch_size=2).run(
+            text_stream(ReadOnlyStream(lines.encode('utf-8'))))
+        assert result.imported == 3
+        assert [error['linea'] for error in result.errors] == [4, 5, 6]
+        rows = conn.execute('SELECT id_material, cantidad FROM solicitudes '
+                            'ORDER BY id_material').fetchall()
+        assert rows == [('M1', 5), ('M2', 2), ('M3', 4)]
+
+
+class TestSolicitudBatch():
+    """ Provides Test to the batch operations """
+
+    def test_last_operation_wins(self):
+        """
+        Operations on the same material collapse to the last one
+        """
+        upserts, deletes = parse_operations(
+            [{'op': 'upsert', 'id_material': 'M1', 'cantidad': 2},
+             {'op': 'delete', 'id_material': 'M1'},
+             {'op': 'delete', 'id_material': 'M2'},
+             {'op': 'upsert', 'id_material': 'M2', 'cantidad': '3'}], {'M1', 'M2'})
+        assert upserts == {'M2': 3}
+        assert deletes == ['M1']
+
+    def test_invalid_batch_is_rejected(self):
+        """
+        A single invalid operation rejects the whole batch
+        """
+        with pytest.raises(BatchError) as exc:
+            parse_operations([{'op': 'upsert', 'id_material': 'M1', 'cantidad': 0},
+                              {'op': 'delete', 'id_material': 'X'}], {'M1'})
+        assert [error['indice'] for error in exc.value.errors] == [0, 1]
+
+
+class TestSolicitudUpsert():
+    """ Provides Test to the single statement saves """
+
+    def test_upsert_syntax(self):
+        """
+        The key columns decide the conflict, the other columns are updated
+        """
+        columns = ('id_material', 'id_zona', 'cantidad')
+        keys = ('id_material', 'id_zona')
+        assert upsert_statement(DatabaseType.SQLITE, 'solicitudes', columns, keys) == (
+            'INSERT INTO solicitudes(id_material, id_zona, cantidad) VALUES(?, ?, ?)'
+            ' ON CONFLICT(id_material, id_zona) DO UPDATE SET cantidad=excluded.cantidad')
+        assert upsert_statement(DatabaseType.MARIADB, 'solicitudes', columns, keys) == (
+            'INSERT INTO solicitudes(id_material, id_zona, cantidad) VALUES(?, ?, ?)'
+            ' ON DUPLICATE KEY UPDATE cantidad=VALUES(cantidad)')
+
+    def test_second_save_updates(self, tmp_path):
+        """
+        Saving the same solicitud twice leaves one row with the last cantidad
+        """
+        database = tmp_path.joinpath('database.db')
+        conn = sqlite3.connect(database)
+        conn.execute('CREATE TABLE solicitudes(id_material TEXT, id_zona INT, '
+                     'id_departamento INT, id_periodo INT, cantidad INT, '
+                     'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))')
+        conn.commit()
+        pool = ConnectionPool(lambda: sqlite3.connect(database), size=1)
+        driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        save(driver, 'M1', 1, 1, 1, 5)
+        save(driver, 'M1', 1, 1, 1, 8)
+        save(driver, 'M1', 1, 1, 2, 3)
+        assert conn.execute('SELECT id_periodo, cantidad FROM solicitudes '
+                            'ORDER BY id_periodo').fetchall() == [(1, 8), (2, 3)]
@@ -0,0 +1,73 @@
+"""
+Provides test for the streamed JSON responses
+"""
+import json
+import sqlite3
+from flask import Flask, g
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+from consad.streaming import iter_json, json_response, rows_response
+
+
+def _driver(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE grupo(id_grupo INTEGER PRIMARY KEY, nombre TEXT)')
+    conn.executemany('INSERT INTO grupo VALUES(?, ?)',
+                     [(pos, f'grupo {pos}') for pos in range(1, rows + 1)])
+    conn.commit()
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), size=1)
+    return pool, DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+
+
+class TestStreaming():
+    """ Provides Test to the JSON written in chunks """
+
+    def test_iter_json(self):
+        """
+        The head, every batch and the tail are separate chunks of one JSON object
+        """
+        chunks = list(iter_json({'headings': ['id']}, [[[1], [2]], [[3]]], list,
+                                {'paging': {'page': 1}}))
+        assert len(chunks) == 4
+        assert json.loads(''.join(chunks)) == {'headings': ['id'], 'data': [[1], [2], [3]],
+                                               'paging': {'page': 1}}
+        assert json.loads(''.join(iter_json({}, [], list))) == {'data': []}
+
+    def test_empty_result(self, tmp_path):
+        """
+        A query without rows answers success false, like rows_response
+        """
+        pool, driver = _driver(tmp_path.joinpath('database.db'), 0)
+        with Flask(__name__).app_context():
+            g.db_driver = driver
+            cur = driver.connection.cursor()
+            cur.execute('SELECT * FROM grupo')
+            assert json_response({}, cur, list) == rows_response({}, [], list)
+            # the driver was not detached, the app context releases it
+            assert g.db_driver is driver
+        driver.close()
+        assert pool.stats['in_use'] == 0
+
+    def test_connection_released_on_close(self, tmp_path):
+        """
+        The connection stays checked out while the body is streamed and goes
+        back to the pool when the response is closed, read or not
+        """
+        pool, driver = _driver(tmp_path.joinpath('database.db'), 7)
+        app = Flask(__name__)
+        for consume in (True, False):
+            with app.app_context():
+                g.db_driver = driver
+                cur = driver.connection.cursor()
+                cur.execute('SELECT * FROM grupo ORDER BY id_grupo')
+                resp = json_response({'headings': ['id', 'nombre']}, cur, list, batch_size=3)
+                assert 'db_driver' not in g
+            assert pool.stats['in_use'] == 1
+            if consume:
+                chunks = list(resp.response)
+                assert len(chunks) == 5
+                assert len(json.loads(''.join(chunks))['data']) == 7
+            resp.close()
+            assert pool.stats['in_use'] == 0
+            driver = DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+        driver.close()
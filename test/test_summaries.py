@@ -0,0 +1,123 @@
+"""
+Provides test for the materialized period summaries
+"""
+import sqlite3
+from consad import solicitudes, summaries, write_behind
+from consad.connection_pool import ConnectionPool
+from consad.database_driver import DatabaseDriver, DatabaseType
+from consad.reports import ConsolidatedReport
+
+SCHEMA = (
+    'CREATE TABLE periodo(id_periodo INTEGER PRIMARY KEY, descripcion TEXT)',
+    'CREATE TABLE materiales(id_material TEXT PRIMARY KEY, id_grupo INT, '
+    'precio_unitario REAL, unidad_medida TEXT, descripcion TEXT)',
+    'CREATE TABLE solicitudes(id_material TEXT, id_zona INT, id_departamento INT, '
+    'id_periodo INT, cantidad REAL, '
+    'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))',
+    'CREATE TABLE resumen_periodo_material(id_periodo INT, id_material TEXT, cantidad REAL, '
+    'importe REAL, solicitudes INT, PRIMARY KEY(id_periodo, id_material))',
+    'CREATE TABLE resumen_periodo_zona(id_periodo INT, id_zona INT, cantidad REAL, '
+    'importe REAL, solicitudes INT, PRIMARY KEY(id_periodo, id_zona))')
+
+EXPECTED = {
+    'resumen_periodo_material': (
+        'SELECT s.id_periodo, s.id_material, SUM(s.cantidad), '
+        'SUM(s.cantidad * m.precio_unitario), COUNT(*) FROM solicitudes AS s '
+        'INNER JOIN materiales AS m ON(m.id_material=s.id_material) '
+        'GROUP BY s.id_periodo, s.id_material ORDER BY 1, 2'),
+    'resumen_periodo_zona': (
+        'SELECT s.id_periodo, s.id_zona, SUM(s.cantidad), '
+        'SUM(s.cantidad * m.precio_unitario), COUNT(*) FROM solicitudes AS s '
+        'INNER JOIN materiales AS m ON(m.id_material=s.id_material) '
+        'GROUP BY s.id_periodo, s.id_zona ORDER BY 1, 2'),
+}
+
+
+def _database(path):
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.executemany('INSERT INTO periodo VALUES(?, ?)', [(1, '2025'), (2, '2026')])
+    conn.executemany('INSERT INTO materiales VALUES(?, 1, ?, ?, ?)', [
+        (f'M{pos}', pos + 1.5, 'pza', f'Material {pos}') for pos in range(4)])
+    conn.executemany('INSERT INTO solicitudes VALUES(?, ?, 1, ?, ?)', [
+        (f'M{pos}', zona, periodo, pos + zona) for pos in range(4) for zona in (1, 2)
+        for periodo in (1, 2)])
+    conn.commit()
+    pool = ConnectionPool(lambda: sqlite3.connect(path), size=1)
+    return conn, DatabaseDriver(DatabaseType.SQLITE, pool=pool)
+
+
+def _assert_consistent(conn):
+    for table, query in EXPECTED.items():
+        assert conn.execute(f'SELECT * FROM {table} ORDER BY 1, 2').fetchall() == \
+            conn.execute(query).fetchall()
+
+
+class TestSummaries():
+    """ Provides Test to the summaries kept by the writes """
+
+    def test_writes_keep_summaries(self, tmp_path):
+        """
+        Summaries match solicitudes after a save, an update, a delete and a batch
+        """
+        conn, driver = _database(tmp_path.joinpath('database.db'))
+        summaries.refresh_all(driver)
+        driver.connection.commit()
+        _assert_consistent(conn)
+        solicitudes.save(driver, 'M0', 3, 1, 1, 7, refresh_summaries=True)
+        solicitudes.save(driver, 'M1', 1, 1, 2, 40, refresh_summaries=True)
+        _assert_consistent(conn)
+        solicitudes.delete(driver, 2, 1, 'M2', refresh_summaries=True)
+        _assert_consistent(conn)
+        solicitudes.apply_batch(driver, 1, 1, 1, [
+            {'op': 'upsert', 'id_material': 'M3', 'cantidad': 9},
+            {'op': 'delete', 'id_material': 'M0'}], {'M0', 'M1', 'M2', 'M3'},
+            refresh_summaries=True)
+        _assert_consistent(conn)
+
+    def test_writes_apply_deltas(self, tmp_path):
+        """
+        A write adds its delta to the totals of its groups instead of reading
+        the whole group again, the journal flush keeps them consistent too
+        """
+        conn, driver = _database(tmp_path.joinpath('database.db'))
+        summaries.refresh_all(driver)
+        driver.connection.commit()
+        # a total the groups would lose if they were rebuilt
+        conn.execute('UPDATE resumen_periodo_material SET cantidad=cantidad+100 '
+                     "WHERE id_periodo=1 AND id_material='M0'")
+        conn.commit()
+        solicitudes.save(driver, 'M0', 2, 1, 1, 10, refresh_summaries=True)
+        solicitudes.save(driver, 'M0', 3, 1, 1, 4, refresh_summaries=True)
+        assert conn.execute('SELECT cantidad, solicitudes FROM resumen_periodo_material '
+                            "WHERE id_periodo=1 AND id_material='M0'").fetchone() == (115, 3)
+        conn.execute('UPDATE resumen_periodo_material SET cantidad=cantidad-100 '
+                     "WHERE id_periodo=1 AND id_material='M0'")
+        conn.commit()
+        _assert_consistent(conn)
+        write_behind.apply(driver, *write_behind.coalesce([
+            (write_behind.UPSERT, 'M1', 1, 1, 1, 30), (write_behind.DELETE, 'M2', 2, 1, None, None),
+            (write_behind.UPSERT, 'M2', 2, 1, 2, 6), (write_behind.DELETE, 'M3', 1, 1, None, None),
+            (write_behind.DELETE, 'M3', 2, 1, None, None)]), refresh_summaries=True)
+        _assert_consistent(conn)
+        # M3 has no solicitudes left, its groups are gone
+        assert conn.execute('SELECT COUNT(*) FROM resumen_periodo_material '
+                            "WHERE id_material='M3'").fetchone()[0] == 0
+
+    def test_reports_wait_for_refresh(self, tmp_path):
+        """
+        Until refresh_all completed the summaries, reports read solicitudes
+        """
+        conn, driver = _database(tmp_path.joinpath('database.db'))
+        # only the groups of this save reach the summaries
+        solicitudes.save(driver, 'M0', 1, 1, 1, 5, refresh_summaries=True)
+        assert not summaries.populated(driver)
+        total = conn.execute('SELECT COUNT(*) FROM solicitudes').fetchone()[0]
+        report = ConsolidatedReport(DatabaseType.SQLITE, ['periodo'], summaries=True)
+        assert report.execute(driver).fetchall()[-1][-1] == total
+        summaries.refresh_all(driver)
+        driver.connection.commit()
+        assert summaries.populated(driver)
+        report = ConsolidatedReport(DatabaseType.SQLITE, ['periodo'], summaries=True)
+        assert report.execute(driver).fetchall()[-1][-1] == total
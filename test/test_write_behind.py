@@ -0,0 +1,63 @@
+"""
+Provides test for the write-behind journal of the capture saves
+"""
+import sqlite3
+from consad.connection_pool import ConnectionPool
+from consad.write_behind import DELETE, UPSERT, Journal, coalesce
+
+
+def _database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE materiales(id_material TEXT PRIMARY KEY)')
+    conn.execute('CREATE TABLE solicitudes(id_material TEXT REFERENCES materiales, '
+                 'id_zona INT, id_departamento INT, id_periodo INT, cantidad INT, '
+                 'PRIMARY KEY(id_material, id_zona, id_departamento, id_periodo))')
+    conn.executemany('INSERT INTO materiales VALUES(?)', [('M1',), ('M2',)])
+    conn.commit()
+
+    def factory():
+        raw = sqlite3.connect(path, check_same_thread=False)
+        raw.execute('PRAGMA foreign_keys=ON')
+        return raw
+    return conn, ConnectionPool(factory, size=2)
+
+
+class TestWriteBehind():
+    """ Provides Test to the journal and its flush """
+
+    def test_coalesce(self):
+        """
+        The last cantidad of a solicitud wins and a delete drops the saves
+        written before it
+        """
+        deletes, upserts = coalesce([
+            (UPSERT, 'M1', 1, 1, 1, 5), (UPSERT, 'M1', 1, 1, 1, 7), (UPSERT, 'M2', 1, 1, 1, 3),
+            (DELETE, 'M2', 1, 1, None, None), (UPSERT, 'M2', 1, 1, 2, 4)])
+        assert deletes == [('M2', 1, 1)]
+        assert upserts == [('M1', 1, 1, 1, 7), ('M2', 1, 1, 2, 4)]
+
+    def test_flush_replay_and_rejects(self, tmp_path):
+        """
+        Saves reach the database on flush, a journal left by a stopped process
+        is replayed by the next one and refused entries are set aside
+        """
+        conn, pool = _database(tmp_path.joinpath('database.db'))
+        journal = Journal(tmp_path.joinpath('journal.db'), pool, batch=2)
+        journal.save('M1', 1, 1, 1, 5)
+        journal.save('M1', 1, 1, 1, 6)
+        journal.save('X', 1, 1, 1, 1)
+        seq = journal.save('M2', 1, 1, 1, 2)
+        assert journal.pending(seq) == 4
+        assert conn.execute('SELECT COUNT(*) FROM solicitudes').fetchone() == (0,)
+
+        replayed = Journal(tmp_path.joinpath('journal.db'), pool)
+        assert replayed.flush() == 4
+        assert journal.wait(seq, timeout=0)
+        rows = conn.execute('SELECT id_material, cantidad FROM solicitudes '
+                            'ORDER BY id_material').fetchall()
+        assert rows == [('M1', 6), ('M2', 2)]
+        assert [entry[2] for entry in replayed.rejected()] == ['X']
+
+        journal.delete(1, 1, 'M1')
+        journal.stop()
+        assert conn.execute('SELECT id_material FROM solicitudes').fetchall() == [('M2',)]